@@ -1 +1,7 @@
 # API package for Satoshi's Arcade MCP
+import os
+
+# Worker processes, and whether they share state through api.shared_state;
+# decided here so that a single worker never imports that module
+WORKERS = int(os.environ.get("WEB_CONCURRENCY") or 1)
+SHARED_STATE = os.environ.get("ARCADE_SHARED_STATE", "1" if WORKERS > 1 else "0") == "1"
@@ -0,0 +1,116 @@
+"""
+Admission control for the /action endpoints.
+
+Three layers, cheapest first:
+- coalescing: only the newest paddle position matters, so paddle_move
+  events within one frame of the last AI step just record the position
+- a token bucket per session, so one flooding tab cannot take more than
+  its share of AI steps and database writes
+- load shedding: while the event loop lags (requests waiting to run)
+  past a limit, handlers apply the cheap state updates and answer with the
+  last AI move, skipping learning and replay checks until the backlog drains
+
+Degraded answers keep the normal response shape, so clients never notice
+beyond a paddle that updates a little less often.
+"""
+import asyncio
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException
+
+from api import metrics
+
+# Sustained actions per second and burst size for one session
+ACTION_RATE = float(os.environ.get("ARCADE_ACTION_RATE", 120))
+ACTION_BURST = float(os.environ.get("ARCADE_ACTION_BURST", 240))
+# At most one AI step per session per frame (60 Hz); paddle_move events in
+# between only update the stored position
+COALESCE_INTERVAL = float(os.environ.get("ARCADE_COALESCE_MS", 1000 / 60)) / 1000
+# Event-loop lag before shedding. Action handlers never await, so a
+# backlog shows up as requests waiting for the loop, not as ones in progress
+SHED_LAG = float(os.environ.get("ARCADE_SHED_LAG_MS", 50)) / 1000
+# How often the lag is sampled
+LAG_INTERVAL = 0.02
+
+degraded = metrics.counter(
+    "arcade_actions_degraded_total",
+    "Actions answered without the full AI step, by reason (stale, coalesced, limited, shed)",
+    ("game", "reason"))
+
+
+@dataclass(slots=True)
+class TokenBucket:
+    rate: float
+    burst: float
+    tokens: float
+    updated: float
+
+    def take(self, now: float) -> bool:
+        # Unlocked like the metrics counters: two racing requests from one
+        # session can both get the last token, which is harmless
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def retry_after(self) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+def new_bucket() -> TokenBucket:
+    return TokenBucket(ACTION_RATE, ACTION_BURST, ACTION_BURST, time.monotonic())
+
+
+# Session fields holding time.monotonic() readings; api.checkpoint moves
+# them onto the clock of the process that restores the session
+MONOTONIC_FIELDS = ("ai_moved_at", "bucket.updated")
+
+
+def rate_limited(bucket: TokenBucket, game: str) -> HTTPException:
+    degraded.inc((game, "limited"))
+    return HTTPException(
+        status_code=429,
+        detail="Too many actions for this session",
+        headers={"Retry-After": str(max(1, math.ceil(bucket.retry_after())))}
+    )
+
+
+class LoadShedder:
+    """Samples event-loop lag; past ``limit`` seconds callers take the cheap path
+
+    One per worker process, shared by both games' action routes. A task on
+    the loop sleeps LAG_INTERVAL at a time and records how late it woke up,
+    which is how long every ready request waits for its turn.
+    """
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.lag = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def overloaded(self) -> bool:
+        """Whether the loop is behind (call from it); starts the sampler on first use"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self.lag = loop, 0.0
+            loop.create_task(self._sample(loop))
+        return self.lag > self.limit
+
+    async def _sample(self, loop: asyncio.AbstractEventLoop):
+        while self._loop is loop:
+            started = loop.time()
+            await asyncio.sleep(LAG_INTERVAL)
+            self.lag = max(0.0, loop.time() - started - LAG_INTERVAL)
+
+
+shedder = LoadShedder(SHED_LAG)
+
+metrics.gauge("arcade_event_loop_lag_seconds",
+              "Event-loop lag at the last sample (load shedding signal)").set_function(
+    (), lambda: shedder.lag)
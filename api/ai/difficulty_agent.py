@@ -1,20 +1,23 @@
 import json
-import statistics
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import sqlite3
 import os
 
+from api import ratings
+
 
 def _mean(x: List[float]) -> float:
     return sum(x) / len(x) if x else 0.0
 
 
 def _variance(x: List[float]) -> float:
-    try:
-        return statistics.variance(x) if len(x) > 1 else 0.0
-    except statistics.StatisticsError:
+    # Sample variance in floats: statistics.variance computes it exactly with
+    # Fractions, which cost most of each learning step
+    if len(x) < 2:
         return 0.0
+    mean = sum(x) / len(x)
+    return sum((v - mean) ** 2 for v in x) / (len(x) - 1)
 
 
 def _clip(x: float, a: float, b: float) -> float:
@@ -32,20 +35,69 @@ def _interp(x: float, xp: List[float], fp: List[float]) -> float:
             return fp[i] + t * (fp[i + 1] - fp[i])
     return fp[-1]
 
+# Outcomes remembered per agent
+MEMORY_SIZE = 100
+
+
+class AgentState:
+    """What an agent has learned: difficulty, recent outcomes and a version
+
+    Kept in this process; api.shared_state.SharedAgentState has the same
+    interface for multi-worker mode.
+    """
+
+    def __init__(self, memory_size: int = MEMORY_SIZE, difficulty: float = 0.5):
+        self.memory_size = memory_size
+        self.difficulty = difficulty
+        self.history: List[float] = []
+        # Bumped whenever difficulty or history changes (drives HTTP ETags)
+        self.version = 0
+
+    def load(self, difficulty: float, history: List[float]):
+        """Replace what was learned (restoring a checkpoint)"""
+        self.difficulty = difficulty
+        self.history = list(history[-self.memory_size:])
+        self.version += 1
+
+    def record(self, outcome: float, adjust: Callable[[float, List[float]], float]):
+        """Remember ``outcome``; from 10 outcomes on, difficulty = adjust(difficulty, last 10)"""
+        self.history.append(outcome)
+        if len(self.history) > self.memory_size:
+            self.history.pop(0)
+        self.version += 1
+        if len(self.history) >= 10:
+            self.difficulty = adjust(self.difficulty, self.history[-10:])
+
+
 class DifficultyAgent:
     """
     AI Agent that learns and adapts difficulty based on player performance.
     Uses reinforcement learning principles to optimize gameplay experience.
     """
 
-    def __init__(self, game_type: str = "pingpong"):
+    def __init__(self, game_type: str = "pingpong", state: Optional[AgentState] = None):
         self.game_type = game_type
-        self.difficulty_level = 0.5
         self.learning_rate = 0.01
-        self.memory_size = 100
+        self.memory_size = MEMORY_SIZE
         self.player_performance_history = []
-        self.ai_performance_history = []
         self.game_params = self._get_game_params()
+        self.state = state if state is not None else AgentState(self.memory_size)
+
+    @property
+    def difficulty_level(self) -> float:
+        return self.state.difficulty
+
+    @difficulty_level.setter
+    def difficulty_level(self, value: float):
+        self.state.difficulty = value
+
+    @property
+    def ai_performance_history(self) -> List[float]:
+        return self.state.history
+
+    @property
+    def version(self) -> int:
+        return self.state.version
 
     def _get_game_params(self) -> Dict:
         if self.game_type == "pingpong":
@@ -67,6 +119,10 @@ class DifficultyAgent:
     def calculate_difficulty(self, player_stats: Dict, recent_performance: List[float]) -> float:
         if not recent_performance:
             return self.difficulty_level
+        self.difficulty_level = self._adjust_difficulty(self.difficulty_level, recent_performance)
+        return self.difficulty_level
+
+    def _adjust_difficulty(self, difficulty: float, recent_performance: List[float]) -> float:
         win_rate = _mean(recent_performance)
         performance_variance = _variance(recent_performance)
         if win_rate > 0.7:
@@ -75,9 +131,8 @@ class DifficultyAgent:
             difficulty_adjustment = -0.1
         else:
             difficulty_adjustment = 0.02 if performance_variance > 0.1 else -0.02
-        new_difficulty = self.difficulty_level + (difficulty_adjustment * self.learning_rate)
-        self.difficulty_level = _clip(new_difficulty, 0.0, 1.0)
-        return self.difficulty_level
+        new_difficulty = difficulty + (difficulty_adjustment * self.learning_rate)
+        return _clip(new_difficulty, 0.0, 1.0)
 
     def get_ai_behavior_params(self, difficulty: float) -> Dict:
         params = {}
@@ -112,9 +167,11 @@ class DifficultyAgent:
         return params
 
     def learn_from_outcome(self, player_action: str, ai_response: str,
-                          outcome: str, game_context: Dict):
+                          outcome: str, game_context: Dict, at: Optional[float] = None):
+        """Record an outcome; ``at`` is when it happened (epoch seconds, default now)"""
+        when = datetime.now() if at is None else datetime.fromtimestamp(at)
         learning_data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': when.isoformat(),
             'player_action': player_action,
             'ai_response': ai_response,
             'outcome': outcome,
@@ -122,16 +179,13 @@ class DifficultyAgent:
             'game_context': game_context
         }
         if outcome == "ai_win":
-            self.ai_performance_history.append(1.0)
+            value = 1.0
         elif outcome == "player_win":
-            self.ai_performance_history.append(0.0)
+            value = 0.0
         else:
-            self.ai_performance_history.append(0.5)
-        if len(self.ai_performance_history) > self.memory_size:
-            self.ai_performance_history.pop(0)
-        if len(self.ai_performance_history) >= 10:
-            recent_performance = self.ai_performance_history[-10:]
-            self.calculate_difficulty({}, recent_performance)
+            value = 0.5
+        # One step, so with shared state no other worker's outcome lands in between
+        self.state.record(value, self._adjust_difficulty)
         return learning_data
 
     def predict_player_move(self, game_state: Dict) -> str:
@@ -142,8 +196,13 @@ class DifficultyAgent:
             return recent_moves[-1]
         return "center"
 
-    def get_adaptive_difficulty(self, session_id: str, game_type: str) -> Dict:
+    def get_adaptive_difficulty(self, session_id: str, game_type: str,
+                                rating: Optional[Dict] = None) -> Dict:
+        """Settings for a new game; a player ``rating`` (api.ratings) pulls the
+        difficulty towards the one matched to the player's skill"""
         difficulty = self.difficulty_level
+        if rating is not None:
+            difficulty = ratings.start_difficulty(difficulty, rating['rating'], rating['rd'])
         behavior_params = self.get_ai_behavior_params(difficulty)
         return {
             'difficulty_level': difficulty,
@@ -178,5 +237,13 @@ class DifficultyAgent:
             print(f"Error saving learning data: {e}")
             return False
 
-pingpong_agent = DifficultyAgent("pingpong")
-tetris_agent = DifficultyAgent("tetris")
+def _make_agent(game_type: str) -> DifficultyAgent:
+    from api import SHARED_STATE
+    if SHARED_STATE:
+        from api import shared_state
+        # Every worker learns into, and plays at, the same difficulty
+        return DifficultyAgent(game_type, shared_state.agent_state(game_type, MEMORY_SIZE, 0.5))
+    return DifficultyAgent(game_type)
+
+pingpong_agent = _make_agent("pingpong")
+tetris_agent = _make_agent("tetris")
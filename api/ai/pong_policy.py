@@ -0,0 +1,97 @@
+"""
+The Ping-Pong AI paddle as a deterministic function of the game state.
+
+The page runs the same code (frontend/pingpong/index.html, kept in step by
+hand) every frame, so the AI paddle moves without waiting for the server.
+Randomness comes from uniform(seed, tick, draw): the mulberry32 generator
+read at position tick * DRAWS + draw, so any tick's numbers can be had
+without replaying the ones before. The seed is chosen by the server at
+start-session. The arithmetic is limited to what IEEE doubles (and
+JavaScript's 32-bit integer ops) give bit for bit in both languages: no
+log, exp or trig.
+
+At a ball hit or a score the client reports its tick and state.
+replay() re-runs the frames since the previous report (ball flight, wall
+and AI paddle bounces, AI steps) from the state the server holds, giving
+the authoritative AI paddle position at that tick. The player's paddle
+does not matter in between: touching it is itself a reported ball hit.
+"""
+import math
+from typing import Callable, Tuple
+
+WIDTH = 800
+HEIGHT = 500
+PADDLE_WIDTH = 10
+PADDLE_HEIGHT = 100
+# Highest paddle top; the ball aim is clamped to [AIM_LOW, AIM_HIGH]
+AI_Y_MAX = HEIGHT - PADDLE_HEIGHT
+AIM_LOW, AIM_HIGH = 50, 400
+CENTER_Y = 250
+# Random numbers per tick: one for the accuracy roll, four for the aim error
+DRAWS = 5
+# Sum of four uniforms minus 2 has standard deviation 1/sqrt(3): an aim
+# error close to normal with a standard deviation of 50 px
+AIM_ERROR = 50 * math.sqrt(3)
+
+# (ball_x, ball_y, ball_speed_x, ball_speed_y, ai_y)
+State = Tuple[float, float, float, float, float]
+
+_MASK = 0xFFFFFFFF
+_STEP = 0x6D2B79F5
+
+
+def uniform(seed: int, tick: int, draw: int) -> float:
+    """The ``draw``-th number in [0, 1) of ``tick`` for ``seed``"""
+    t = (seed + (tick * DRAWS + draw) * _STEP) & _MASK
+    t = ((t ^ (t >> 15)) * (t | 1)) & _MASK
+    t ^= (t + (((t ^ (t >> 7)) * (t | 61)) & _MASK)) & _MASK
+    return (t ^ (t >> 14)) / 4294967296
+
+
+def ai_step(ai_y: float, ball_x: float, ball_y: float, ball_speed_x: float, ball_speed_y: float,
+            prediction_accuracy: float, paddle_speed: float, rand: Callable[[int], float]) -> float:
+    """The AI paddle's next position; ``rand(draw)`` supplies the random numbers"""
+    if ball_speed_x > 0:
+        # Ball moving towards AI: aim where it will reach the paddle, with
+        # an error unless the accuracy roll succeeds
+        predicted_y = ball_y + ball_speed_y * ((WIDTH - ball_x) / ball_speed_x)
+        if rand(0) > prediction_accuracy:
+            predicted_y += (rand(1) + rand(2) + rand(3) + rand(4) - 2) * AIM_ERROR
+        target = max(AIM_LOW, min(AIM_HIGH, predicted_y))
+        speed, dead_zone = paddle_speed, 5
+    else:
+        # Ball moving away: drift back to the middle, slower
+        target, speed, dead_zone = CENTER_Y, paddle_speed * 0.5, 10
+    if abs(target - ai_y) <= dead_zone:
+        return ai_y
+    if target > ai_y:
+        return min(ai_y + speed, AI_Y_MAX)
+    return max(ai_y - speed, 0)
+
+
+def replay(state: State, seed: int, prediction_accuracy: float, paddle_speed: float,
+           start: int, end: int) -> State:
+    """Run the frames from tick ``start`` (after its ball update) to ``end`` (before its AI step)
+
+    That is, the AI steps of ticks start..end-1 and the ball updates of
+    ticks start+1..end-1, as the page's game loop does them.
+    """
+    ball_x, ball_y, ball_speed_x, ball_speed_y, ai_y = state
+    for tick in range(start, end):
+        ai_y = ai_step(ai_y, ball_x, ball_y, ball_speed_x, ball_speed_y,
+                       prediction_accuracy, paddle_speed,
+                       lambda draw: uniform(seed, tick, draw))
+        if tick + 1 == end:
+            break
+        ball_x += ball_speed_x
+        ball_y += ball_speed_y
+        if ball_y <= 0 or ball_y >= HEIGHT:
+            ball_speed_y = -ball_speed_y
+        if ball_x >= WIDTH - PADDLE_WIDTH and ai_y < ball_y < ai_y + PADDLE_HEIGHT:
+            ball_speed_x = -abs(ball_speed_x)
+    return ball_x, ball_y, ball_speed_x, ball_speed_y, ai_y
+
+
+def passes_ai(state: State) -> bool:
+    """Whether the next ball update takes the ball past the AI's edge (a player point)"""
+    return state[0] + state[2] > WIDTH
@@ -0,0 +1,219 @@
+"""
+Warm restarts: games in progress and agent state survive a redeploy.
+
+On shutdown every game's active sessions and its agent's difficulty and
+recent outcomes go into one file (ARCADE_CHECKPOINT_PATH, by default next
+to the database): a JSON header, then per game the session ids and the
+sessions packed with api.sessions.SessionCodec, fixed width. Startup
+reads it before the server accepts traffic but only indexes the ids; each
+session is decoded the first time a request asks for it, so restoring
+100k sessions costs one read and one dict. With shared state, the first
+worker copies the sessions into the shared tables and the rest wait.
+
+Rolling deploys start the new instance before the old one stops, so the
+old one's checkpoint can land after startup: for ARCADE_CHECKPOINT_WATCH_S
+(default 300) after startup, a lookup that misses rereads the file if it
+changed; after that misses never touch the filesystem. Sessions this
+instance already took from a checkpoint, or started itself, are never
+replaced.
+
+A game whose session fields changed since the checkpoint is skipped (its
+players start over), and the admission timestamps, which are
+time.monotonic() readings, are moved onto the new host's clock.
+"""
+import json
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from api import SHARED_STATE, admission, metrics
+
+_MAGIC = b"ARCKPT01"
+_HEADER_SIZE = struct.Struct("<I")
+# Session ids are str(uuid4())
+KEY_SIZE = 36
+# How long after startup the old instance's checkpoint may still land
+WATCH_SECONDS = float(os.environ.get("ARCADE_CHECKPOINT_WATCH_S", 300))
+
+sessions_total = metrics.counter("arcade_checkpoint_sessions_total",
+                                 "Sessions written to and read from checkpoints", ("game", "event"))
+
+
+def default_path(db_path: str) -> str:
+    """ARCADE_CHECKPOINT_PATH, else beside the database (arcade.db -> arcade-sessions.ckpt)"""
+    return os.environ.get("ARCADE_CHECKPOINT_PATH") or os.path.splitext(db_path)[0] + "-sessions.ckpt"
+
+
+def _rebaser(codec, shift: float) -> Optional[Callable]:
+    """Adds ``shift`` to a session's monotonic fields (given its unpacked values)"""
+    positions = [i for i, name in enumerate(codec.names) if name in admission.MONOTONIC_FIELDS]
+    if not positions:
+        return None
+
+    def rebase(values):
+        values = list(values)
+        for i in positions:
+            values[i] += shift
+        return values
+    return rebase
+
+
+class Checkpoint:
+    """The checkpoint file of a set of games: {game_type: (active_sessions, agent)}"""
+
+    def __init__(self, path: str, games: Dict[str, Tuple[object, object]]):
+        self.path = path
+        self.games = games
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._watch_until = time.monotonic() + WATCH_SECONDS
+        for sessions, _ in games.values():
+            sessions.reload = self.reload
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def save(self) -> Dict:
+        """Write every session and agent state; returns counts and timing"""
+        start = time.perf_counter()
+        header = {"wall": time.time(), "monotonic": time.monotonic(), "games": {}}
+        blocks = []
+        for game_type, (sessions, agent) in self.games.items():
+            keys, payloads = [], []
+            for key, payload in sessions.export():
+                if len(key) == KEY_SIZE:
+                    keys.append(key)
+                    payloads.append(payload)
+            header["games"][game_type] = {
+                "fields": sessions.codec.names, "format": sessions.codec.struct.format,
+                "count": len(keys),
+                "difficulty": agent.difficulty_level, "history": list(agent.ai_performance_history),
+            }
+            blocks += [b"".join(keys), b"".join(payloads)]
+            sessions_total.inc((game_type, "saved"), len(keys))
+        head = json.dumps(header).encode()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Workers sharing state all write one; each replaces it whole
+        partial = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(partial, "wb") as out:
+                out.write(_MAGIC + _HEADER_SIZE.pack(len(head)) + head)
+                out.writelines(blocks)
+            os.replace(partial, self.path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        self._stamp = self._file_stamp()
+        return {
+            "path": self.path,
+            "sessions": {game: info["count"] for game, info in header["games"].items()},
+            "bytes": os.path.getsize(self.path),
+            "seconds": round(time.perf_counter() - start, 4),
+        }
+
+    def load(self, agents: bool = True) -> Dict[str, int]:
+        """Hand the file's sessions (and agent state, if ``agents``) to the games"""
+        stamp = self._file_stamp()
+        if stamp is None:
+            return {}
+        with open(self.path, "rb") as f:
+            data = f.read()
+        self._stamp = stamp
+        if data[:len(_MAGIC)] != _MAGIC:
+            print(f"⚠️  {self.path} is not a session checkpoint; ignoring it")  # noqa: T201
+            return {}
+        at = len(_MAGIC) + _HEADER_SIZE.size
+        size = _HEADER_SIZE.unpack_from(data, len(_MAGIC))[0]
+        header = json.loads(data[at:at + size])
+        at += size
+        # Monotonic readings on the old host -> the same moments on ours
+        shift = (time.monotonic() - time.time()) - (header["monotonic"] - header["wall"])
+        restored = {}
+        for game_type, info in header["games"].items():
+            count = info["count"]
+            record = struct.calcsize(info["format"])
+            keys_at, payloads_at = at, at + count * KEY_SIZE
+            at = payloads_at + count * record
+            if at > len(data):
+                print(f"⚠️  {self.path} is truncated; restored what came before")  # noqa: T201
+                break
+            if game_type not in self.games:
+                continue
+            sessions, agent = self.games[game_type]
+            codec = sessions.codec
+            if info["fields"] != codec.names or info["format"] != codec.struct.format:
+                print(f"⚠️  {game_type} sessions changed shape since the checkpoint; "  # noqa: T201
+                      f"not restoring them")
+                continue
+            if agents:
+                agent.state.load(info["difficulty"], info["history"])
+            keys = data[keys_at:payloads_at].decode()
+            offsets = {keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]: payloads_at + i * record
+                       for i in range(count)}
+            sessions.restore(data, offsets, _rebaser(codec, shift))
+            sessions_total.inc((game_type, "restored"), count)
+            restored[game_type] = count
+        return restored
+
+    def seen(self):
+        """Treat the current file as loaded (another worker restored it)"""
+        self._stamp = self._file_stamp()
+
+    def reload(self) -> bool:
+        """On a session lookup miss: load the file again if it changed since"""
+        if time.monotonic() > self._watch_until:
+            # Deploy over: unhook, so misses (e.g. bogus ids) skip the stat
+            for sessions, _ in self.games.values():
+                sessions.reload = None
+            return False
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        with self._lock:
+            if stamp == self._stamp:
+                return True
+            self.load(agents=False)
+        return True
+
+
+_current: Optional[Checkpoint] = None
+
+
+def restore(db_path: str) -> Dict[str, int]:
+    """On startup, before serving: restore the last checkpoint into both games"""
+    global _current
+    from api.ai.difficulty_agent import pingpong_agent, tetris_agent
+    from api.routes import pingpong, tetris
+
+    start = time.perf_counter()
+    _current = Checkpoint(default_path(db_path), {
+        "pingpong": (pingpong.active_sessions, pingpong_agent),
+        "tetris": (tetris.active_sessions, tetris_agent),
+    })
+    if not SHARED_STATE:
+        restored = _current.load()
+    else:
+        from api import shared_state
+        with shared_state.lock("checkpoint"):
+            # Shared tables and agents are restored once, by the first worker up
+            if shared_state.counter("checkpoint_restored").increment() > 1:
+                _current.seen()
+                return {}
+            restored = _current.load()
+    if any(restored.values()):
+        print(f"♻️  Restored {sum(restored.values())} sessions from {_current.path} "  # noqa: T201
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return restored
+
+
+def save() -> Optional[Dict]:
+    """On shutdown: checkpoint both games (if restore() ran at startup)"""
+    if _current is None:
+        return None
+    return _current.save()
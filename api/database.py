@@ -1,27 +1,363 @@
 import sqlite3
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+import base64
+import hashlib
+import threading
+from collections import deque
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import os
+import sys
+
+from api import SHARED_STATE
+from api import metrics
+from api.metrics import timed_db
+
+# Stored in PRAGMA user_version; bump whenever init_database's DDL changes
+SCHEMA_VERSION = 5
+
+# Rolling leaderboard windows kept alongside the all-time table
+LEADERBOARD_WINDOWS = ("daily", "weekly", "monthly")
+WINDOW_TOP_K = 100
+
+# With ARCADE_DB_SHARDS=1 each game's high-volume tables live in their own
+# file next to ARCADE_DB_PATH (arcade.db -> arcade-pingpong.db), so games
+# commit independently; players and the cross-game aggregates stay in the
+# main file, which every shard connection ATTACHes under SHARED_SCHEMA
+SHARDED_GAMES = ("pingpong", "tetris")
+GAME_TABLES = ("game_sessions", "ai_feedback", "leaderboard", "leaderboard_windows")
+SHARED_SCHEMA = "shared"
+
+# Idle read-only connections kept for reuse (per file); reads beyond this
+# still run, on a connection that is closed afterwards
+MAX_IDLE_READERS = int(os.environ.get("ARCADE_DB_READERS", max(4, 2 * (os.cpu_count() or 1))))
+
+# RETURNING needs SQLite 3.35+; older builds fall back to a follow-up SELECT
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _sql_timestamp(when: datetime) -> str:
+    # Same text format SQLite uses for CURRENT_TIMESTAMP
+    return when.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def shard_path(path: str, game_type: Optional[str]) -> str:
+    """'arcade.db' -> 'arcade-pingpong.db' (also for 'arcade.db.gz' snapshots)"""
+    if game_type is None:
+        return path
+    directory, name = os.path.split(path)
+    stem, dot, suffix = name.partition('.')
+    return os.path.join(directory, f"{stem}-{game_type}{dot}{suffix}")
+
+
+def _window_bucket(period: str, when: datetime) -> str:
+    """Sortable bucket key for the window containing ``when``"""
+    if period == "daily":
+        return when.strftime('%Y-%m-%d')
+    if period == "weekly":
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "monthly":
+        return when.strftime('%Y-%m')
+    raise ValueError(f"Unknown leaderboard window: {period}")
+
+
+def player_public_id(player_key: str) -> str:
+    """The id stored as players.session_id (and shown on leaderboards) for a client's player_key
+
+    Only a hash of the key is kept, so nobody can read a key off a
+    leaderboard and start sessions as that player.
+    """
+    return "player-" + hashlib.sha256(player_key.encode()).hexdigest()[:32]
+
+
+def _sql_tracer() -> Optional[Callable[[str], None]]:
+    """api.profiling.sql_tracer() once that is loaded; until then nothing is captured"""
+    profiling = sys.modules.get("api.profiling")
+    return profiling.sql_tracer() if profiling is not None else None
+
+
+def _server_lock(name: str):
+    """api.shared_state.lock(name) with several workers, else a no-op context"""
+    if not SHARED_STATE:
+        return nullcontext()
+    from api import shared_state
+    return shared_state.lock(name)
+
+
+def _encode_cursor(values: tuple) -> str:
+    """Opaque keyset cursor for the last row of a page"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+# Cursor element types; bools are JSON true/false and never valid
+_NUMBER = (int, float)
+
+
+def _decode_cursor(cursor: str, types: tuple) -> tuple:
+    """Values of a cursor from _encode_cursor, one per entry of ``types``"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    for value, expected in zip(values, types):
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError("Invalid cursor")
+    return tuple(values)
+
+
+def _window_start(period: str, when: datetime) -> datetime:
+    day = when.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "daily":
+        return day
+    if period == "weekly":
+        return day - timedelta(days=day.weekday())
+    if period == "monthly":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown leaderboard window: {period}")
+
 
 class ArcadeDatabase:
-    def __init__(self, db_path: str = None):
-        # Use temporary directory for Vercel serverless environment
+    def __init__(self, db_path: str = None, snapshot_path: str = None,
+                 shard_by_game: bool = None):
+        # ARCADE_DB_PATH should point at durable storage; the temporary
+        # directory fallback is wiped on every redeploy or serverless recycle
+        if db_path is None:
+            db_path = os.environ.get("ARCADE_DB_PATH")
         if db_path is None:
             import tempfile
-            self.db_path = os.path.join(tempfile.gettempdir(), "arcade.db")
-        else:
-            self.db_path = db_path
+            db_path = os.path.join(tempfile.gettempdir(), "arcade.db")
+        self.db_path = db_path
+        # Compressed snapshot restored when db_path is missing at startup
+        self.snapshot_path = snapshot_path or os.environ.get("ARCADE_SNAPSHOT_PATH")
+        if shard_by_game is None:
+            shard_by_game = os.environ.get("ARCADE_DB_SHARDS") == "1"
+        self.shard_by_game = shard_by_game
         # Defer init to startup so import never fails in serverless
         self._inited = False
+        # Bumped after every leaderboard / AI data (ai_metrics, ai_feedback)
+        # write; cached rankings and HTTP ETags are keyed by them
+        self._leaderboard_version = 0
+        self._metrics_version = 0
+        started = datetime.now(timezone.utc).isoformat()
+        self._leaderboard_updated_at = started
+        self._metrics_updated_at = started
+        self._rankings_cache = {}
+        # With several workers the leaderboard version lives in shared
+        # memory, so a write in one invalidates every worker's caches
+        self._shared_version = self._shared_metrics_version = None
+        if SHARED_STATE:
+            from api import shared_state
+            self._shared_version = shared_state.counter("leaderboard_version")
+            self._shared_metrics_version = shared_state.counter("metrics_version")
+        self._leaderboard_listeners: List[Callable[[Optional[str], Optional[int]], None]] = []
+        # One long-lived writer per file, used under that file's lock so
+        # writes from this process never contend with each other; reads use
+        # pooled query_only connections, which never block (or are blocked
+        # by) them. Keys are the game shard, None for the main file.
+        self._write_lock = threading.Lock()
+        self._shard_locks = {shard: threading.Lock() for shard in self._shards()[1:]}
+        self._write_conns: Dict[Optional[str], sqlite3.Connection] = {}
+        self._idle_readers: Dict[Optional[str], deque] = {shard: deque() for shard in self._shards()}
+
+    @property
+    def leaderboard_version(self) -> int:
+        if self._shared_version is not None:
+            return self._shared_version.value
+        return self._leaderboard_version
+
+    @property
+    def metrics_version(self) -> int:
+        if self._shared_metrics_version is not None:
+            return self._shared_metrics_version.value
+        return self._metrics_version
+
+    @property
+    def leaderboard_updated_at(self) -> str:
+        if self._shared_version is not None:
+            return datetime.fromtimestamp(self._shared_version.updated_at, timezone.utc).isoformat()
+        return self._leaderboard_updated_at
+
+    @property
+    def metrics_updated_at(self) -> str:
+        if self._shared_metrics_version is not None:
+            return datetime.fromtimestamp(self._shared_metrics_version.updated_at, timezone.utc).isoformat()
+        return self._metrics_updated_at
+
+    def add_leaderboard_listener(self, listener: Callable[[Optional[str], Optional[int]], None]):
+        """Call ``listener(game_type, score)`` after each committed leaderboard entry
+
+        Listeners run on the writer's thread. (None, None) means any game
+        may have changed, e.g. after moving tables between files.
+        """
+        self._leaderboard_listeners.append(listener)
+
+    def _leaderboard_changed(self, game_type: Optional[str] = None, score: Optional[int] = None):
+        self._leaderboard_updated_at = datetime.now(timezone.utc).isoformat()
+        self._leaderboard_version += 1
+        if self._shared_version is not None:
+            self._shared_version.increment()
+        for listener in self._leaderboard_listeners:
+            try:
+                listener(game_type, score)
+            except Exception as e:
+                # The entry is committed either way; a listener must not fail the write
+                print(f"⚠️  Leaderboard listener failed: {e}")  # noqa: T201
+
+    def _metrics_changed(self):
+        """After a write to the AI data (ai_metrics, ai_feedback) behind the stats endpoints"""
+        self._metrics_updated_at = datetime.now(timezone.utc).isoformat()
+        self._metrics_version += 1
+        if self._shared_metrics_version is not None:
+            self._shared_metrics_version.increment()
+
+    def _shards(self) -> List[Optional[str]]:
+        return [None, *SHARDED_GAMES] if self.shard_by_game else [None]
+
+    @property
+    def db_files(self) -> List[str]:
+        """The main database file, then one file per game when sharded"""
+        return [shard_path(self.db_path, shard) for shard in self._shards()]
+
+    def _shard(self, game_type: Optional[str]) -> Optional[str]:
+        """The shard holding ``game_type``'s tables; None means the main file"""
+        if not self.shard_by_game or game_type is None:
+            return None
+        if game_type not in self._shard_locks:
+            raise ValueError(f"Unknown game type: {game_type}")
+        return game_type
+
+    def _connect(self, shard: Optional[str] = None, read_only: bool = False) -> sqlite3.Connection:
+        # Pooled connections move between threadpool workers, one at a time
+        conn = sqlite3.connect(shard_path(self.db_path, shard), check_same_thread=False)
+        if shard is not None:
+            # Unqualified names resolve to the shard first and then to the
+            # main file, so the same SQL runs against either layout
+            conn.execute(f'ATTACH DATABASE ? AS {SHARED_SCHEMA}', (self.db_path,))
+        if read_only:
+            conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    @contextmanager
+    def _writer(self, game_type: str = None, shared: bool = True) -> Iterator[sqlite3.Connection]:
+        """The writer for ``game_type``'s file; commits on exit, rolls back on error
+
+        When sharded, ``shared=False`` declares that the transaction only
+        touches the game's own tables: it skips the main file's lock and
+        commits alongside other games' writes. Transactions that also
+        update players or rankings commit each file atomically, not the
+        pair (SQLite's WAL limit for attached databases).
+        """
+        shard = self._shard(game_type)
+        with ExitStack() as locks:
+            # Always shard lock first, then the main one
+            if shard is not None:
+                locks.enter_context(self._shard_locks[shard])
+            if shard is None or shared:
+                locks.enter_context(self._write_lock)
+            conn = self._write_conns.get(shard)
+            if conn is None:
+                conn = self._write_conns[shard] = self._connect(shard)
+            # Slow-request recorder: log this request's SQL when it is being captured
+            conn.set_trace_callback(_sql_tracer())
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def _reader(self, game_type: str = None) -> Iterator[sqlite3.Connection]:
+        """A read-only connection to ``game_type``'s file from the pool"""
+        shard = self._shard(game_type)
+        idle = self._idle_readers[shard]
+        try:
+            conn = idle.pop()
+        except IndexError:
+            conn = self._connect(shard, read_only=True)
+        conn.set_trace_callback(_sql_tracer())
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if len(idle) < MAX_IDLE_READERS:
+                idle.append(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        """Close pooled connections; they are reopened on next use"""
+        with ExitStack() as locks:
+            for lock in (*self._shard_locks.values(), self._write_lock):
+                locks.enter_context(lock)
+            for conn in self._write_conns.values():
+                conn.close()
+            self._write_conns.clear()
+        for idle in self._idle_readers.values():
+            while idle:
+                try:
+                    idle.pop().close()
+                except IndexError:
+                    break
+
+    @property
+    def idle_readers(self) -> int:
+        return sum(len(idle) for idle in self._idle_readers.values())
 
     def init_database(self):
         """Initialize the database with required tables"""
         if self._inited:
             return
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Workers starting together must not restore a snapshot over a
+        # database another one has already opened
+        with self._write_lock, _server_lock("init_database"):
+            if not self._inited:
+                if self.snapshot_path:
+                    from api import snapshots
+                    for shard in self._shards():
+                        snapshots.restore_snapshot(shard_path(self.snapshot_path, shard),
+                                                   shard_path(self.db_path, shard))
+                self._create_schema()
+                self._inited = True
+
+    def _create_schema(self):
+        for shard in self._shards():
+            conn = self._connect(shard)
+            cursor = conn.cursor()
+
+            # WAL lets snapshots (and readers) run alongside writers; the mode is
+            # stored in the file, so this is a no-op after the first run
+            cursor.execute('PRAGMA journal_mode=WAL')
+
+            # One pragma read per file lets warm containers and restarts skip all DDL
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] != SCHEMA_VERSION:
+                seed_rankings = False
+                if shard is None:
+                    seed_rankings = self._create_shared_tables(cursor)
+                if shard is not None or not self.shard_by_game:
+                    self._create_game_tables(cursor)
+                # Sharded files start empty; scripts/shard_database.py moves
+                # an existing single-file leaderboard over
+                if seed_rankings and not self.shard_by_game:
+                    self._seed_player_rankings(cursor)
+                cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+                conn.commit()
+            conn.close()
 
+    def _create_shared_tables(self, cursor) -> bool:
+        """Players and cross-game aggregates; True when rankings are new"""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS players (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,7 +368,102 @@ class ArcadeDatabase:
                 total_score INTEGER DEFAULT 0
             )
         ''')
+        # Schema version 2 stored player keys as they were; anything but a
+        # game's own session id (a UUID) or a public id is one of those
+        cursor.connection.create_function("player_public_id", 1, player_public_id, deterministic=True)
+        cursor.execute('''
+            UPDATE players SET session_id = player_public_id(session_id)
+            WHERE session_id NOT LIKE 'player-%'
+              AND NOT (length(session_id) = 36 AND substr(session_id, 9, 1) = '-'
+                       AND substr(session_id, 14, 1) = '-' AND substr(session_id, 19, 1) = '-'
+                       AND substr(session_id, 24, 1) = '-')
+        ''')
+
+        # Per-game rollup of finished sessions, maintained by end_game_session
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS player_game_stats (
+                player_id INTEGER NOT NULL,
+                game_type TEXT NOT NULL,
+                games_played INTEGER DEFAULT 0,
+                total_score INTEGER DEFAULT 0,
+                best_score INTEGER DEFAULT 0,
+                last_played TIMESTAMP,
+                PRIMARY KEY (player_id, game_type),
+                FOREIGN KEY (player_id) REFERENCES players (id)
+            )
+        ''')
+
+        # Per-player best score per game and their cross-game sum, kept in
+        # step with the leaderboard so rankings never aggregate at read time
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player_rankings'"
+        )
+        seed_rankings = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_bests (
+                player_id INTEGER NOT NULL,
+                game_type TEXT NOT NULL,
+                score INTEGER NOT NULL,
+                difficulty REAL NOT NULL,
+                achieved_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (player_id, game_type),
+                FOREIGN KEY (player_id) REFERENCES players (id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS player_rankings (
+                player_id INTEGER PRIMARY KEY,
+                total_score INTEGER NOT NULL DEFAULT 0,
+                games_played INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY (player_id) REFERENCES players (id)
+            )
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_player_rankings_order
+            ON player_rankings (total_score DESC, player_id DESC)
+        ''')
+
+        # Each player's Glicko rating per game (api.ratings), updated as
+        # sessions end; scripts/rerate_players.py rebuilds it from history
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS player_ratings (
+                player_id INTEGER NOT NULL,
+                game_type TEXT NOT NULL,
+                rating REAL NOT NULL,
+                rd REAL NOT NULL,
+                games INTEGER NOT NULL DEFAULT 0,
+                rated_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (player_id, game_type),
+                FOREIGN KEY (player_id) REFERENCES players (id)
+            )
+        ''')
 
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ai_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                game_type TEXT NOT NULL,
+                difficulty_level REAL NOT NULL,
+                win_rate REAL NOT NULL,
+                avg_game_duration REAL,
+                total_games INTEGER DEFAULT 0,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Random keys every worker (and the next deploy) must agree on
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS server_secrets (
+                name TEXT PRIMARY KEY,
+                value BLOB NOT NULL
+            )
+        ''')
+
+        return seed_rankings
+
+    def _create_game_tables(self, cursor):
+        """The per-game, high-volume tables (a shard's whole schema)"""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS game_sessions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,9 +473,15 @@ class ArcadeDatabase:
                 session_end TIMESTAMP,
                 final_score INTEGER DEFAULT 0,
                 ai_difficulty REAL DEFAULT 0.5,
+                result REAL,
                 FOREIGN KEY (player_id) REFERENCES players (id)
             )
         ''')
+        # The player's score for the game (api.ratings.game_result); added in
+        # schema version 2, so older files get the column here
+        cursor.execute('PRAGMA table_info(game_sessions)')
+        if 'result' not in {column[1] for column in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE game_sessions ADD COLUMN result REAL')
 
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS ai_feedback (
@@ -76,71 +513,449 @@ class ArcadeDatabase:
         ''')
 
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS ai_metrics (
+            CREATE INDEX IF NOT EXISTS idx_game_sessions_player
+            ON game_sessions (player_id, session_start DESC, id DESC)
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_rank
+            ON leaderboard (game_type, score DESC, achieved_at DESC, id DESC)
+        ''')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_game_time
+            ON leaderboard (game_type, achieved_at)
+        ''')
+
+        # rating_history's legacy results look sessions up here (schema version 4)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_session
+            ON leaderboard (session_id)
+        ''')
+
+        # Top-K per (game, window); only the current bucket of each window is kept
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leaderboard_windows'"
+        )
+        seed_windows = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_windows (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 game_type TEXT NOT NULL,
-                difficulty_level REAL NOT NULL,
-                win_rate REAL NOT NULL,
-                avg_game_duration REAL,
-                total_games INTEGER DEFAULT 0,
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                player_id INTEGER,
+                score INTEGER NOT NULL,
+                difficulty REAL NOT NULL,
+                achieved_at TIMESTAMP NOT NULL,
+                session_id INTEGER,
+                FOREIGN KEY (player_id) REFERENCES players (id),
+                FOREIGN KEY (session_id) REFERENCES game_sessions (id)
             )
         ''')
 
-        conn.commit()
-        conn.close()
-        self._inited = True
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_windows_rank
+            ON leaderboard_windows (game_type, period, bucket, score DESC, achieved_at DESC)
+        ''')
+        if seed_windows:
+            self._seed_leaderboard_windows(cursor)
+
+    @timed_db()
+    def snapshot(self, path: str = None) -> Dict:
+        """Write a compressed online snapshot without blocking writers for long"""
+        path = path or self.snapshot_path
+        if not path:
+            raise ValueError("No snapshot path configured")
+        self.init_database()
+        from api import snapshots
+        with self._reader() as conn:
+            result = snapshots.write_snapshot(conn, path)
+        if self.shard_by_game:
+            # Each file's copy is consistent; the set is not taken atomically
+            result["shards"] = {}
+            for game_type in SHARDED_GAMES:
+                with self._reader(game_type) as conn:
+                    result["shards"][game_type] = snapshots.write_snapshot(
+                        conn, shard_path(path, game_type))
+        return result
+
+    def _seed_leaderboard_windows(self, cursor):
+        """Fill the current window buckets from existing all-time entries"""
+        now = _utcnow()
+        cursor.execute('SELECT DISTINCT game_type FROM leaderboard')
+        for (game_type,) in cursor.fetchall():
+            for period in LEADERBOARD_WINDOWS:
+                cursor.execute('''
+                    INSERT INTO leaderboard_windows
+                    (game_type, period, bucket, player_id, score, difficulty,
+                     achieved_at, session_id)
+                    SELECT game_type, ?, ?, player_id, score, difficulty,
+                           achieved_at, session_id
+                    FROM leaderboard
+                    WHERE game_type = ? AND achieved_at >= ?
+                    ORDER BY score DESC, achieved_at DESC
+                    LIMIT ?
+                ''', (period, _window_bucket(period, now), game_type,
+                      _sql_timestamp(_window_start(period, now)), WINDOW_TOP_K))
+
+    def _seed_player_rankings(self, cursor):
+        """Build per-player bests and cross-game totals from the leaderboard"""
+        # Bare columns with MAX() come from the row holding the maximum
+        cursor.execute('''
+            INSERT INTO leaderboard_bests
+            (player_id, game_type, score, difficulty, achieved_at)
+            SELECT player_id, game_type, MAX(score), difficulty, achieved_at
+            FROM leaderboard
+            WHERE player_id IS NOT NULL
+            GROUP BY player_id, game_type
+        ''')
+        cursor.execute('''
+            INSERT INTO player_rankings (player_id, total_score, games_played)
+            SELECT player_id, SUM(score), COUNT(*)
+            FROM leaderboard_bests
+            GROUP BY player_id
+        ''')
 
+    @timed_db(write=True)
     def create_player(self, session_id: str) -> int:
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id FROM players WHERE session_id = ?', (session_id,))
-        row = cursor.fetchone()
-        if row:
-            conn.close()
-            return row[0]
+        with self._writer() as conn:
+            cursor = conn.cursor()
+            player_id = self._upsert_player(cursor, session_id)
+        return player_id
+
+    def _upsert_player(self, cursor, session_id: str) -> int:
+        if _HAS_RETURNING:
+            cursor.execute('''
+                INSERT INTO players (session_id, last_played)
+                VALUES (?, CURRENT_TIMESTAMP)
+                ON CONFLICT (session_id) DO UPDATE SET last_played = excluded.last_played
+                RETURNING id
+            ''', (session_id,))
+            return cursor.fetchone()[0]
         cursor.execute('''
             INSERT INTO players (session_id, last_played)
             VALUES (?, CURRENT_TIMESTAMP)
+            ON CONFLICT (session_id) DO UPDATE SET last_played = excluded.last_played
         ''', (session_id,))
-        player_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return player_id
+        cursor.execute('SELECT id FROM players WHERE session_id = ?', (session_id,))
+        return cursor.fetchone()[0]
 
+    @timed_db(write=True)
     def start_game_session(self, player_id: int, game_type: str, ai_difficulty: float = 0.5) -> int:
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._writer(game_type, shared=False) as conn:
+            cursor = conn.cursor()
+            session_id = self._insert_game_session(cursor, player_id, game_type, ai_difficulty)
+        return session_id
+
+    def _insert_game_session(self, cursor, player_id: int, game_type: str,
+                             ai_difficulty: float) -> int:
         cursor.execute('''
             INSERT INTO game_sessions (player_id, game_type, ai_difficulty)
             VALUES (?, ?, ?)
         ''', (player_id, game_type, ai_difficulty))
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return session_id
+        return cursor.lastrowid
 
-    def end_game_session(self, session_id: int, final_score: int):
+    @timed_db(write=True)
+    def begin_session(self, session_id: str, game_type: str,
+                      ai_difficulty: float = 0.5) -> Tuple[int, int]:
+        """Create (or touch) the player and open a game session in one commit"""
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._writer(game_type) as conn:
+            cursor = conn.cursor()
+            player_id = self._upsert_player(cursor, session_id)
+            game_session_id = self._insert_game_session(cursor, player_id, game_type, ai_difficulty)
+        return player_id, game_session_id
+
+    @timed_db(write=True)
+    def end_game_session(self, session_id: int, final_score: int, game_type: str = None):
+        if self.shard_by_game and game_type is None:
+            raise ValueError("game_type is required when the database is sharded by game")
+        self.init_database()
+        with self._writer(game_type) as conn:
+            cursor = conn.cursor()
+            self._end_game_session(cursor, session_id, final_score)
+
+    def _end_game_session(self, cursor, session_id: int, final_score: int,
+                          result: Optional[float] = None) -> Tuple[bool, Optional[Dict]]:
+        """End the session if still open
+
+        Returns whether this call ended it, and the player's new rating if rated.
+        """
         cursor.execute('''
             UPDATE game_sessions 
-            SET session_end = CURRENT_TIMESTAMP, final_score = ?
+            SET session_end = CURRENT_TIMESTAMP, final_score = ?, result = ?
+            WHERE id = ? AND session_end IS NULL
+        ''', (final_score, result, session_id))
+        if cursor.rowcount != 1:
+            return False, None
+        return True, self._apply_session_aggregates(cursor, session_id, final_score)
+
+    @timed_db(write=True)
+    def finish_session(self, game_session_id: int, player_id: int, game_type: str,
+                       final_score: int, difficulty: float, ranked: bool,
+                       learning_data: Dict = None,
+                       result: Optional[float] = None) -> Tuple[bool, Optional[Dict]]:
+        """End a session, record its leaderboard entry and final AI feedback in one commit
+
+        Returns whether this call ended the session, and with a ``result``
+        (the player's score, 0..1) the player's rating, updated in the same
+        commit. A session that had already ended (a repeated or concurrent
+        call) is left as it is: nothing is recorded twice.
+        """
+        self.init_database()
+        with self._writer(game_type) as conn:
+            cursor = conn.cursor()
+            ended, rating = self._end_game_session(cursor, game_session_id, final_score, result)
+            ranked = ranked and ended
+            if ranked:
+                self._insert_leaderboard(cursor, player_id, game_type, final_score,
+                                         difficulty, game_session_id)
+            if ended and learning_data is not None:
+                self._insert_feedback(
+                    cursor, game_session_id, game_type,
+                    learning_data.get("player_action", ""),
+                    learning_data.get("ai_response", ""),
+                    learning_data.get("outcome", ""),
+                    learning_data.get("difficulty_level", 0.5),
+                    learning_data,
+                )
+        if ranked:
+            self._leaderboard_changed(game_type, final_score)
+        if ended and learning_data is not None:
+            self._metrics_changed()
+        return ended, rating
+
+    def _apply_session_aggregates(self, cursor, session_id: int, final_score: int) -> Optional[Dict]:
+        """Fold one finished session into the player's running totals and rating"""
+        cursor.execute(
+            '''SELECT player_id, game_type, session_end, ai_difficulty, result
+               FROM game_sessions WHERE id = ?''',
+            (session_id,)
+        )
+        player_id, game_type, session_end, difficulty, result = cursor.fetchone()
+        cursor.execute('''
+            UPDATE players
+            SET total_games = total_games + 1,
+                total_score = total_score + ?,
+                last_played = ?
             WHERE id = ?
-        ''', (final_score, session_id))
-        conn.commit()
-        conn.close()
+        ''', (final_score, session_end, player_id))
+        cursor.execute('''
+            INSERT INTO player_game_stats
+            (player_id, game_type, games_played, total_score, best_score, last_played)
+            VALUES (?, ?, 1, ?, ?, ?)
+            ON CONFLICT (player_id, game_type) DO UPDATE SET
+                games_played = games_played + 1,
+                total_score = total_score + excluded.total_score,
+                best_score = MAX(best_score, excluded.best_score),
+                last_played = excluded.last_played
+        ''', (player_id, game_type, final_score, final_score, session_end))
+        if result is None or player_id is None:
+            return None
+        return self._rate_player(cursor, player_id, game_type, difficulty, result, session_end)
+
+    def _rate_player(self, cursor, player_id: int, game_type: str, difficulty: float,
+                     result: float, played_at: str) -> Dict:
+        """One Glicko update from the player's stored rating (O(1), by primary key)"""
+        from api import ratings
+        cursor.execute('''
+            SELECT rating, rd, games, julianday(?) - julianday(rated_at)
+            FROM player_ratings WHERE player_id = ? AND game_type = ?
+        ''', (played_at, player_id, game_type))
+        row = cursor.fetchone()
+        if row is None:
+            rating, rd, games = ratings.INITIAL_RATING, ratings.INITIAL_RD, 0
+        else:
+            rating, rd, games = row[0], ratings.inflate(row[1], row[3]), row[2]
+        rating, rd = ratings.update(rating, rd, difficulty, result)
+        cursor.execute('''
+            INSERT INTO player_ratings (player_id, game_type, rating, rd, games, rated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (player_id, game_type) DO UPDATE SET
+                rating = excluded.rating,
+                rd = excluded.rd,
+                games = excluded.games,
+                rated_at = excluded.rated_at
+        ''', (player_id, game_type, rating, rd, games + 1, played_at))
+        return {'rating': rating, 'rd': rd, 'games': games + 1}
+
+    @timed_db()
+    def server_secret(self, name: str) -> bytes:
+        """The random 32-byte secret ``name``, created by whichever worker asks first"""
+        self.init_database()
+        with self._reader() as conn:
+            row = conn.execute('SELECT value FROM server_secrets WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            with self._writer() as conn:
+                conn.execute('INSERT OR IGNORE INTO server_secrets (name, value) VALUES (?, ?)',
+                             (name, os.urandom(32)))
+                row = conn.execute('SELECT value FROM server_secrets WHERE name = ?',
+                                   (name,)).fetchone()
+        return bytes(row[0])
+
+    def get_player_rating(self, player_key: str, game_type: str) -> Optional[Dict]:
+        """The rating for ``game_type`` of the player with ``player_key``, with RD
+        grown for the time since; None if unrated"""
+        self.init_database()
+        with self._reader() as conn:
+            row = conn.execute('''
+                SELECT r.rating, r.rd, r.games, julianday('now') - julianday(r.rated_at)
+                FROM players p
+                JOIN player_ratings r ON r.player_id = p.id AND r.game_type = ?
+                WHERE p.session_id = ?
+            ''', (game_type, player_public_id(player_key))).fetchone()
+        if row is None:
+            return None
+        from api import ratings
+        return {'rating': row[0], 'rd': ratings.inflate(row[1], row[3]), 'games': row[2]}
+
+    @timed_db()
+    def rating_history(self, game_type: str) -> List[Tuple[int, float, float, float]]:
+        """Rated finished sessions as (player_id, ai_difficulty, result, julianday
+        of session_end), in the order they started (a table scan, no sort)
+
+        Sessions ended before results were stored get one from what was
+        kept: a Ping-Pong game with a leaderboard entry was a win, and a
+        Tetris result comes from the final score.
+        """
+        if game_type == "pingpong":
+            legacy = ('CASE WHEN EXISTS (SELECT 1 FROM leaderboard l WHERE l.session_id = g.id) '
+                      'THEN 1.0 ELSE 0.0 END')
+        else:
+            from api.ratings import TETRIS_PAR_SCORE
+            legacy = f'MIN(1.0, MAX(final_score, 0) * 1.0 / {TETRIS_PAR_SCORE})'
+        self.init_database()
+        with self._reader(game_type) as conn:
+            return conn.execute(f'''
+                SELECT player_id, ai_difficulty, COALESCE(result, {legacy}), julianday(session_end)
+                FROM game_sessions g
+                WHERE game_type = ? AND session_end IS NOT NULL AND player_id IS NOT NULL
+                ORDER BY id
+            ''', (game_type,)).fetchall()
+
+    @timed_db(write=True)
+    def replace_ratings(self, game_type: str, rows: List[Tuple[int, float, float, int, float]]):
+        """Replace ``game_type``'s ratings with (player_id, rating, rd, games,
+        julianday of the last game) rows, in one transaction"""
+        self.init_database()
+        with self._writer() as conn:
+            conn.execute('DELETE FROM player_ratings WHERE game_type = ?', (game_type,))
+            conn.executemany('''
+                INSERT INTO player_ratings (player_id, game_type, rating, rd, games, rated_at)
+                VALUES (?, ?, ?, ?, ?, datetime(?))
+            ''', [(player_id, game_type, rating, rd, games, rated_at)
+                  for player_id, rating, rd, games, rated_at in rows])
 
+    @timed_db(write=True)
+    def backfill_player_aggregates(self) -> int:
+        """Recompute player totals from finished sessions; returns players updated"""
+        self.init_database()
+        if self.shard_by_game:
+            # Each shard's writer sees player_game_stats through ATTACH; the
+            # rebuild spans several commits, which is fine for a maintenance job
+            with self._writer() as conn:
+                conn.execute('DELETE FROM player_game_stats')
+            for game_type in SHARDED_GAMES:
+                with self._writer(game_type) as conn:
+                    self._backfill_game_stats(conn.cursor())
+        with self._writer() as conn:
+            cursor = conn.cursor()
+            if not self.shard_by_game:
+                cursor.execute('DELETE FROM player_game_stats')
+                self._backfill_game_stats(cursor)
+            cursor.execute('''
+                UPDATE players SET
+                    total_games = COALESCE((SELECT SUM(games_played) FROM player_game_stats s
+                                            WHERE s.player_id = players.id), 0),
+                    total_score = COALESCE((SELECT SUM(total_score) FROM player_game_stats s
+                                            WHERE s.player_id = players.id), 0),
+                    last_played = COALESCE((SELECT MAX(last_played) FROM player_game_stats s
+                                            WHERE s.player_id = players.id), last_played)
+            ''')
+            updated = cursor.rowcount
+        return updated
+
+    def _backfill_game_stats(self, cursor):
+        cursor.execute('''
+            INSERT INTO player_game_stats
+            (player_id, game_type, games_played, total_score, best_score, last_played)
+            SELECT player_id, game_type, COUNT(*), SUM(final_score),
+                   MAX(final_score), MAX(session_end)
+            FROM game_sessions
+            WHERE session_end IS NOT NULL AND player_id IS NOT NULL
+            GROUP BY player_id, game_type
+        ''')
+
+    @timed_db(write=True)
+    def move_games_to_shards(self) -> Dict[str, int]:
+        """Copy a single-file database's game tables into the (empty) shards
+
+        Returns rows copied per game. The originals stay in the main file,
+        where shard tables shadow them, so turning sharding back off returns
+        to the data as it was at migration time.
+        """
+        if not self.shard_by_game:
+            raise ValueError("The database is not sharded by game")
+        self.init_database()
+        copied = {}
+        for game_type in SHARDED_GAMES:
+            with self._writer(game_type) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT 1 FROM {SHARED_SCHEMA}.sqlite_master "
+                    "WHERE type = 'table' AND name = 'game_sessions'"
+                )
+                if cursor.fetchone() is None:
+                    return copied
+                copied[game_type] = 0
+                for table in GAME_TABLES:
+                    cursor.execute(f'SELECT 1 FROM main.{table} LIMIT 1')
+                    if cursor.fetchone() is not None:
+                        raise ValueError(f"The {game_type} shard already has {table} rows")
+                    cursor.execute(
+                        f'INSERT INTO main.{table} SELECT * FROM {SHARED_SCHEMA}.{table} '
+                        'WHERE game_type = ?', (game_type,)
+                    )
+                    copied[game_type] += cursor.rowcount
+        self._leaderboard_changed()
+        self._metrics_changed()
+        return copied
+
+    @timed_db(write=True)
     def record_ai_feedback(self, session_id: int, game_type: str,
                           player_action: str, ai_response: str,
                           outcome: str, difficulty_level: float,
                           learning_data: Dict = None):
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._writer(game_type, shared=False) as conn:
+            cursor = conn.cursor()
+            self._insert_feedback(cursor, session_id, game_type, player_action,
+                                  ai_response, outcome, difficulty_level, learning_data)
+        self._metrics_changed()
+
+    @timed_db(write=True)
+    def record_ai_feedback_many(self, game_type: str, rows: List[Tuple[int, Dict]]):
+        """Store (game session id, learning data) pairs in one transaction"""
+        self.init_database()
+        with self._writer(game_type, shared=False) as conn:
+            conn.executemany('''
+                INSERT INTO ai_feedback
+                (session_id, game_type, player_action, ai_response, outcome,
+                 difficulty_level, learning_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(session_id, game_type, data.get("player_action", ""),
+                   data.get("ai_response", ""), data.get("outcome", ""),
+                   data.get("difficulty_level", 0.5), json.dumps(data) if data else None)
+                  for session_id, data in rows])
+        self._metrics_changed()
+
+    def _insert_feedback(self, cursor, session_id: int, game_type: str,
+                         player_action: str, ai_response: str,
+                         outcome: str, difficulty_level: float,
+                         learning_data: Dict = None):
         learning_json = json.dumps(learning_data) if learning_data else None
         cursor.execute('''
             INSERT INTO ai_feedback 
@@ -149,82 +964,382 @@ class ArcadeDatabase:
             VALUES (?, ?, ?, ?, ?, ?, ?)
         ''', (session_id, game_type, player_action, ai_response,
               outcome, difficulty_level, learning_json))
-        conn.commit()
-        conn.close()
 
+    @timed_db(write=True)
     def update_leaderboard(self, player_id: int, game_type: str,
                           score: int, difficulty: float, session_id: int):
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._writer(game_type) as conn:
+            cursor = conn.cursor()
+            self._insert_leaderboard(cursor, player_id, game_type, score, difficulty, session_id)
+        self._leaderboard_changed(game_type, score)
+
+    def _insert_leaderboard(self, cursor, player_id: int, game_type: str,
+                            score: int, difficulty: float, session_id: int):
+        now = _utcnow()
+        achieved_at = _sql_timestamp(now)
         cursor.execute('''
             INSERT INTO leaderboard 
-            (player_id, game_type, score, difficulty, session_id)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (player_id, game_type, score, difficulty, session_id))
-        conn.commit()
-        conn.close()
+            (player_id, game_type, score, difficulty, achieved_at, session_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (player_id, game_type, score, difficulty, achieved_at, session_id))
+        for period in LEADERBOARD_WINDOWS:
+            bucket = _window_bucket(period, now)
+            # Roll off expired buckets; each holds at most WINDOW_TOP_K rows
+            cursor.execute('''
+                DELETE FROM leaderboard_windows
+                WHERE game_type = ? AND period = ? AND bucket < ?
+            ''', (game_type, period, bucket))
+            cursor.execute('''
+                INSERT INTO leaderboard_windows
+                (game_type, period, bucket, player_id, score, difficulty,
+                 achieved_at, session_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (game_type, period, bucket, player_id, score, difficulty,
+                  achieved_at, session_id))
+            cursor.execute('''
+                DELETE FROM leaderboard_windows WHERE id IN (
+                    SELECT id FROM leaderboard_windows
+                    WHERE game_type = ? AND period = ? AND bucket = ?
+                    ORDER BY score DESC, achieved_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (game_type, period, bucket, WINDOW_TOP_K))
+        self._update_player_best(cursor, player_id, game_type, score,
+                                 difficulty, achieved_at)
+
+    def _update_player_best(self, cursor, player_id: int, game_type: str,
+                            score: int, difficulty: float, achieved_at: str):
+        cursor.execute(
+            'SELECT score FROM leaderboard_bests WHERE player_id = ? AND game_type = ?',
+            (player_id, game_type)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute('''
+                INSERT INTO leaderboard_bests
+                (player_id, game_type, score, difficulty, achieved_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (player_id, game_type, score, difficulty, achieved_at))
+            gained, new_game = score, 1
+        elif score > row[0]:
+            cursor.execute('''
+                UPDATE leaderboard_bests
+                SET score = ?, difficulty = ?, achieved_at = ?
+                WHERE player_id = ? AND game_type = ?
+            ''', (score, difficulty, achieved_at, player_id, game_type))
+            gained, new_game = score - row[0], 0
+        else:
+            return
+        cursor.execute('''
+            INSERT INTO player_rankings (player_id, total_score, games_played)
+            VALUES (?, ?, ?)
+            ON CONFLICT (player_id) DO UPDATE SET
+                total_score = total_score + excluded.total_score,
+                games_played = games_played + excluded.games_played
+        ''', (player_id, gained, new_game))
 
+    @timed_db()
     def get_leaderboard(self, game_type: str, limit: int = 10) -> List[Dict]:
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT p.session_id, l.score, l.difficulty, l.achieved_at
-            FROM leaderboard l
-            JOIN players p ON l.player_id = p.id
-            WHERE l.game_type = ?
-            ORDER BY l.score DESC, l.achieved_at DESC
-            LIMIT ?
-        ''', (game_type, limit))
+        with self._reader(game_type) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT p.session_id, l.score, l.difficulty, l.achieved_at
+                FROM leaderboard l
+                JOIN players p ON l.player_id = p.id
+                WHERE l.game_type = ?
+                ORDER BY l.score DESC, l.achieved_at DESC, l.id DESC
+                LIMIT ?
+            ''', (game_type, limit))
+            results = []
+            for row in cursor.fetchall():
+                results.append({
+                    'session_id': row[0],
+                    'score': row[1],
+                    'difficulty': row[2],
+                    'achieved_at': row[3]
+                })
+        return results
+
+    @timed_db()
+    def get_leaderboard_page(self, game_type: str, limit: int = 10,
+                             cursor: Optional[str] = None) -> Dict:
+        """Keyset page over (score, achieved_at, id), newest first on ties"""
+        self.init_database()
+        with self._reader(game_type) as conn:
+            cur = conn.cursor()
+            if cursor is None:
+                cur.execute('''
+                    SELECT p.session_id, l.score, l.difficulty, l.achieved_at, l.id
+                    FROM leaderboard l
+                    JOIN players p ON l.player_id = p.id
+                    WHERE l.game_type = ?
+                    ORDER BY l.score DESC, l.achieved_at DESC, l.id DESC
+                    LIMIT ?
+                ''', (game_type, limit + 1))
+            else:
+                score, achieved_at, entry_id = _decode_cursor(cursor, (_NUMBER, str, int))
+                cur.execute('''
+                    SELECT p.session_id, l.score, l.difficulty, l.achieved_at, l.id
+                    FROM leaderboard l
+                    JOIN players p ON l.player_id = p.id
+                    WHERE l.game_type = ?
+                      AND (l.score, l.achieved_at, l.id) < (?, ?, ?)
+                    ORDER BY l.score DESC, l.achieved_at DESC, l.id DESC
+                    LIMIT ?
+                ''', (game_type, score, achieved_at, entry_id, limit + 1))
+            rows = cur.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = _encode_cursor((last[1], last[3], last[4]))
         results = []
-        for row in cursor.fetchall():
+        for row in rows:
             results.append({
                 'session_id': row[0],
                 'score': row[1],
                 'difficulty': row[2],
                 'achieved_at': row[3]
             })
-        conn.close()
-        return results
+        return {'entries': results, 'next_cursor': next_cursor}
+
+    @timed_db()
+    def get_session_history(self, session_id: str, limit: int = 10,
+                            cursor: Optional[str] = None) -> Optional[Dict]:
+        """Keyset page of a player's game sessions over (session_start, id)
+
+        Sharded ids repeat across files, so there the key is
+        (session_start, game_type, id) and each shard's page is merged.
+        """
+        self.init_database()
+        with self._reader() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT id FROM players WHERE session_id = ?', (session_id,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            player_id = row[0]
+            if not self.shard_by_game:
+                rows = self._session_rows(cur, player_id, limit, cursor)
+        if self.shard_by_game:
+            rows = []
+            for game_type in SHARDED_GAMES:
+                with self._reader(game_type) as conn:
+                    rows.extend(self._session_rows(conn.cursor(), player_id, limit, cursor))
+            rows.sort(key=lambda r: (r[2], r[1], r[0]), reverse=True)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            key = (last[2], last[1], last[0]) if self.shard_by_game else (last[2], last[0])
+            next_cursor = _encode_cursor(key)
+        results = []
+        for row in rows:
+            results.append({
+                'game_session_id': row[0],
+                'game_type': row[1],
+                'session_start': row[2],
+                'session_end': row[3],
+                'final_score': row[4],
+                'ai_difficulty': row[5]
+            })
+        return {'sessions': results, 'next_cursor': next_cursor}
+
+    def _session_rows(self, cur, player_id: int, limit: int,
+                      cursor: Optional[str]) -> List[tuple]:
+        if cursor is None:
+            cur.execute('''
+                SELECT id, game_type, session_start, session_end, final_score, ai_difficulty
+                FROM game_sessions
+                WHERE player_id = ?
+                ORDER BY session_start DESC, id DESC
+                LIMIT ?
+            ''', (player_id, limit + 1))
+        elif self.shard_by_game:
+            session_start, game_type, game_session_id = _decode_cursor(cursor, (str, str, int))
+            cur.execute('''
+                SELECT id, game_type, session_start, session_end, final_score, ai_difficulty
+                FROM game_sessions
+                WHERE player_id = ? AND (session_start, game_type, id) < (?, ?, ?)
+                ORDER BY session_start DESC, id DESC
+                LIMIT ?
+            ''', (player_id, session_start, game_type, game_session_id, limit + 1))
+        else:
+            session_start, game_session_id = _decode_cursor(cursor, (str, int))
+            cur.execute('''
+                SELECT id, game_type, session_start, session_end, final_score, ai_difficulty
+                FROM game_sessions
+                WHERE player_id = ? AND (session_start, id) < (?, ?)
+                ORDER BY session_start DESC, id DESC
+                LIMIT ?
+            ''', (player_id, session_start, game_session_id, limit + 1))
+        return cur.fetchall()
 
+    @timed_db()
+    def get_window_leaderboard(self, game_type: str, period: str,
+                               limit: int = 10) -> Dict:
+        """Top scores for the current daily/weekly/monthly window"""
+        self.init_database()
+        bucket = _window_bucket(period, _utcnow())
+        with self._reader(game_type) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT p.session_id, w.score, w.difficulty, w.achieved_at
+                FROM leaderboard_windows w
+                JOIN players p ON w.player_id = p.id
+                WHERE w.game_type = ? AND w.period = ? AND w.bucket = ?
+                ORDER BY w.score DESC, w.achieved_at DESC
+                LIMIT ?
+            ''', (game_type, period, bucket, min(limit, WINDOW_TOP_K)))
+            results = []
+            for row in cursor.fetchall():
+                results.append({
+                    'session_id': row[0],
+                    'score': row[1],
+                    'difficulty': row[2],
+                    'achieved_at': row[3]
+                })
+        return {'bucket': bucket, 'entries': results}
+
+    @timed_db()
+    def get_player_rankings(self, limit: int = 20,
+                            cursor: Optional[str] = None) -> Dict:
+        """Players ordered by the sum of their per-game best scores"""
+        version = self.leaderboard_version
+        key = (limit, cursor)
+        cached = self._rankings_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        self.init_database()
+        with self._reader() as conn:
+            cur = conn.cursor()
+            if cursor is None:
+                rank = 0
+                cur.execute('''
+                    SELECT r.player_id, p.session_id, r.total_score, r.games_played
+                    FROM player_rankings r
+                    JOIN players p ON p.id = r.player_id
+                    ORDER BY r.total_score DESC, r.player_id DESC
+                    LIMIT ?
+                ''', (limit + 1,))
+            else:
+                total_score, player_id, rank = _decode_cursor(cursor, (_NUMBER, int, int))
+                cur.execute('''
+                    SELECT r.player_id, p.session_id, r.total_score, r.games_played
+                    FROM player_rankings r
+                    JOIN players p ON p.id = r.player_id
+                    WHERE (r.total_score, r.player_id) < (?, ?)
+                    ORDER BY r.total_score DESC, r.player_id DESC
+                    LIMIT ?
+                ''', (total_score, player_id, limit + 1))
+            rows = cur.fetchall()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = _encode_cursor((rows[-1][2], rows[-1][0], rank + limit))
+
+            rankings = []
+            by_player = {}
+            for i, row in enumerate(rows):
+                entry = {
+                    'rank': rank + i + 1,
+                    'session_id': row[1],
+                    'games': {},
+                    'total_score': row[2],
+                    'games_played': row[3]
+                }
+                rankings.append(entry)
+                by_player[row[0]] = entry
+            if by_player:
+                placeholders = ','.join('?' * len(by_player))
+                cur.execute(f'''
+                    SELECT player_id, game_type, score, difficulty, achieved_at
+                    FROM leaderboard_bests WHERE player_id IN ({placeholders})
+                ''', tuple(by_player))
+                for row in cur.fetchall():
+                    by_player[row[0]]['games'][row[1]] = {
+                        'score': row[2],
+                        'difficulty': row[3],
+                        'achieved_at': row[4]
+                    }
+            cur.execute('SELECT COUNT(*) FROM player_rankings')
+            total_players = cur.fetchone()[0]
+
+        result = {
+            'rankings': rankings,
+            'total_players': total_players,
+            'next_cursor': next_cursor
+        }
+        if len(self._rankings_cache) >= 256:
+            self._rankings_cache.clear()
+        self._rankings_cache[key] = (version, result)
+        return result
+
+    @timed_db()
     def get_player_stats(self, session_id: str) -> Dict:
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT total_games, total_score, created_at, last_played
-            FROM players WHERE session_id = ?
-        ''', (session_id,))
-        row = cursor.fetchone()
-        conn.close()
-        if not row:
-            return None
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT total_games, total_score, created_at, last_played, id
+                FROM players WHERE session_id = ?
+            ''', (session_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute('''
+                SELECT game_type, games_played, total_score, best_score, last_played
+                FROM player_game_stats WHERE player_id = ?
+            ''', (row[4],))
+            games = {}
+            for game in cursor.fetchall():
+                games[game[0]] = {
+                    'games_played': game[1],
+                    'total_score': game[2],
+                    'best_score': game[3],
+                    'last_played': game[4]
+                }
+            cursor.execute('''
+                SELECT game_type, rating, rd, julianday('now') - julianday(rated_at)
+                FROM player_ratings WHERE player_id = ?
+            ''', (row[4],))
+            from api import ratings
+            for game_type, rating, rd, idle_days in cursor.fetchall():
+                if game_type in games:
+                    games[game_type]['rating'] = rating
+                    games[game_type]['rating_deviation'] = ratings.inflate(rd, idle_days)
         return {
             'total_games': row[0],
             'total_score': row[1],
             'created_at': row[2],
-            'last_played': row[3]
+            'last_played': row[3],
+            'games': games
         }
 
+    @timed_db()
     def get_ai_metrics(self, game_type: str) -> Dict:
         self.init_database()
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT difficulty_level, win_rate, avg_game_duration, total_games
-            FROM ai_metrics WHERE game_type = ?
-            ORDER BY difficulty_level
-        ''', (game_type,))
-        metrics = {}
-        for row in cursor.fetchall():
-            metrics[row[0]] = {
-                'win_rate': row[1],
-                'avg_game_duration': row[2],
-                'total_games': row[3]
-            }
-        conn.close()
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT difficulty_level, win_rate, avg_game_duration, total_games
+                FROM ai_metrics WHERE game_type = ?
+                ORDER BY difficulty_level
+            ''', (game_type,))
+            metrics = {}
+            for row in cursor.fetchall():
+                metrics[row[0]] = {
+                    'win_rate': row[1],
+                    'avg_game_duration': row[2],
+                    'total_games': row[3]
+                }
         return metrics
 
 # Global instance; init_database() is called at startup, not at import
 db = ArcadeDatabase()
+
+metrics.gauge("arcade_db_idle_readers", "Pooled read-only connections not in use").set_function(
+    (), lambda: db.idle_readers)
@@ -0,0 +1,45 @@
+"""
+JSON encoding for responses: orjson when it is installed, stdlib otherwise.
+
+Handlers on hot paths return ``FastJSONResponse`` directly, which skips
+FastAPI's ``jsonable_encoder`` walk; their bodies must already be plain
+dicts, lists, strings and numbers.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional speedup, see requirements.txt
+    orjson = None
+
+MEDIA_TYPE = "application/json"
+
+
+_stdlib_encoder = json.JSONEncoder(ensure_ascii=False, allow_nan=False,
+                                   separators=(",", ":"))
+
+
+def stdlib_dumps(content: Any) -> bytes:
+    return _stdlib_encoder.encode(content).encode("utf-8")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, option=_OPTIONS)
+else:
+    dumps = stdlib_dumps
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def encoded_response(body: bytes, status_code: int = 200) -> Response:
+    """Response for a body encoded once up front (e.g. at import time)"""
+    return Response(body, status_code=status_code, media_type=MEDIA_TYPE)
@@ -0,0 +1,243 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from api.http_cache import etag_matches
+
+_API_DIR = os.path.dirname(os.path.abspath(__file__))
+_STATIC = os.path.join(_API_DIR, "static")
+_ROOT_FRONTEND = os.path.join(os.path.dirname(_API_DIR), "frontend")
+
+
+@lru_cache(maxsize=None)
+def frontend_dir() -> str:
+    """api/static in the serverless bundle, else frontend/ at project root.
+
+    Resolved on first use so importing a route module never touches the disk.
+    """
+    return _STATIC if os.path.exists(os.path.join(_STATIC, "arcade")) else _ROOT_FRONTEND
+
+
+def frontend_file(*parts: str) -> str:
+    return os.path.join(frontend_dir(), *parts)
+
+
+# Precompressed siblings written by scripts/build_static.py, preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Files under assets/ carry a content hash in their name
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Content codings an Accept-Encoding header allows (q=0 excluded)"""
+    accepted = []
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.append(coding.strip().lower())
+    return accepted
+
+
+def precompressed(path: str, accept_encoding: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Best precompressed variant of ``path`` the client accepts, or ``path`` itself"""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, suffix in ENCODINGS:
+        if (encoding in accepted or "*" in accepted) and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+# Served from memory, by route path (see PageCache)
+PAGE_FILES = {
+    "/": ("arcade", "index.html"),
+    "/tetris": ("tetris", "index.html"),
+    "/pingpong": ("pingpong", "index.html"),
+}
+# Poll the page files and reload changed ones (local development)
+RELOAD = os.environ.get("ARCADE_STATIC_RELOAD") == "1"
+RELOAD_INTERVAL = 0.5
+
+
+@dataclass(slots=True)
+class CachedFile:
+    variants: Dict[Optional[str], Tuple[bytes, str]]  # encoding (None: identity) -> (body, ETag)
+    last_modified: str
+    modified: int  # whole seconds, as Last-Modified carries them
+    media_type: str
+
+
+class PageCache:
+    """Files read once into memory with their precompressed variants
+
+    After the first load a page view costs no filesystem calls: the body,
+    ETag (a content hash, so equal across workers and deploys) and
+    Last-Modified are all kept. A file missing at load time is remembered
+    as missing.
+    """
+
+    def __init__(self, files: Dict[str, Tuple[str, ...]], media_type: str = "text/html"):
+        self.files = files
+        self.media_type = media_type
+        self._entries: Dict[str, Optional[CachedFile]] = {}
+        # (mtime_ns, size) of the file and each variant, to notice changes
+        self._stamps: Dict[str, Tuple] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    def _stamp(self, path: str) -> Tuple:
+        stamps = []
+        for suffix in ("",) + tuple(suffix for _, suffix in ENCODINGS):
+            try:
+                stat = os.stat(path + suffix)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _read(self, key: str) -> Optional[CachedFile]:
+        # Imported on first load; cold starts that never serve a page skip them
+        import hashlib
+        from email.utils import formatdate
+
+        path = frontend_file(*self.files[key])
+        # Stamped before reading, so a change mid-read is picked up next poll
+        stamp = self._stamps[key] = self._stamp(path)
+        if stamp[0] is None:
+            return None
+        variants = {}
+        for encoding, suffix in ((None, ""),) + ENCODINGS:
+            try:
+                with open(path + suffix, "rb") as f:
+                    body = f.read()
+            except OSError:
+                continue
+            variants[encoding] = (body, '"' + hashlib.sha256(body).hexdigest()[:16] + '"')
+        modified = stamp[0][0] // 1_000_000_000
+        return CachedFile(variants, formatdate(modified, usegmt=True), modified, self.media_type)
+
+    def load(self) -> None:
+        with self._lock:
+            self._entries = {key: self._read(key) for key in self.files}
+            self._loaded = True
+
+    def get(self, key: str) -> Optional[CachedFile]:
+        if not self._loaded:
+            self.load()
+        return self._entries.get(key)
+
+    def response(self, request: Request, key: str) -> Optional[Response]:
+        """The page for ``key``, or None when its file does not exist
+
+        Pages keep their URL across deploys, so unlike the hashed assets
+        they link to they are revalidated on every load (a 304 when
+        unchanged).
+        """
+        cached = self.get(key)
+        if cached is None:
+            return None
+        accepted = accepted_encodings(request.headers.get("accept-encoding"))
+        encoding = next((encoding for encoding, _ in ENCODINGS if encoding in cached.variants
+                         and (encoding in accepted or "*" in accepted)), None)
+        body, etag = cached.variants[encoding]
+        headers = {"ETag": etag, "Last-Modified": cached.last_modified,
+                   "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            not_modified = etag_matches(if_none_match, etag)
+        else:
+            not_modified = _not_modified_since(request.headers.get("if-modified-since"), cached.modified)
+        if not_modified:
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type=cached.media_type, headers=headers)
+
+    def reload_changed(self) -> List[str]:
+        """Re-read the files whose stamp changed; returns their keys"""
+        changed = []
+        with self._lock:
+            for key, parts in self.files.items():
+                if self._stamps.get(key) != self._stamp(frontend_file(*parts)):
+                    # One assignment, so requests see the old entry or the new one
+                    self._entries[key] = self._read(key)
+                    changed.append(key)
+        return changed
+
+    def watch(self, interval: float = RELOAD_INTERVAL) -> None:
+        """Poll for changes in a daemon thread (idempotent)"""
+        if self._watcher is not None:
+            return
+        if not self._loaded:
+            self.load()
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                for key in self.reload_changed():
+                    print(f"🔄 Reloaded {key} from {frontend_file(*self.files[key])}")  # noqa: T201
+
+        self._watcher = threading.Thread(target=poll, name="page-cache-watch", daemon=True)
+        self._watcher.start()
+
+
+def _not_modified_since(if_modified_since: Optional[str], modified: int) -> bool:
+    if not if_modified_since:
+        return False
+    from email.utils import parsedate_tz, mktime_tz
+
+    parsed = parsedate_tz(if_modified_since)
+    return parsed is not None and mktime_tz(parsed) >= modified
+
+
+pages = PageCache(PAGE_FILES)
+
+
+# Pages and assets the service worker precaches, by URL
+PRECACHE_FILES = {
+    **PAGE_FILES,
+    "/frontend/manifest.json": ("manifest.json",),
+    "/frontend/icons/icon-192.png": ("icons", "icon-192.png"),
+    "/frontend/icons/icon-512.png": ("icons", "icon-512.png"),
+}
+
+
+@lru_cache(maxsize=None)
+def service_worker_script() -> Tuple[bytes, str]:
+    """service-worker.js with its precache manifest filled in, and its ETag
+
+    Each entry's revision is a hash of the file's bytes, so a changed shell
+    changes the script and browsers update only that entry.
+    """
+    # Imported on first use; only browsers registering the worker need them
+    import hashlib
+    import json
+
+    files = dict(PRECACHE_FILES)
+    # The built tree's hashed CSS, JS and fonts (see scripts/build_static.py)
+    if os.path.isdir(frontend_file("assets")):
+        for name in sorted(os.listdir(frontend_file("assets"))):
+            if not name.endswith((".br", ".gz")):
+                files["/frontend/assets/" + name] = ("assets", name)
+    manifest = []
+    for url, parts in files.items():
+        path = frontend_file(*parts)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                manifest.append({"url": url, "revision": hashlib.sha256(f.read()).hexdigest()[:16]})
+    with open(frontend_file("service-worker.js"), encoding="utf-8") as f:
+        source = f.read()
+    body = source.replace("self.__PRECACHE_MANIFEST", json.dumps(manifest)).encode()
+    return body, '"sw-' + hashlib.sha256(body).hexdigest()[:16] + '"'
@@ -0,0 +1,55 @@
+import uuid
+from typing import Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from api import SHARED_STATE
+from api.fast_json import FastJSONResponse
+
+# Versions are per process (or per server in multi-worker mode, where they
+# live in shared memory), so ETags carry a token for that scope to keep
+# two processes (or two deploys) from vouching for each other's bodies
+if SHARED_STATE:
+    from api import shared_state
+    _INSTANCE = shared_state.instance_token()
+else:
+    _INSTANCE = uuid.uuid4().hex[:8]
+
+DEFAULT_MAX_AGE = 2
+DEFAULT_STALE_WHILE_REVALIDATE = 30
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the state versions a response body is built from"""
+    return '"' + '-'.join([_INSTANCE, *map(str, parts)]) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        # If-None-Match uses weak comparison
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def conditional_json(request: Request, etag: str, build: Callable[[], Dict],
+                     max_age: int = DEFAULT_MAX_AGE,
+                     stale_while_revalidate: int = DEFAULT_STALE_WHILE_REVALIDATE) -> Response:
+    """Answer 304 when the client already has ``etag``, else build the body"""
+    headers = {
+        "ETag": etag,
+        # s-maxage is what the Vercel edge cache honours
+        "Cache-Control": (f"public, max-age={max_age}, s-maxage={max_age}, "
+                          f"stale-while-revalidate={stale_while_revalidate}")
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(build(), headers=headers)
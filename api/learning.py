@@ -0,0 +1,151 @@
+"""
+Learning pipeline: AI feedback is applied and stored off the request path.
+
+Action and end-session handlers submit a compact event (game session,
+player action, AI response, outcome, game context, time) and answer right
+away. One consumer task per game takes whatever has queued up, at most
+``BATCH_SIZE`` events, and on a worker thread feeds them to the game's
+agent (learn_from_outcome, in order) and writes them to ai_feedback in one
+transaction. Under load, batches grow instead of transactions multiplying.
+
+Queues are bounded by ``QUEUE_SIZE``: when one is full, new events are
+dropped and counted, as with load shedding. Submitting before the
+pipeline started (scripts, or ARCADE_LEARNING_ASYNC=0) processes the event
+inline, the old behaviour. Shutdown waits for the queues to drain.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from api import metrics
+
+ASYNC = os.environ.get("ARCADE_LEARNING_ASYNC", "1") == "1"
+QUEUE_SIZE = int(os.environ.get("ARCADE_LEARNING_QUEUE", 10000))
+BATCH_SIZE = int(os.environ.get("ARCADE_LEARNING_BATCH", 256))
+# How long shutdown waits for queued events to be stored
+DRAIN_TIMEOUT = 10.0
+
+# (game_session_id, player_action, ai_response, outcome, game_context, epoch seconds)
+Event = Tuple[int, str, str, str, Dict, float]
+
+events = metrics.counter("arcade_learning_events_total",
+                         "Learning events by result (queued, dropped, processed, failed, inline)",
+                         ("game", "result"))
+batch_sizes = metrics.histogram("arcade_learning_batch_size", "Events applied and stored per batch",
+                                ("game",), buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+lag = metrics.histogram("arcade_learning_lag_seconds", "Time from submitting an event to storing it",
+                        ("game",), buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+queue_depth = metrics.gauge("arcade_learning_queue_depth", "Learning events waiting", ("game",))
+
+
+def _agent(game_type: str):
+    from api.ai.difficulty_agent import pingpong_agent, tetris_agent
+    return {"pingpong": pingpong_agent, "tetris": tetris_agent}[game_type]
+
+
+def process(game_type: str, batch: List[Event]) -> List[Dict]:
+    """Apply a batch to the game's agent, then store it; returns the learning data"""
+    from api.database import db
+    agent = _agent(game_type)
+    learned = [agent.learn_from_outcome(player_action, ai_response, outcome, context, at)
+               for _, player_action, ai_response, outcome, context, at in batch]
+    db.record_ai_feedback_many(game_type, [(event[0], data) for event, data in zip(batch, learned)])
+    return learned
+
+
+class LearningPipeline:
+    """Bounded per-game queues and their consumer tasks on the server's event loop"""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._consumers: Dict[str, asyncio.Task] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def depth(self, game_type: str) -> int:
+        queue = self._queues.get(game_type)
+        return queue.qsize() if queue is not None else 0
+
+    def start(self):
+        """Call on the server's loop at startup"""
+        if not ASYNC:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queues.clear()
+        self._consumers.clear()
+
+    async def stop(self):
+        """Store everything queued (up to DRAIN_TIMEOUT), then end the consumers"""
+        if self._loop is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues.values())),
+                                   DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️  Learning pipeline stopped with "  # noqa: T201
+                  f"{sum(q.qsize() for q in self._queues.values())} events unsaved")
+        for task in self._consumers.values():
+            task.cancel()
+        await asyncio.gather(*self._consumers.values(), return_exceptions=True)
+        self._loop = None
+
+    def submit(self, game_type: str, game_session_id: int, player_action: str,
+               ai_response: str, outcome: str, game_context: Dict):
+        """Queue one event; safe from the loop and from threadpool handlers"""
+        event = (game_session_id, player_action, ai_response, outcome, game_context, time.time())
+        loop = self._loop
+        if loop is None:
+            events.inc((game_type, "inline"))
+            process(game_type, [event])
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._put(game_type, event)
+        else:
+            loop.call_soon_threadsafe(self._put, game_type, event)
+
+    def _put(self, game_type: str, event: Event):
+        queue = self._queues.get(game_type)
+        if queue is None:
+            queue = self._queues[game_type] = asyncio.Queue(self.queue_size)
+            self._consumers[game_type] = self._loop.create_task(self._consume(game_type, queue))
+            queue_depth.set_function((game_type,), lambda: self.depth(game_type))
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            events.inc((game_type, "dropped"))
+            return
+        events.inc((game_type, "queued"))
+
+    async def _consume(self, game_type: str, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await loop.run_in_executor(None, process, game_type, batch)
+            except Exception as e:
+                events.inc((game_type, "failed"), len(batch))
+                print(f"Learning batch error ({game_type}): {e}")  # noqa: T201
+            else:
+                events.inc((game_type, "processed"), len(batch))
+                batch_sizes.observe((game_type,), len(batch))
+                now = time.time()
+                for event in batch:
+                    lag.observe((game_type,), now - event[5])
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+
+pipeline = LearningPipeline()
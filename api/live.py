@@ -0,0 +1,215 @@
+"""
+Live leaderboard updates for /leaderboard/stream (Server-Sent Events).
+
+Committed leaderboard entries notify ``feed`` on the writer's thread. Only
+a score that can enter a game's top ``STREAM_TOP_K`` costs a read; the new
+top list is diffed against the cached one, encoded once as an SSE event and
+handed to ``hub``, which puts the same bytes on every subscriber's bounded
+queue. A subscriber whose queue is full is dropped: its stream ends and
+EventSource reconnects to a fresh snapshot, instead of one slow reader
+holding an ever-growing backlog.
+
+Idle viewers cost a queue and a parked coroutine each; nothing runs for
+them until the top of a leaderboard actually changes.
+
+With several workers, entries committed by another worker never reach this
+one's listener; while anyone is subscribed, ``feed`` polls the shared
+leaderboard version instead and re-reads the top lists when it moves.
+"""
+import asyncio
+import os
+import threading
+from typing import Dict, List, Optional, Set
+
+from api import SHARED_STATE, metrics
+from api.database import SHARDED_GAMES, ArcadeDatabase, db
+from api.fast_json import dumps
+
+STREAM_TOP_K = int(os.environ.get("ARCADE_STREAM_TOP_K", 10))
+# Events buffered per subscriber before it counts as too slow and is dropped
+STREAM_QUEUE_SIZE = int(os.environ.get("ARCADE_STREAM_QUEUE", 32))
+# Comment lines keep proxies from closing quiet streams
+KEEPALIVE_INTERVAL = 15.0
+# EventSource reconnect delay, in milliseconds
+RETRY_MS = 3000
+# Multi-worker mode: how often to look for other workers' leaderboard writes
+WORKER_POLL_INTERVAL = 0.5
+
+GAMES = SHARDED_GAMES
+
+_KEEPALIVE = b": keepalive\n\n"
+
+dropped = metrics.counter("arcade_stream_dropped_total",
+                          "Stream subscribers dropped for falling behind")
+published = metrics.counter("arcade_stream_events_total",
+                            "Leaderboard stream events encoded, by type", ("type",))
+
+
+def sse_event(event: str, data, event_id: Optional[int] = None) -> bytes:
+    head = f"id: {event_id}\nevent: {event}\n" if event_id is not None else f"event: {event}\n"
+    return head.encode() + b"data: " + dumps(data) + b"\n\n"
+
+
+class BroadcastHub:
+    """Fans encoded messages out to per-subscriber bounded asyncio queues
+
+    ``subscribe``/``unsubscribe`` run on the event loop; ``publish`` may be
+    called from any thread.
+    """
+
+    def __init__(self, queue_size: int = STREAM_QUEUE_SIZE,
+                 keepalive_interval: float = KEEPALIVE_INTERVAL):
+        self.queue_size = queue_size
+        self.keepalive_interval = keepalive_interval
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._keepalive: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """A queue of encoded messages; ``None`` on it means the stream is over"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A new loop (e.g. a restarted server); queues on the old one are dead
+            self._subscribers.clear()
+            self._keepalive = None
+            self._loop = loop
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.add(queue)
+        if self._keepalive is None:
+            self._keepalive = loop.create_task(self._send_keepalives())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, message: bytes):
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fan_out, message)
+        except RuntimeError:
+            pass  # Loop closed; there is nobody left to tell
+
+    def _fan_out(self, message: bytes):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(queue)
+
+    def _drop(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        dropped.inc()
+        # Discard the backlog so the end-of-stream marker fits
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    async def _send_keepalives(self):
+        try:
+            while self._subscribers:
+                await asyncio.sleep(self.keepalive_interval)
+                self._fan_out(_KEEPALIVE)
+        finally:
+            if self._keepalive is asyncio.current_task():
+                self._keepalive = None
+
+
+class LeaderboardFeed:
+    """Tracks each game's top K while anyone listens and publishes changes
+
+    Events carry increasing ids. A new subscriber takes its queue before
+    reading the snapshot, so a change can show up in both; clients skip
+    deltas whose id is not above the snapshot's.
+    """
+
+    def __init__(self, database: ArcadeDatabase, hub: BroadcastHub, top_k: int = STREAM_TOP_K):
+        self.database = database
+        self.hub = hub
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._top: Dict[str, List[Dict]] = {}
+        self._snapshot: Optional[bytes] = None
+        self._event_id = 0
+        self._follower: Optional[asyncio.Task] = None
+        database.add_leaderboard_listener(self._on_change)
+
+    def follow_workers(self):
+        """Start polling for other workers' writes, if there are any (call on the loop)"""
+        if SHARED_STATE and self._follower is None:
+            self._follower = asyncio.get_running_loop().create_task(self._follow())
+
+    async def _follow(self):
+        loop = asyncio.get_running_loop()
+        seen = self.database.leaderboard_version
+        try:
+            while self.hub.subscriber_count:
+                await asyncio.sleep(WORKER_POLL_INTERVAL)
+                version = self.database.leaderboard_version
+                if version != seen:
+                    seen = version
+                    # Every game, re-read; _delta skips what this worker already sent
+                    await loop.run_in_executor(None, self._on_change, None, None)
+        finally:
+            self._follower = None
+
+    def snapshot_event(self) -> bytes:
+        """Every game's current top K, encoded once per change (reads the database)"""
+        with self._lock:
+            if self._snapshot is None:
+                for game_type in GAMES:
+                    if game_type not in self._top:
+                        self._top[game_type] = self.database.get_leaderboard(game_type, self.top_k)
+                self._snapshot = f"retry: {RETRY_MS}\n".encode() + sse_event(
+                    "snapshot", {"k": self.top_k, "games": self._top}, self._event_id)
+                published.inc(("snapshot",))
+            return self._snapshot
+
+    def _on_change(self, game_type: Optional[str], score: Optional[int]):
+        with self._lock:
+            if not self.hub.subscriber_count:
+                # Nobody listening: forget the cache rather than keep it current
+                self._top.clear()
+                self._snapshot = None
+                return
+            games = GAMES if game_type is None else (game_type,)
+            for game in games:
+                top = self._top.get(game)
+                if (top is not None and score is not None and len(top) >= self.top_k
+                        and score < top[-1]["score"]):
+                    continue  # Below the cut; the top K is unchanged
+                entries = self.database.get_leaderboard(game, self.top_k)
+                event = self._delta(game, top, entries)
+                self._top[game] = entries
+                if event is None:
+                    continue
+                self._snapshot = None
+                self._event_id += 1
+                published.inc((event[0],))
+                # Published under the lock so events reach queues in id order
+                self.hub.publish(sse_event(event[0], event[1], self._event_id))
+
+    @staticmethod
+    def _delta(game_type: str, old: Optional[List[Dict]], new: List[Dict]):
+        """(event type, data) turning ``old`` into ``new``, or None if equal"""
+        if old == new:
+            return None
+        if old is not None and len(new) in (len(old), len(old) + 1):
+            rank = next((i for i, (a, b) in enumerate(zip(old, new)) if a != b), len(old))
+            if rank < len(new) and new[rank + 1:] == old[rank:len(new) - 1]:
+                # One new entry at ``rank``; whatever falls past size drops off
+                return "insert", {"game_type": game_type, "rank": rank,
+                                  "entry": new[rank], "size": len(new)}
+        return "top", {"game_type": game_type, "entries": new}
+
+
+hub = BroadcastHub()
+feed = LeaderboardFeed(db, hub)
+
+metrics.gauge("arcade_stream_subscribers", "Open /leaderboard/stream connections").set_function(
+    (), lambda: hub.subscriber_count)
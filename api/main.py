@@ -1,47 +1,157 @@
 import os
 
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-from api.routes import tetris, pingpong, leaderboard
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, Response
+from api import SHARED_STATE, metrics
 from api.database import db
+from api.fast_json import FastJSONResponse, dumps, encoded_response
+from api.frontend import RELOAD as STATIC_RELOAD, frontend_dir, frontend_file, pages, service_worker_script
+from api.http_cache import etag_matches
+
+# Snapshot the database every N seconds (only when it changed) if
+# ARCADE_SNAPSHOT_PATH is set; a missing database is restored from it
+SNAPSHOT_INTERVAL = float(os.environ.get("ARCADE_SNAPSHOT_INTERVAL", "300"))
+# api.snapshots.SnapshotScheduler, created on startup when snapshots are on
+snapshot_scheduler = None
+
+# Fast-start (default on Vercel): routers, agents and the static mount are
+# imported on the first request instead of at cold start
+FAST_START = os.environ.get("ARCADE_FAST_START", "1" if os.environ.get("VERCEL") else "0") == "1"
+
+# Active sessions and agent state are checkpointed on shutdown and restored
+# on startup (api.checkpoint); off by default where there is no shutdown
+CHECKPOINT = os.environ.get("ARCADE_CHECKPOINT", "0" if FAST_START else "1") == "1"
 
 app = FastAPI(
     title="Satoshi's Arcade MCP",
     description="AI-powered retro arcade with adaptive learning",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
-# Handle serverless (api/static bundled) and local dev (frontend/ at root)
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-_STATIC = os.path.join(BASE_DIR, "static")
-_ROOT_FRONTEND = os.path.join(os.path.dirname(BASE_DIR), "frontend")
-FRONTEND_PATH = _STATIC if os.path.exists(os.path.join(_STATIC, "arcade")) else _ROOT_FRONTEND
+_routes_installed = False
+
+def install_routes():
+    """Mount static files and include the game routers (idempotent)"""
+    global _routes_installed
+    if _routes_installed:
+        return
+    _routes_installed = True
+
+    from api.static_files import PrecompressedStaticFiles
+    from api.routes import tetris, pingpong, leaderboard, admin
+
+    # Only mount static files if frontend directory exists (may be missing in serverless)
+    try:
+        if os.path.exists(frontend_dir()):
+            app.mount("/frontend", PrecompressedStaticFiles(directory=frontend_dir()), name="frontend")
+    except Exception:
+        pass  # Serverless may not have filesystem layout; routes still serve HTML via FileResponse
+
+    app.include_router(tetris.router)
+    app.include_router(pingpong.router)
+    app.include_router(leaderboard.router)
+    app.include_router(admin.router)
+
+class _DeferredRoutes:
+    """ASGI middleware that installs the routers before the first request"""
+
+    def __init__(self, app):
+        self.app = app
 
-# Only mount static files if frontend directory exists (may be missing in serverless)
-try:
-    if os.path.exists(FRONTEND_PATH):
-        app.mount("/frontend", StaticFiles(directory=FRONTEND_PATH), name="frontend")
-except Exception:
-    pass  # Serverless may not have filesystem layout; routes still serve HTML via FileResponse
+    async def __call__(self, scope, receive, send):
+        if not _routes_installed and scope["type"] != "lifespan":
+            install_routes()
+        await self.app(scope, receive, send)
 
-app.include_router(tetris.router)
-app.include_router(pingpong.router)
-app.include_router(leaderboard.router)
+class _DeferredProfiling:
+    """ASGI middleware that builds api.profiling's ProfilingMiddleware on the first request"""
+
+    def __init__(self, app):
+        self.app = app
+        self.profiling = None
+
+    async def __call__(self, scope, receive, send):
+        if self.profiling is None:
+            if scope["type"] == "lifespan":
+                await self.app(scope, receive, send)
+                return
+            from api.profiling import ProfilingMiddleware
+            self.profiling = ProfilingMiddleware(self.app)
+        await self.profiling(scope, receive, send)
+
+if FAST_START:
+    app.add_middleware(_DeferredRoutes)
+else:
+    install_routes()
+
+# Slow-request capture sits inside metrics; metrics is added last so it is
+# outermost and also times route installation
+app.add_middleware(_DeferredProfiling)
+app.add_middleware(metrics.MetricsMiddleware)
+
+def _elected_leader() -> bool:
+    """Whether this worker runs once-per-server jobs (always, with one worker)"""
+    if not SHARED_STATE:
+        return True
+    from api import shared_state
+    return shared_state.elect_leader()
 
 @app.on_event("startup")
 async def startup_event():
+    global snapshot_scheduler
+    # Loaded here rather than at import, to keep it out of the cold start
+    from api import learning
+    learning.pipeline.start()
+    # With several workers one of them snapshots for all
+    if db.snapshot_path and snapshot_scheduler is None and _elected_leader():
+        from api.snapshots import SnapshotScheduler
+        snapshot_scheduler = SnapshotScheduler(db, SNAPSHOT_INTERVAL)
+        snapshot_scheduler.start()
+    if STATIC_RELOAD:
+        pages.watch()
+    if FAST_START:
+        # Pages are read into memory on first view, and the schema checked
+        # (and any snapshot restored) on first database use, instead
+        return
+    pages.load()
     try:
         db.init_database()
     except Exception as e:
         print(f"Database initialization error: {e}")  # noqa: T201
+    if CHECKPOINT:
+        from api import checkpoint
+        try:
+            checkpoint.restore(db.db_path)
+        except Exception as e:
+            print(f"Session checkpoint restore error: {e}")  # noqa: T201
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Learn from and store queued feedback before the checkpoint and close
+    from api import learning
+    await learning.pipeline.stop()
+    if CHECKPOINT:
+        from api import checkpoint
+        try:
+            checkpoint.save()
+        except Exception as e:
+            print(f"Session checkpoint error: {e}")  # noqa: T201
+    # Final snapshot so a restart loses nothing written since the last tick
+    if snapshot_scheduler is not None:
+        snapshot_scheduler.stop()
+    db.close()
+    if SHARED_STATE:
+        from api import shared_state
+        shared_state.detach()
 
 @app.get("/")
-def home():
-    if os.path.exists(os.path.join(FRONTEND_PATH, "arcade", "index.html")):
-        return FileResponse(os.path.join(FRONTEND_PATH, "arcade", "index.html"))
+async def home(request: Request):
+    response = pages.response(request, "/")
+    if response is not None:
+        return response
     else:
         return {
             "message": "Satoshi's Arcade MCP API",
@@ -49,11 +159,32 @@ def home():
             "frontend": "not available in serverless mode"
         }
 
+@app.get("/service-worker.js", include_in_schema=False)
+def service_worker(request: Request):
+    """The service worker, from the root so its scope covers every page"""
+    if not os.path.exists(frontend_file("service-worker.js")):
+        return FastJSONResponse({"detail": "Not Found"}, status_code=404)
+    body, etag = service_worker_script()
+    # no-cache: browsers revalidate the worker on each check, which is how
+    # they notice a new precache manifest
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Service-Worker-Allowed": "/"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="text/javascript", headers=headers)
+
+# Constant body, encoded once
+_HEALTH_BODY = dumps({
+    "status": "healthy",
+    "message": "Satoshi's Arcade MCP is running",
+    "games": ["pingpong", "tetris"],
+    "version": "1.0.0"
+})
+
 @app.get("/health")
 def health_check():
-    return {
-        "status": "healthy",
-        "message": "Satoshi's Arcade MCP is running",
-        "games": ["pingpong", "tetris"],
-        "version": "1.0.0"
-    }
+    return encoded_response(_HEALTH_BODY)
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: per-route latency, DB timing, sessions and agents"""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,231 @@
+"""
+Prometheus-style metrics with no third-party dependencies.
+
+Everything here is stdlib-only so importing it never slows down a cold
+start. Updates are plain dict/list operations without locks: the HTTP
+middleware runs on the event loop thread, and the rare lost increment
+from two threadpool workers timing the database at the same instant is an
+acceptable price for keeping the hot path at a few microseconds.
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+            base = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{base} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples are read from callbacks at scrape time"""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._callbacks: Dict[Tuple, Callable[[], float]] = {}
+
+    def set_function(self, labels: Tuple, fn: Callable[[], float]):
+        self._callbacks[labels] = fn
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, fn in sorted(self._callbacks.items(), key=lambda item: item[0]):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+_registry: Dict[str, object] = {}
+
+
+def _register(metric):
+    return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def gauge(name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    return _register(Gauge(name, help, labelnames))
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_requests = _register(Counter(
+    "arcade_http_requests_total", "HTTP requests by route and status",
+    ("method", "route", "status")))
+http_latency = _register(Histogram(
+    "arcade_http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route")))
+db_latency = _register(Histogram(
+    "arcade_db_call_duration_seconds", "ArcadeDatabase call latency by method",
+    ("method",)))
+db_rows = _register(Counter(
+    "arcade_db_rows_total", "Rows returned by ArcadeDatabase reads",
+    ("method",)))
+db_errors = _register(Counter(
+    "arcade_db_errors_total", "ArcadeDatabase calls that raised",
+    ("method",)))
+
+_pending_writes = 0
+_pending_lock = threading.Lock()
+gauge("arcade_db_write_queue_depth",
+      "Database writes waiting for or holding the write lock").set_function(
+    (), lambda: _pending_writes)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request count, status and latency per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Route templates keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            http_latency.observe((method, route), elapsed)
+            http_requests.inc((method, route, status))
+
+
+def _row_count(result) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ("entries", "rankings", "sessions"):
+            if key in result:
+                return len(result[key])
+    return 1
+
+
+def timed_db(write: bool = False):
+    """Decorator recording call latency, rows and errors for a database method"""
+    def decorator(fn):
+        labels = (fn.__name__,)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _pending_writes
+            if write:
+                with _pending_lock:
+                    _pending_writes += 1
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                db_errors.inc(labels)
+                raise
+            finally:
+                db_latency.observe(labels, time.perf_counter() - start)
+                if write:
+                    with _pending_lock:
+                        _pending_writes -= 1
+            if not write:
+                db_rows.inc(labels, _row_count(result))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,204 @@
+"""
+On-demand profiling: a stack sampler for flamegraphs and a slow-request
+recorder. Both are off by default and toggled at runtime through the
+/admin routes, so no worker restart is needed.
+"""
+import asyncio
+import functools
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from fastapi.routing import APIRoute
+
+MAX_SLOW_REQUESTS = 50
+PROFILE_TOP_FUNCTIONS = 25
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples every thread's stack at a fixed interval (collapsed-stack output)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def sample(self, seconds: float, interval: float = 0.005) -> str:
+        """Block for ``seconds`` and return stacks as 'a;b;c count' lines"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already being collected")
+        try:
+            own = threading.get_ident()
+            stacks = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stacks[";".join(reversed(labels))] += 1
+                time.sleep(interval)
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        finally:
+            self._lock.release()
+
+
+class RequestCapture:
+    __slots__ = ("started", "sql", "profile")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql: List[Dict] = []
+        self.profile = None
+
+    def trace_sql(self, statement: str):
+        offset_ms = (time.perf_counter() - self.started) * 1000
+        self.sql.append({"at_ms": round(offset_ms, 3), "sql": " ".join(statement.split())})
+
+    def profile_text(self) -> Optional[str]:
+        if self.profile is None:
+            return None
+        import pstats
+
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        return out.getvalue()
+
+
+_capture: ContextVar[Optional[RequestCapture]] = ContextVar("arcade_request_capture", default=None)
+
+
+class SlowRequestRecorder:
+    def __init__(self):
+        self.threshold_ms: Optional[float] = None
+        self.records = deque(maxlen=MAX_SLOW_REQUESTS)
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None
+
+    def enable(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+
+    def disable(self):
+        self.threshold_ms = None
+
+    def record(self, scope, status: int, elapsed_ms: float, capture: RequestCapture):
+        self.records.append({
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(scope.get("route"), "path", None),
+            "status": status,
+            "duration_ms": round(elapsed_ms, 3),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "sql": capture.sql,
+            "profile": capture.profile_text()
+        })
+
+
+sampler = StackSampler()
+slow_requests = SlowRequestRecorder()
+
+
+def sql_tracer() -> Optional[Callable[[str], None]]:
+    """Trace callback for a new connection when the current request is captured"""
+    capture = _capture.get()
+    return capture.trace_sql if capture is not None else None
+
+
+class ProfilingMiddleware:
+    """Captures SQL and a handler profile per request while the recorder is on"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not slow_requests.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        capture = RequestCapture()
+        token = _capture.set(capture)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _capture.reset(token)
+            elapsed_ms = (time.perf_counter() - capture.started) * 1000
+            threshold = slow_requests.threshold_ms
+            if threshold is not None and elapsed_ms >= threshold:
+                slow_requests.record(scope, status, elapsed_ms, capture)
+
+
+def _start_profile(capture: RequestCapture):
+    # Imported on first capture so cold starts never pay for the profiler
+    import cProfile
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler per process; concurrent
+        # slow requests keep their SQL trace but skip the profile
+        return None
+    capture.profile = profile
+    return profile
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    """Run the endpoint under cProfile when its request is being captured"""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            capture = _capture.get()
+            profile = _start_profile(capture) if capture is not None else None
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.disable()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        # Sync endpoints run in the threadpool with a copy of the request context
+        capture = _capture.get()
+        profile = _start_profile(capture) if capture is not None else None
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.disable()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose endpoint can be profiled by the slow-request recorder"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
@@ -0,0 +1,156 @@
+"""
+Player skill ratings (Glicko-1) against the adaptive AI.
+
+Every finished game is a match between the player and the AI at the
+session's ai_difficulty: difficulty 0..1 is an opponent rated
+AI_RATING_LOW..AI_RATING_HIGH with a fixed, small rating deviation (the
+AI's strength at a given difficulty is known, only the player's is
+estimated). A Ping-Pong win scores 1 and a loss 0; a Tetris game scores
+its final score over TETRIS_PAR_SCORE, capped at 1.
+
+A player's rating and rating deviation (RD, the uncertainty) live in one
+player_ratings row per game, updated in the transaction that ends the
+session. RD grows back towards INITIAL_RD while a player is away, so a
+returning player's rating moves quickly again. New games start at the
+difficulty the player is expected to score TARGET_SCORE against,
+weighted by how sure the rating is, and at the agent's global
+difficulty otherwise.
+
+rerate() recomputes ratings from a game's whole history for
+scripts/rerate_players.py. Players are independent (the AI's rating at a
+difficulty is fixed), so with numpy it rates every player's k-th game in
+one step, reusing update(), which only uses arithmetic operators.
+"""
+import math
+import os
+from typing import List, Optional, Sequence, Tuple
+
+INITIAL_RATING = 1500.0
+INITIAL_RD = 350.0
+AI_RATING_LOW = 1100.0
+AI_RATING_HIGH = 1900.0
+AI_RD = 50.0
+# Days without a game for RD to grow from AI_RD back to INITIAL_RD
+RD_RECOVERY_DAYS = float(os.environ.get("ARCADE_RATING_RECOVERY_DAYS", 180))
+RD_GROWTH = (INITIAL_RD ** 2 - AI_RD ** 2) / RD_RECOVERY_DAYS
+# Expected player score new games are matched to (0.5: even odds)
+TARGET_SCORE = float(os.environ.get("ARCADE_RATING_TARGET", 0.5))
+TETRIS_PAR_SCORE = 2000
+
+_Q = math.log(10) / 400
+
+
+def _g(rd):
+    return 1 / (1 + 3 * _Q ** 2 * rd ** 2 / math.pi ** 2) ** 0.5
+
+
+_G_AI = _g(AI_RD)
+
+
+def ai_rating(difficulty):
+    """Rating of the AI playing at ``difficulty`` (0..1)"""
+    return AI_RATING_LOW + difficulty * (AI_RATING_HIGH - AI_RATING_LOW)
+
+
+def expected_score(rating, difficulty):
+    """The player's expected score against the AI at ``difficulty``"""
+    return 1 / (1 + 10 ** (-_G_AI * (rating - ai_rating(difficulty)) / 400))
+
+
+def inflate(rd: float, idle_days: float) -> float:
+    """RD after ``idle_days`` without a game"""
+    return min((rd ** 2 + RD_GROWTH * max(idle_days, 0.0)) ** 0.5, INITIAL_RD)
+
+
+def update(rating, rd, difficulty, score):
+    """(rating, rd) after one game scoring ``score`` (0..1) against the AI at ``difficulty``"""
+    expected = expected_score(rating, difficulty)
+    inverse_d2 = _Q ** 2 * _G_AI ** 2 * expected * (1 - expected)
+    precision = 1 / rd ** 2 + inverse_d2
+    return rating + _Q / precision * _G_AI * (score - expected), (1 / precision) ** 0.5
+
+
+def game_result(game_type: str, winner: Optional[str] = None, final_score: int = 0) -> Optional[float]:
+    """The player's score for a finished game, or None when it was not played out"""
+    if game_type == "pingpong":
+        return {"player": 1.0, "ai": 0.0}.get(winner)
+    if game_type == "tetris":
+        return min(1.0, max(final_score, 0) / TETRIS_PAR_SCORE)
+    return None
+
+
+def start_difficulty(difficulty: float, rating: float, rd: float) -> float:
+    """Blend the agent's ``difficulty`` towards the one matched to the player's rating
+
+    The matched difficulty is the one the player is expected to score
+    TARGET_SCORE against; its weight goes from 0 for an unrated player
+    (RD = INITIAL_RD) to 1 as RD approaches 0.
+    """
+    matched_rating = rating + 400 / _G_AI * math.log10(1 / TARGET_SCORE - 1)
+    matched = (matched_rating - AI_RATING_LOW) / (AI_RATING_HIGH - AI_RATING_LOW)
+    matched = max(0.0, min(1.0, matched))
+    confidence = max(0.0, min(1.0, 1 - rd / INITIAL_RD))
+    return difficulty + confidence * (matched - difficulty)
+
+
+def _by_player_and_time(row):
+    return row[0], row[3]
+
+
+def _rerate_sessions(history):
+    """rerate() one session at a time, as the live updates ran"""
+    players = {}
+    for player_id, difficulty, result, played_at in sorted(history, key=_by_player_and_time):
+        state = players.get(player_id)
+        if state is None:
+            rating, rd, games = INITIAL_RATING, INITIAL_RD, 0
+        else:
+            rating, rd, games, last = state
+            rd = inflate(rd, played_at - last)
+        rating, rd = update(rating, rd, difficulty, result)
+        players[player_id] = (rating, rd, games + 1, played_at)
+    return [(player_id, *state) for player_id, state in players.items()]
+
+
+def rerate(history: Sequence[Tuple[int, float, float, float]],
+           vectorized: bool = True) -> List[Tuple[int, float, float, int, float]]:
+    """Ratings from (player_id, ai_difficulty, result, julianday played) rows,
+    as (player_id, rating, rd, games, julianday of the last game)
+
+    Each player's games are rated by time, and rows played at the same
+    time in the order given. Vectorized with numpy when it is installed.
+    """
+    try:
+        import numpy as np
+    except ImportError:  # optional, for scripts/rerate_players.py only
+        np = None
+    if not vectorized or np is None or not history:
+        return _rerate_sessions(history)
+
+    data = np.array(history, dtype=np.float64)
+    # Stable, so ties keep their order
+    data = data[np.lexsort((data[:, 3], data[:, 0]))]
+    player_ids = data[:, 0].astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, player_ids[1:] != player_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(player_ids)])
+    player = np.repeat(np.arange(len(starts)), counts)
+    number = np.arange(len(player_ids)) - starts[player]
+    # Rows grouped by game number: round k is every player's k-th game
+    order = np.lexsort((player, number))
+    bounds = np.searchsorted(number[order], np.arange(counts.max() + 1))
+
+    rating = np.full(len(starts), INITIAL_RATING)
+    rd = np.full(len(starts), INITIAL_RD)
+    last = np.zeros(len(starts))
+    for k in range(counts.max()):
+        rows = order[bounds[k]:bounds[k + 1]]
+        who = player[rows]
+        played_at = data[rows, 3]
+        rd_now = rd[who]
+        if k:
+            rd_now = np.minimum((rd_now ** 2 + RD_GROWTH * np.maximum(played_at - last[who], 0.0)) ** 0.5,
+                                INITIAL_RD)
+        rating[who], rd[who] = update(rating[who], rd_now, data[rows, 1], data[rows, 2])
+        last[who] = played_at
+    return list(zip(player_ids[starts].tolist(), rating.tolist(), rd.tolist(),
+                    counts.tolist(), last.tolist()))
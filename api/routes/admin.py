@@ -0,0 +1,68 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from api.database import db
+from api.profiling import sampler, slow_requests
+from api.snapshots import BackupAborted
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin routes exist only when ARCADE_ADMIN_TOKEN is configured"""
+    expected = os.environ.get("ARCADE_ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profile")
+async def collect_profile(seconds: float = Query(10, gt=0, le=60),
+                          interval_ms: float = Query(5, ge=1, le=100)):
+    """Sample all worker threads for N seconds; returns collapsed stacks for flamegraph.pl/speedscope"""
+    if sampler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already being collected")
+    try:
+        stacks = await run_in_threadpool(sampler.sample, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        stacks,
+        headers={"Content-Disposition": 'attachment; filename="arcade-profile.collapsed"'}
+    )
+
+@router.get("/slow-requests")
+def get_slow_requests():
+    """Requests slower than the threshold, newest last, with their SQL and profile"""
+    return {
+        "enabled": slow_requests.enabled,
+        "threshold_ms": slow_requests.threshold_ms,
+        "records": list(slow_requests.records)
+    }
+
+@router.put("/slow-requests")
+def enable_slow_requests(threshold_ms: float = Query(..., gt=0)):
+    """Start capturing SQL and handler profiles for requests over threshold_ms"""
+    slow_requests.enable(threshold_ms)
+    return {"enabled": True, "threshold_ms": threshold_ms}
+
+@router.delete("/slow-requests")
+def disable_slow_requests():
+    """Stop capturing and clear recorded requests"""
+    slow_requests.disable()
+    slow_requests.records.clear()
+    return {"enabled": False}
+
+@router.post("/snapshot")
+def take_snapshot():
+    """Write a database snapshot now instead of waiting for the next interval"""
+    if not db.snapshot_path:
+        raise HTTPException(status_code=409, detail="ARCADE_SNAPSHOT_PATH is not set")
+    try:
+        return db.snapshot()
+    except BackupAborted as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -1,77 +1,140 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from typing import Dict, List, Optional
 import os
 import json
 
-from api.database import db
+from api import live
+from api.database import db, LEADERBOARD_WINDOWS, WINDOW_TOP_K
+from api.fast_json import FastJSONResponse
+from api.profiling import ProfiledRoute
+from api.http_cache import conditional_json, make_etag
 
-router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
+router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"], route_class=ProfiledRoute)
+
+# Bodies here are plain rows from the database, so routes return
+# FastJSONResponse directly instead of paying for jsonable_encoder
+
+MAX_PAGE_SIZE = 100
+
+GAME_NAMES = {
+    "pingpong": "Ping-Pong AI",
+    "tetris": "Tetris AI"
+}
 
 @router.get("")
-def get_global_leaderboard():
+def get_global_leaderboard(request: Request,
+                           limit: int = Query(5, ge=1, le=MAX_PAGE_SIZE)):
     """Get global leaderboard across all games"""
     try:
-        # Get leaderboards for each game type
-        pingpong_leaderboard = db.get_leaderboard("pingpong", 5)
-        tetris_leaderboard = db.get_leaderboard("tetris", 5)
-        
-        # Combine and format results
-        global_leaderboard = {
-            "pingpong": {
-                "game_name": "Ping-Pong AI",
-                "emoji": "🏓",
-                "top_scores": pingpong_leaderboard,
-                "total_players": len(pingpong_leaderboard)
-            },
-            "tetris": {
-                "game_name": "Tetris AI",
-                "emoji": "🧱",
-                "top_scores": tetris_leaderboard,
-                "total_players": len(tetris_leaderboard)
+        etag = make_etag("leaderboard", db.leaderboard_version, limit)
+        
+        def build():
+            # Get leaderboards for each game type
+            pingpong_leaderboard = db.get_leaderboard("pingpong", limit)
+            tetris_leaderboard = db.get_leaderboard("tetris", limit)
+            
+            # Combine and format results
+            global_leaderboard = {
+                "pingpong": {
+                    "game_name": "Ping-Pong AI",
+                    "emoji": "🏓",
+                    "top_scores": pingpong_leaderboard,
+                    "total_players": len(pingpong_leaderboard)
+                },
+                "tetris": {
+                    "game_name": "Tetris AI",
+                    "emoji": "🧱",
+                    "top_scores": tetris_leaderboard,
+                    "total_players": len(tetris_leaderboard)
+                }
+            }
+            
+            return {
+                "message": "Global leaderboard retrieved successfully",
+                "leaderboard": global_leaderboard,
+                "last_updated": db.leaderboard_updated_at
             }
-        }
         
-        return {
-            "message": "Global leaderboard retrieved successfully",
-            "leaderboard": global_leaderboard,
-            "last_updated": "2025-01-14T16:00:00Z"
-        }
+        return conditional_json(request, etag, build)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve leaderboard: {str(e)}")
 
+@router.get("/stream")
+async def stream_leaderboard():
+    """Server-Sent Events: each game's top scores, then an event whenever they change
+
+    Events: ``snapshot`` ({k, games}), ``insert`` ({game_type, rank, entry,
+    size}: insert at rank, keep the first size) and ``top`` ({game_type,
+    entries}: replace the list). Skip deltas whose id is not above the
+    snapshot's.
+    """
+    queue = live.hub.subscribe()
+    live.feed.follow_workers()
+    try:
+        snapshot = await run_in_threadpool(live.feed.snapshot_event)
+    except Exception as e:
+        live.hub.unsubscribe(queue)
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve leaderboard: {str(e)}")
+
+    async def events():
+        try:
+            yield snapshot
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return  # Dropped for falling behind; the client reconnects
+                yield message
+        finally:
+            live.hub.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # Keep nginx-style proxies from buffering the stream
+        "X-Accel-Buffering": "no"
+    })
+
 @router.get("/pingpong")
-def get_pingpong_leaderboard():
-    """Get Ping-Pong specific leaderboard"""
+def get_pingpong_leaderboard(limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                             cursor: Optional[str] = None):
+    """Get Ping-Pong specific leaderboard, one keyset page at a time"""
     try:
-        leaderboard = db.get_leaderboard("pingpong", 20)
+        page = db.get_leaderboard_page("pingpong", limit, cursor)
         
-        return {
+        return FastJSONResponse({
             "game_type": "pingpong",
             "game_name": "Ping-Pong AI",
-            "leaderboard": leaderboard,
-            "total_entries": len(leaderboard),
+            "leaderboard": page['entries'],
+            "total_entries": len(page['entries']),
+            "next_cursor": page['next_cursor'],
             "description": "Top Ping-Pong scores against AI opponents"
-        }
+        })
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve Ping-Pong leaderboard: {str(e)}")
 
 @router.get("/tetris")
-def get_tetris_leaderboard():
-    """Get Tetris specific leaderboard"""
+def get_tetris_leaderboard(limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                           cursor: Optional[str] = None):
+    """Get Tetris specific leaderboard, one keyset page at a time"""
     try:
-        leaderboard = db.get_leaderboard("tetris", 20)
+        page = db.get_leaderboard_page("tetris", limit, cursor)
         
-        return {
+        return FastJSONResponse({
             "game_type": "tetris",
             "game_name": "Tetris AI",
-            "leaderboard": leaderboard,
-            "total_entries": len(leaderboard),
+            "leaderboard": page['entries'],
+            "total_entries": len(page['entries']),
+            "next_cursor": page['next_cursor'],
             "description": "Top Tetris scores with AI difficulty scaling"
-        }
+        })
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve Tetris leaderboard: {str(e)}")
 
@@ -84,112 +147,113 @@ def get_player_stats(session_id: str):
         if not stats:
             raise HTTPException(status_code=404, detail="Player not found")
         
-        return {
+        return FastJSONResponse({
             "session_id": session_id,
             "stats": stats,
             "message": "Player statistics retrieved successfully"
-        }
+        })
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve player stats: {str(e)}")
 
+@router.get("/player/{session_id}/sessions")
+def get_player_session_history(session_id: str,
+                               limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                               cursor: Optional[str] = None):
+    """Get a player's game sessions, newest first, one keyset page at a time"""
+    try:
+        history = db.get_session_history(session_id, limit, cursor)
+        
+        if history is None:
+            raise HTTPException(status_code=404, detail="Player not found")
+        
+        return FastJSONResponse({
+            "session_id": session_id,
+            "sessions": history['sessions'],
+            "total_entries": len(history['sessions']),
+            "next_cursor": history['next_cursor']
+        })
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve session history: {str(e)}")
+
 @router.get("/ai-performance")
-def get_ai_performance_stats():
+def get_ai_performance_stats(request: Request):
     """Get AI performance statistics across all games"""
     try:
-        pingpong_metrics = db.get_ai_metrics("pingpong")
-        tetris_metrics = db.get_ai_metrics("tetris")
+        etag = make_etag("ai-performance", db.metrics_version)
         
-        return {
-            "ai_performance": {
-                "pingpong": {
-                    "game_name": "Ping-Pong AI",
-                    "metrics": pingpong_metrics,
-                    "description": "AI opponent performance metrics"
+        def build():
+            pingpong_metrics = db.get_ai_metrics("pingpong")
+            tetris_metrics = db.get_ai_metrics("tetris")
+            
+            return {
+                "ai_performance": {
+                    "pingpong": {
+                        "game_name": "Ping-Pong AI",
+                        "metrics": pingpong_metrics,
+                        "description": "AI opponent performance metrics"
+                    },
+                    "tetris": {
+                        "game_name": "Tetris AI", 
+                        "metrics": tetris_metrics,
+                        "description": "AI difficulty scaling metrics"
+                    }
                 },
-                "tetris": {
-                    "game_name": "Tetris AI", 
-                    "metrics": tetris_metrics,
-                    "description": "AI difficulty scaling metrics"
+                "summary": {
+                    "total_games_tracked": len(pingpong_metrics) + len(tetris_metrics),
+                    "ai_learning_active": True,
+                    "last_updated": db.metrics_updated_at
                 }
-            },
-            "summary": {
-                "total_games_tracked": len(pingpong_metrics) + len(tetris_metrics),
-                "ai_learning_active": True,
-                "last_updated": "2025-01-14T16:00:00Z"
             }
-        }
+        
+        return conditional_json(request, etag, build)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve AI performance stats: {str(e)}")
 
 @router.get("/rankings")
-def get_player_rankings():
+def get_player_rankings(limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+                        cursor: Optional[str] = None):
     """Get player rankings across all games"""
     try:
-        # Get top players from each game
-        pingpong_top = db.get_leaderboard("pingpong", 10)
-        tetris_top = db.get_leaderboard("tetris", 10)
-        
-        # Create combined rankings
-        player_rankings = {}
-        
-        # Process Ping-Pong rankings
-        for i, entry in enumerate(pingpong_top):
-            session_id = entry['session_id']
-            if session_id not in player_rankings:
-                player_rankings[session_id] = {
-                    'session_id': session_id,
-                    'games': {},
-                    'total_score': 0,
-                    'games_played': 0
-                }
-            
-            player_rankings[session_id]['games']['pingpong'] = {
-                'score': entry['score'],
-                'difficulty': entry['difficulty'],
-                'rank': i + 1,
-                'achieved_at': entry['achieved_at']
-            }
-            player_rankings[session_id]['total_score'] += entry['score']
-            player_rankings[session_id]['games_played'] += 1
-        
-        # Process Tetris rankings
-        for i, entry in enumerate(tetris_top):
-            session_id = entry['session_id']
-            if session_id not in player_rankings:
-                player_rankings[session_id] = {
-                    'session_id': session_id,
-                    'games': {},
-                    'total_score': 0,
-                    'games_played': 0
-                }
-            
-            player_rankings[session_id]['games']['tetris'] = {
-                'score': entry['score'],
-                'difficulty': entry['difficulty'],
-                'rank': i + 1,
-                'achieved_at': entry['achieved_at']
-            }
-            player_rankings[session_id]['total_score'] += entry['score']
-            player_rankings[session_id]['games_played'] += 1
-        
-        # Sort by total score
-        sorted_rankings = sorted(
-            player_rankings.values(),
-            key=lambda x: x['total_score'],
-            reverse=True
-        )
-        
-        return {
-            "player_rankings": sorted_rankings[:20],  # Top 20 players
-            "total_players": len(sorted_rankings),
+        page = db.get_player_rankings(limit, cursor)
+        
+        return FastJSONResponse({
+            "player_rankings": page['rankings'],
+            "total_players": page['total_players'],
+            "next_cursor": page['next_cursor'],
             "description": "Combined player rankings across all games"
-        }
+        })
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve player rankings: {str(e)}")
 
-print("✅ Enhanced Leaderboard route loaded with comprehensive stats")
+@router.get("/{game_type}/{period}")
+def get_window_leaderboard(game_type: str, period: str,
+                           limit: int = Query(20, ge=1, le=WINDOW_TOP_K)):
+    """Get the current daily, weekly or monthly leaderboard for a game"""
+    if game_type not in GAME_NAMES or period not in LEADERBOARD_WINDOWS:
+        raise HTTPException(status_code=404, detail="Leaderboard not found")
+    try:
+        window = db.get_window_leaderboard(game_type, period, limit)
+        
+        return FastJSONResponse({
+            "game_type": game_type,
+            "game_name": GAME_NAMES[game_type],
+            "period": period,
+            "bucket": window['bucket'],
+            "leaderboard": window['entries'],
+            "total_entries": len(window['entries'])
+        })
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve {period} leaderboard: {str(e)}")
@@ -1,43 +1,160 @@
-import random
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Dict, List, Optional
 import os
+import random
+import time
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket
+from pydantic import BaseModel, Field
+from typing import Annotated, Dict, List, Literal, Optional, Union
 import uuid
-from datetime import datetime
+from dataclasses import dataclass, field
 
+from api.ai import pong_policy
 from api.ai.difficulty_agent import pingpong_agent
-from api.database import db
+from api import admission, learning, metrics, ratings, sessions
+from api.spectate import Spectators, spectator_token
+from api.database import db, player_public_id
+from api.fast_json import FastJSONResponse
+from api.profiling import ProfiledRoute
+from api.frontend import frontend_file, pages
+from api.http_cache import conditional_json, make_etag
+
+router = APIRouter(prefix="/pingpong", tags=["Ping Pong"], route_class=ProfiledRoute)
 
-router = APIRouter(prefix="/pingpong", tags=["Ping Pong"])
+metrics.gauge("arcade_agent_difficulty", "Current adaptive AI difficulty",
+              ("game",)).set_function(("pingpong",), lambda: pingpong_agent.difficulty_level)
 
-# Prefer api/static (Vercel bundle), else frontend/ at project root
-_API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-_ROOT = os.path.dirname(_API_DIR)
-_STATIC_FILE = os.path.join(_API_DIR, "static", "pingpong", "index.html")
-_ROOT_FILE = os.path.join(_ROOT, "frontend", "pingpong", "index.html")
-FRONTEND_PATH = _STATIC_FILE if os.path.exists(_STATIC_FILE) else _ROOT_FILE
+# Physics fields the client reports with every action
+PHYSICS_FIELDS = ('ball_x', 'ball_y', 'ball_speed_x', 'ball_speed_y', 'player_y', 'ai_y')
 
-# Game state management
-active_sessions = {}
+# Clients that run the AI themselves (api.ai.pong_policy) report the frame
+# tick at ball hits and scores; the frames since the last report are
+# replayed to check the AI paddle, up to this many (60 a second)
+MAX_REPLAY_TICKS = int(os.environ.get("ARCADE_PONG_MAX_REPLAY_TICKS", 1800))
+# AI paddle positions closer than this (px) to the replay count as equal
+AI_SYNC_TOLERANCE = 1e-6
 
-class GameSession(BaseModel):
+ai_sync = metrics.counter(
+    "arcade_pingpong_ai_sync_total",
+    "Client-run AI checked at ball hits and scores, by result "
+    "(verified, corrected, unverified, stale, rejected)",
+    ("result",))
+
+@dataclass(slots=True)
+class GameSession:
+    """Server-side state for one game; mutated in place on every action"""
     session_id: str
     player_id: int
     game_session_id: int
     ai_difficulty: float
+    prediction_accuracy: float
+    paddle_speed: float
     player_score: int = 0
     ai_score: int = 0
-    game_state: Dict = {}
-    created_at: datetime
+    ball_x: float = 400
+    ball_y: float = 250
+    ball_speed_x: float = 5
+    ball_speed_y: float = 5
+    player_y: float = 200
+    ai_y: float = 200
+    created_at: float = 0.0
+    # Admission control: client timestamp of the newest paddle_move applied,
+    # monotonic time of the last AI step, and the session's action budget
+    last_move_at: float = 0.0
+    ai_moved_at: float = 0.0
+    bucket: admission.TokenBucket = field(default_factory=admission.new_bucket)
+    # Client-run AI: its random seed, and the tick of the last reported
+    # event, whose state the fields above hold (-1: the server runs the AI)
+    ai_seed: int = 0
+    ai_tick: int = -1
+
+    def game_context(self) -> Dict:
+        """Physics and AI parameters as a dict, for learning data"""
+        context = {field: getattr(self, field) for field in PHYSICS_FIELDS}
+        context['ai_params'] = {
+            'prediction_accuracy': self.prediction_accuracy,
+            'paddle_speed': self.paddle_speed
+        }
+        return context
+
+    def spectator_state(self) -> Dict:
+        """What spectators see: positions, velocities and scores"""
+        state = {field: getattr(self, field) for field in PHYSICS_FIELDS}
+        state['player_score'] = self.player_score
+        state['ai_score'] = self.ai_score
+        state['ai_difficulty'] = self.ai_difficulty
+        return state
+
+# Game state management (shared between workers in multi-worker mode, where
+# lookups return copies: handlers save() a session after changing it)
+active_sessions = sessions.active_sessions("pingpong", GameSession)
+
+metrics.gauge("arcade_active_sessions", "Sessions held in memory",
+              ("game",)).set_function(("pingpong",), lambda: len(active_sessions))
 
-class GameAction(BaseModel):
+spectators = Spectators("pingpong", active_sessions, GameSession.spectator_state)
+metrics.gauge("arcade_spectators", "Spectator sockets open",
+              ("game",)).set_function(("pingpong",), lambda: spectators.viewer_count)
+
+class PhysicsData(BaseModel):
+    ball_x: Optional[float] = None
+    ball_y: Optional[float] = None
+    ball_speed_x: Optional[float] = None
+    ball_speed_y: Optional[float] = None
+    player_y: Optional[float] = None
+    ai_y: Optional[float] = None
+
+class PaddleMoveData(PhysicsData):
+    y: Optional[float] = None
+
+class BallHitData(PhysicsData):
+    paddle_y: Optional[float] = None
+    # Frame of the event, from clients running the AI themselves
+    tick: Optional[int] = Field(None, ge=0)
+
+class ScoreData(PhysicsData):
+    scorer: Literal["player", "ai"]
+    tick: Optional[int] = Field(None, ge=0)
+
+class _ActionBase(BaseModel):
     session_id: str
-    action_type: str  # "paddle_move", "ball_hit", "score"
-    action_data: Dict
     timestamp: float
 
+class PaddleMoveAction(_ActionBase):
+    action_type: Literal["paddle_move"]
+    action_data: PaddleMoveData
+
+class BallHitAction(_ActionBase):
+    action_type: Literal["ball_hit"]
+    action_data: BallHitData
+
+class ScoreAction(_ActionBase):
+    action_type: Literal["score"]
+    action_data: ScoreData
+
+# Validation picks the model from action_type before looking at action_data
+GameAction = Annotated[Union[PaddleMoveAction, BallHitAction, ScoreAction],
+                       Field(discriminator="action_type")]
+
+class AIMove(BaseModel):
+    ai_y: float
+    # With client-run AI: the tick ai_y is the authoritative position at
+    tick: Optional[int] = None
+
+class Scores(BaseModel):
+    player: int
+    ai: int
+
+class GameActionResponse(BaseModel):
+    """Per-action delta; the client already holds the rest of the state"""
+    ai_move: AIMove
+    scores: Scores
+
+class StartSessionRequest(BaseModel):
+    # A stable secret the client keeps (e.g. in localStorage) so that its
+    # games are rated as one player's; without it every game is a new
+    # player. Only its hash is stored (api.database.player_public_id)
+    player_key: Optional[str] = Field(None, min_length=16, max_length=64,
+                                      pattern=r'^[A-Za-z0-9_-]+$')
+
 class GameOutcome(BaseModel):
     session_id: str
     winner: str  # "player", "ai", "ongoing"
@@ -46,234 +163,280 @@ class GameOutcome(BaseModel):
     ai_performance: Dict
 
 @router.get("")
-def serve_pingpong():
-    """Serve the Ping-Pong game frontend"""
-    if not os.path.exists(FRONTEND_PATH):
-        print("⚠️  Ping-Pong file missing:", FRONTEND_PATH)
+async def serve_pingpong(request: Request):
+    """Serve the Ping-Pong game frontend (from memory, see api.frontend.PageCache)"""
+    response = pages.response(request, "/pingpong")
+    if response is None:
+        print("⚠️  Ping-Pong file missing:", frontend_file("pingpong", "index.html"))
         return {"error": "Ping-Pong file not found."}
-    return FileResponse(FRONTEND_PATH)
+    return response
 
 @router.post("/start-session")
-def start_game_session():
+def start_game_session(start: Optional[StartSessionRequest] = None):
     """Start a new Ping-Pong game session"""
     session_id = str(uuid.uuid4())
+    player_key = start.player_key if start is not None else None
     
-    # Create player in database
-    player_id = db.create_player(session_id)
+    # Get AI difficulty settings, matched to the player's rating if known
+    rating = db.get_player_rating(player_key, "pingpong") if player_key else None
+    ai_settings = pingpong_agent.get_adaptive_difficulty(session_id, "pingpong", rating)
     
-    # Get AI difficulty settings
-    ai_settings = pingpong_agent.get_adaptive_difficulty(session_id, "pingpong")
-    
-    # Start game session in database
-    game_session_id = db.start_game_session(player_id, "pingpong", ai_settings['difficulty_level'])
+    # Create player and game session in database (single transaction); a
+    # player key makes every game of that player one players row, stored
+    # under its public id
+    player = player_public_id(player_key) if player_key else None
+    player_id, game_session_id = db.begin_session(player or session_id, "pingpong",
+                                                  ai_settings['difficulty_level'])
     
     # Create active session
+    ai_params = ai_settings['behavior_params']
     session = GameSession(
         session_id=session_id,
         player_id=player_id,
         game_session_id=game_session_id,
         ai_difficulty=ai_settings['difficulty_level'],
-        game_state={
-            'ball_x': 400,
-            'ball_y': 250,
-            'ball_speed_x': 5,
-            'ball_speed_y': 5,
-            'player_y': 200,
-            'ai_y': 200,
-            'ai_params': ai_settings['behavior_params']
-        },
-        created_at=datetime.now()
+        prediction_accuracy=ai_params['prediction_accuracy'],
+        paddle_speed=ai_params['paddle_speed'],
+        created_at=time.time(),
+        ai_seed=random.getrandbits(32)
     )
     
     active_sessions[session_id] = session
     
     return {
         "session_id": session_id,
+        "spectator_token": spectator_token(session_id),
         "ai_difficulty": ai_settings['difficulty_level'],
         "ai_params": ai_settings['behavior_params'],
+        "ai_seed": session.ai_seed,
+        "rating": rating,
+        "player_id": player,
         "message": "Game session started!"
     }
 
-@router.post("/action")
-def process_game_action(action: GameAction):
-    """Process a game action and return AI response"""
-    if action.session_id not in active_sessions:
+@router.post("/action", response_model=GameActionResponse)
+async def process_game_action(action: GameAction):
+    """Process a game action and return AI response
+
+    Runs on the event loop without a threadpool hop: learning and the
+    feedback write happen in api.learning's background consumer. Clients
+    that run the AI themselves only send ball hits and scores, which
+    check and, if needed, correct their AI paddle.
+    """
+    session = active_sessions.get(action.session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Game session not found")
-    
-    session = active_sessions[action.session_id]
-    
-    # Update game state from client (ball position, paddles) so AI uses current state
-    for key in ('ball_x', 'ball_y', 'ball_speed_x', 'ball_speed_y', 'player_y', 'ai_y'):
-        if key in action.action_data and action.action_data[key] is not None:
-            session.game_state[key] = action.action_data[key]
-    if action.action_type == "paddle_move":
-        session.game_state['player_y'] = action.action_data.get('y', session.game_state['player_y'])
-        
-    elif action.action_type == "ball_hit":
-        # Record AI feedback for learning
-        learning_data = pingpong_agent.learn_from_outcome(
-            player_action=f"hit_at_{action.action_data.get('ball_y', 0)}",
-            ai_response=f"ai_position_{session.game_state['ai_y']}",
-            outcome="ball_hit",
-            game_context=session.game_state
-        )
-        db.record_ai_feedback(
-            session.game_session_id,
-            "pingpong",
-            learning_data.get("player_action", ""),
-            learning_data.get("ai_response", ""),
-            learning_data.get("outcome", ""),
-            learning_data.get("difficulty_level", 0.5),
-            learning_data,
-        )
-        
-    elif action.action_type == "score":
-        if action.action_data.get('scorer') == 'player':
+
+    data = action.action_data
+    now = time.monotonic()
+    is_move = action.action_type == "paddle_move"
+
+    if is_move:
+        # Only the newest position matters: drop events overtaken in flight,
+        # and within a frame of the last AI step just remember the position
+        if action.timestamp < session.last_move_at:
+            admission.degraded.inc(("pingpong", "stale"))
+            return _action_response(session)
+        session.last_move_at = action.timestamp
+        _apply_physics(session, data)
+        if data.y is not None:
+            session.player_y = data.y
+        if now - session.ai_moved_at < admission.COALESCE_INTERVAL:
+            admission.degraded.inc(("pingpong", "coalesced"))
+            return _action_response(session)
+
+    if not session.bucket.take(now):
+        if is_move:
+            admission.degraded.inc(("pingpong", "limited"))
+            return _action_response(session)
+        raise admission.rate_limited(session.bucket, "pingpong")
+
+    overloaded = admission.shedder.overloaded()
+    counts = True
+    if is_move:
+        pass
+    elif data.tick is None:
+        _apply_physics(session, data)
+    else:
+        counts = _sync_ai(session, action.action_type, data, verify=not overloaded)
+    if action.action_type == "score" and counts:
+        if data.scorer == 'player':
             session.player_score += 1
         else:
             session.ai_score += 1
-    
+
+    if overloaded:
+        # Scores and positions are kept; learning and the AI step wait
+        admission.degraded.inc(("pingpong", "shed"))
+        return _action_response(session)
+
+    if action.action_type == "ball_hit":
+        # AI feedback is learned from and stored in the background
+        learning.pipeline.submit(
+            "pingpong", session.game_session_id,
+            f"hit_at_{data.ball_y if data.ball_y is not None else 0}",
+            f"ai_position_{session.ai_y}", "ball_hit", session.game_context())
+
+    if session.ai_tick >= 0:
+        # The client runs the AI and was checked above
+        return _action_response(session)
+
     # Calculate AI response
-    ai_response = calculate_ai_move(session)
-    
-    return {
-        "ai_move": ai_response,
-        "game_state": session.game_state,
+    calculate_ai_move(session)
+    session.ai_moved_at = now
+    return _action_response(session)
+
+def _sync_ai(session: GameSession, action_type: str, data: Union[BallHitData, ScoreData],
+             verify: bool) -> bool:
+    """Take a client-run AI's event: replay the frames since the last one,
+    correct the AI paddle to the replay, and adopt the reported ball
+
+    Returns False for a player point the replay rules out (the AI paddle
+    returned the ball). Without a previous event, past MAX_REPLAY_TICKS or
+    when ``verify`` is off (load shedding), the report is taken as is.
+    """
+    if data.tick < session.ai_tick:
+        # Overtaken in flight by a later event, which is the newer state
+        ai_sync.inc(("stale",))
+        return True
+    expected = None
+    if verify and session.ai_tick >= 0 and data.tick - session.ai_tick <= MAX_REPLAY_TICKS:
+        expected = pong_policy.replay(
+            (session.ball_x, session.ball_y, session.ball_speed_x, session.ball_speed_y, session.ai_y),
+            session.ai_seed, session.prediction_accuracy, session.paddle_speed,
+            session.ai_tick, data.tick)
+    _apply_physics(session, data)
+    session.ai_tick = data.tick
+    if expected is None:
+        ai_sync.inc(("unverified",))
+        return True
+    if abs(session.ai_y - expected[4]) > AI_SYNC_TOLERANCE:
+        ai_sync.inc(("corrected",))
+        session.ai_y = expected[4]
+    else:
+        ai_sync.inc(("verified",))
+    if action_type == "score" and data.scorer == "player" and not pong_policy.passes_ai(expected):
+        ai_sync.inc(("rejected",))
+        return False
+    return True
+
+def _apply_physics(session: GameSession, data: PhysicsData):
+    """Update game state from client (ball position, paddles) so AI uses current state"""
+    for name in PHYSICS_FIELDS:
+        value = getattr(data, name)
+        if value is not None:
+            setattr(session, name, value)
+
+def _action_response(session: GameSession) -> FastJSONResponse:
+    # Every answered action ends here, so this is where the session is
+    # saved and spectators hear of it
+    active_sessions.save(session)
+    spectators.touch(session.session_id)
+    # Returned directly (already JSON-native) to skip jsonable_encoder on the
+    # hottest endpoint; the response model documents the shape
+    ai_move = {"ai_y": session.ai_y}
+    if session.ai_tick >= 0:
+        ai_move["tick"] = session.ai_tick
+    return FastJSONResponse({
+        "ai_move": ai_move,
         "scores": {
             "player": session.player_score,
             "ai": session.ai_score
         }
-    }
+    })
+
+def _unseeded(draw: int) -> float:
+    return random.random()
 
 def calculate_ai_move(session: GameSession) -> Dict:
-    """Calculate AI paddle movement based on game state and difficulty"""
-    ai_params = session.game_state['ai_params']
-    ball_x = session.game_state['ball_x']
-    ball_y = session.game_state['ball_y']
-    ball_speed_x = session.game_state['ball_speed_x']
-    ball_speed_y = session.game_state['ball_speed_y']
-    
-    # Predict ball trajectory
-    if ball_speed_x > 0:  # Ball moving towards AI
-        # Calculate where ball will be when it reaches AI paddle
-        time_to_paddle = (800 - ball_x) / ball_speed_x
-        predicted_y = ball_y + (ball_speed_y * time_to_paddle)
-        
-        # Apply prediction accuracy based on difficulty
-        prediction_accuracy = ai_params['prediction_accuracy']
-        if random.random() > prediction_accuracy:
-            # Add some randomness to make it less perfect
-            predicted_y += random.gauss(0, 50)
-        
-        # Clamp prediction to canvas bounds (canvas height 500, paddle height 100 → ai_y in [0, 400])
-        predicted_y = max(50, min(400, predicted_y))
-        
-        # Move AI paddle towards predicted position
-        current_ai_y = session.game_state['ai_y']
-        paddle_speed = ai_params['paddle_speed']
-        
-        if abs(predicted_y - current_ai_y) > 5:
-            if predicted_y > current_ai_y:
-                new_ai_y = min(current_ai_y + paddle_speed, 400)
-            else:
-                new_ai_y = max(current_ai_y - paddle_speed, 0)
-        else:
-            new_ai_y = current_ai_y
-            
-    else:  # Ball moving away from AI
-        # Move towards center (canvas 800x500 → center y = 250)
-        current_ai_y = session.game_state['ai_y']
-        center_y = 250
-        paddle_speed = ai_params['paddle_speed'] * 0.5  # Slower when ball is away
-        
-        if abs(center_y - current_ai_y) > 10:
-            if center_y > current_ai_y:
-                new_ai_y = min(current_ai_y + paddle_speed, 400)
-            else:
-                new_ai_y = max(current_ai_y - paddle_speed, 0)
-        else:
-            new_ai_y = current_ai_y
-    
-    session.game_state['ai_y'] = new_ai_y
-    
+    """Calculate AI paddle movement based on game state and difficulty
+
+    For clients that leave the AI to the server: the policy the page runs
+    itself (api.ai.pong_policy), with unseeded random numbers.
+    """
+    session.ai_y = pong_policy.ai_step(
+        session.ai_y, session.ball_x, session.ball_y, session.ball_speed_x, session.ball_speed_y,
+        session.prediction_accuracy, session.paddle_speed, _unseeded)
     return {
-        'ai_y': new_ai_y,
+        'ai_y': session.ai_y,
         'difficulty': session.ai_difficulty,
-        'prediction_accuracy': ai_params['prediction_accuracy']
+        'prediction_accuracy': session.prediction_accuracy
     }
 
+@router.websocket("/spectate/{token}")
+async def spectate_game(websocket: WebSocket, token: str):
+    """Watch a live game by its spectator_token: JSON frames of its state, up to
+    ARCADE_SPECTATOR_FPS a second"""
+    await spectators.serve(websocket, token)
+
 @router.post("/end-session")
 def end_game_session(outcome: GameOutcome):
     """End a game session and record results"""
-    if outcome.session_id not in active_sessions:
+    session = active_sessions.get(outcome.session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Game session not found")
     
-    session = active_sessions[outcome.session_id]
-    
-    # End session in database
     final_score = outcome.final_score.get('player', 0)
-    db.end_game_session(session.game_session_id, final_score)
-    
-    # Update leaderboard if player won
-    if outcome.winner == "player" and final_score > 0:
-        db.update_leaderboard(
-            session.player_id, 
-            "pingpong", 
-            final_score, 
-            session.ai_difficulty, 
-            session.game_session_id
-        )
-    
-    # Record final AI learning data
-    learning_data = pingpong_agent.learn_from_outcome(
-        player_action="game_end",
-        ai_response="final_position",
-        outcome=outcome.winner,
-        game_context={
-            'final_score': outcome.final_score,
-            'game_duration': outcome.game_duration,
-            'ai_performance': outcome.ai_performance
-        }
-    )
-    
-    db.record_ai_feedback(
+
+    # End session, add to leaderboard if player won and update the player's
+    # rating in a single transaction
+    ended, rating = db.finish_session(
         session.game_session_id,
+        session.player_id,
         "pingpong",
-        learning_data.get("player_action", ""),
-        learning_data.get("ai_response", ""),
-        learning_data.get("outcome", ""),
-        learning_data.get("difficulty_level", 0.5),
-        learning_data,
+        final_score,
+        session.ai_difficulty,
+        ranked=outcome.winner == "player" and final_score > 0,
+        result=ratings.game_result("pingpong", winner=outcome.winner),
     )
 
-    # Remove from active sessions
-    del active_sessions[outcome.session_id]
+    # Final AI learning data, applied and stored in the background; only by
+    # the call that ended the session, so a repeated end is not learned twice
+    if ended:
+        learning.pipeline.submit("pingpong", session.game_session_id, "game_end", "final_position",
+                                 outcome.winner, {
+                                     'final_score': outcome.final_score,
+                                     'game_duration': outcome.game_duration,
+                                     'ai_performance': outcome.ai_performance
+                                 })
+
+    # Remove from active sessions; spectators get a final frame
+    active_sessions.pop(outcome.session_id, None)
+    spectators.touch(outcome.session_id)
 
     return {
         "message": "Game session ended",
         "final_score": outcome.final_score,
-        "ai_difficulty": session.ai_difficulty
+        "ai_difficulty": session.ai_difficulty,
+        "rating": rating
     }
 
 @router.get("/leaderboard")
-def get_pingpong_leaderboard():
+def get_pingpong_leaderboard(limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None):
     """Get Ping-Pong leaderboard"""
-    leaderboard = db.get_leaderboard("pingpong", 10)
-    return {
+    try:
+        page = db.get_leaderboard_page("pingpong", limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({
         "game_type": "pingpong",
-        "leaderboard": leaderboard,
-        "total_entries": len(leaderboard)
-    }
+        "leaderboard": page['entries'],
+        "total_entries": len(page['entries']),
+        "next_cursor": page['next_cursor']
+    })
 
 @router.get("/ai-stats")
-def get_ai_stats():
+def get_ai_stats(request: Request):
     """Get AI performance statistics"""
-    metrics = db.get_ai_metrics("pingpong")
-    return {
-        "game_type": "pingpong",
-        "ai_metrics": metrics,
-        "current_difficulty": pingpong_agent.difficulty_level,
-        "performance_history": pingpong_agent.ai_performance_history[-10:] if pingpong_agent.ai_performance_history else []
-    }
-
-print("✅ Enhanced Ping-Pong route loaded with AI integration")
+    etag = make_etag("pingpong-ai-stats", db.metrics_version, pingpong_agent.version)
+    
+    def build():
+        metrics = db.get_ai_metrics("pingpong")
+        return {
+            "game_type": "pingpong",
+            "ai_metrics": metrics,
+            "current_difficulty": pingpong_agent.difficulty_level,
+            "performance_history": pingpong_agent.ai_performance_history[-10:] if pingpong_agent.ai_performance_history else []
+        }
+    
+    return conditional_json(request, etag, build)
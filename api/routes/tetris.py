@@ -1,27 +1,27 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Dict, List, Optional
-import os
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket
+from pydantic import BaseModel, Field
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+import time
 import uuid
-from datetime import datetime
+from dataclasses import dataclass, field
 
 from api.ai.difficulty_agent import tetris_agent
-from api.database import db
+from api import admission, learning, metrics, ratings, sessions
+from api.spectate import Spectators, spectator_token
+from api.database import db, player_public_id
+from api.fast_json import FastJSONResponse
+from api.profiling import ProfiledRoute
+from api.frontend import frontend_file, pages
+from api.http_cache import conditional_json, make_etag
 
-router = APIRouter(prefix="/tetris", tags=["Tetris"])
+router = APIRouter(prefix="/tetris", tags=["Tetris"], route_class=ProfiledRoute)
 
-# Prefer api/static (Vercel bundle), else frontend/ at project root
-_API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-_ROOT = os.path.dirname(_API_DIR)
-_STATIC_FILE = os.path.join(_API_DIR, "static", "tetris", "index.html")
-_ROOT_FILE = os.path.join(_ROOT, "frontend", "tetris", "index.html")
-FRONTEND_PATH = _STATIC_FILE if os.path.exists(_STATIC_FILE) else _ROOT_FILE
+metrics.gauge("arcade_agent_difficulty", "Current adaptive AI difficulty",
+              ("game",)).set_function(("tetris",), lambda: tetris_agent.difficulty_level)
 
-# Game state management
-active_sessions = {}
-
-class TetrisSession(BaseModel):
+@dataclass(slots=True)
+class TetrisSession:
+    """Server-side state for one game; mutated in place on every action"""
     session_id: str
     player_id: int
     game_session_id: int
@@ -29,15 +29,99 @@ class TetrisSession(BaseModel):
     score: int = 0
     level: int = 1
     lines_cleared: int = 0
-    game_state: Dict = {}
-    created_at: datetime
+    created_at: float = 0.0
+    bucket: admission.TokenBucket = field(default_factory=admission.new_bucket)
+
+    def game_context(self) -> Dict:
+        return {'score': self.score, 'level': self.level, 'lines': self.lines_cleared}
+
+    def spectator_state(self) -> Dict:
+        """What spectators see: score, level, lines and AI difficulty"""
+        return {'score': self.score, 'level': self.level, 'lines': self.lines_cleared,
+                'ai_difficulty': self.ai_difficulty}
+
+# Game state management (shared between workers in multi-worker mode, where
+# lookups return copies: handlers save() a session after changing it)
+active_sessions = sessions.active_sessions("tetris", TetrisSession)
+
+metrics.gauge("arcade_active_sessions", "Sessions held in memory",
+              ("game",)).set_function(("tetris",), lambda: len(active_sessions))
+
+spectators = Spectators("tetris", active_sessions, TetrisSession.spectator_state)
+metrics.gauge("arcade_spectators", "Spectator sockets open",
+              ("game",)).set_function(("tetris",), lambda: spectators.viewer_count)
 
-class TetrisAction(BaseModel):
+class MoveData(BaseModel):
+    direction: str = ''
+
+class EmptyData(BaseModel):
+    pass
+
+class PiecePlacedData(BaseModel):
+    score: Optional[int] = None
+    piece_type: Any = None  # the client sends the piece's shape matrix
+    position: Optional[Dict[str, int]] = None
+
+class LinesClearedData(BaseModel):
+    lines: int = 0
+    level: Optional[int] = None
+    score: Optional[int] = None
+
+class GameOverData(BaseModel):
+    final_score: Optional[int] = None
+    level: Optional[int] = None
+    lines: Optional[int] = None
+
+class _ActionBase(BaseModel):
     session_id: str
-    action_type: str  # "move", "rotate", "hard_drop", "piece_placed", "lines_cleared", "game_over"
-    action_data: Dict
     timestamp: float
 
+class MoveAction(_ActionBase):
+    action_type: Literal["move"]
+    action_data: MoveData
+
+class RotateAction(_ActionBase):
+    action_type: Literal["rotate"]
+    action_data: EmptyData = EmptyData()
+
+class HardDropAction(_ActionBase):
+    action_type: Literal["hard_drop"]
+    action_data: EmptyData = EmptyData()
+
+class PiecePlacedAction(_ActionBase):
+    action_type: Literal["piece_placed"]
+    action_data: PiecePlacedData
+
+class LinesClearedAction(_ActionBase):
+    action_type: Literal["lines_cleared"]
+    action_data: LinesClearedData
+
+class GameOverAction(_ActionBase):
+    action_type: Literal["game_over"]
+    action_data: GameOverData
+
+# Validation picks the model from action_type before looking at action_data
+TetrisAction = Annotated[Union[MoveAction, RotateAction, HardDropAction,
+                               PiecePlacedAction, LinesClearedAction, GameOverAction],
+                         Field(discriminator="action_type")]
+
+class TetrisState(BaseModel):
+    score: int
+    level: int
+    lines: int
+    ai_difficulty: float
+
+class TetrisActionResponse(BaseModel):
+    ai_response: str
+    game_state: TetrisState
+
+class StartSessionRequest(BaseModel):
+    # A stable secret the client keeps (e.g. in localStorage) so that its
+    # games are rated as one player's; without it every game is a new
+    # player. Only its hash is stored (api.database.player_public_id)
+    player_key: Optional[str] = Field(None, min_length=16, max_length=64,
+                                      pattern=r'^[A-Za-z0-9_-]+$')
+
 class TetrisOutcome(BaseModel):
     session_id: str
     final_score: int
@@ -47,26 +131,30 @@ class TetrisOutcome(BaseModel):
     ai_performance: Dict
 
 @router.get("")
-def serve_tetris():
-    """Serve the Tetris game frontend"""
-    if not os.path.exists(FRONTEND_PATH):
-        print("⚠️  Tetris file missing:", FRONTEND_PATH)
+async def serve_tetris(request: Request):
+    """Serve the Tetris game frontend (from memory, see api.frontend.PageCache)"""
+    response = pages.response(request, "/tetris")
+    if response is None:
+        print("⚠️  Tetris file missing:", frontend_file("tetris", "index.html"))
         return {"error": "Tetris file not found."}
-    return FileResponse(FRONTEND_PATH)
+    return response
 
 @router.post("/start-session")
-def start_tetris_session():
+def start_tetris_session(start: Optional[StartSessionRequest] = None):
     """Start a new Tetris game session"""
     session_id = str(uuid.uuid4())
+    player_key = start.player_key if start is not None else None
     
-    # Create player in database
-    player_id = db.create_player(session_id)
-    
-    # Get AI difficulty settings
-    ai_settings = tetris_agent.get_adaptive_difficulty(session_id, "tetris")
+    # Get AI difficulty settings, matched to the player's rating if known
+    rating = db.get_player_rating(player_key, "tetris") if player_key else None
+    ai_settings = tetris_agent.get_adaptive_difficulty(session_id, "tetris", rating)
     
-    # Start game session in database
-    game_session_id = db.start_game_session(player_id, "tetris", ai_settings['difficulty_level'])
+    # Create player and game session in database (single transaction); a
+    # player key makes every game of that player one players row, stored
+    # under its public id
+    player = player_public_id(player_key) if player_key else None
+    player_id, game_session_id = db.begin_session(player or session_id, "tetris",
+                                                  ai_settings['difficulty_level'])
     
     # Create active session
     session = TetrisSession(
@@ -74,134 +162,101 @@ def start_tetris_session():
         player_id=player_id,
         game_session_id=game_session_id,
         ai_difficulty=ai_settings['difficulty_level'],
-        game_state={
-            'board_width': 10,
-            'board_height': 20,
-            'ai_params': ai_settings['behavior_params']
-        },
-        created_at=datetime.now()
+        created_at=time.time()
     )
     
     active_sessions[session_id] = session
     
     return {
         "session_id": session_id,
+        "spectator_token": spectator_token(session_id),
         "ai_difficulty": ai_settings['difficulty_level'],
         "ai_params": ai_settings['behavior_params'],
+        "rating": rating,
+        "player_id": player,
         "message": "Tetris session started!"
     }
 
-@router.post("/action")
-def process_tetris_action(action: TetrisAction):
-    """Process a Tetris game action and return AI response"""
-    if action.session_id not in active_sessions:
+@router.post("/action", response_model=TetrisActionResponse)
+async def process_tetris_action(action: TetrisAction):
+    """Process a Tetris game action and return AI response
+
+    Runs on the event loop: learning and the feedback write happen in
+    api.learning's background consumer.
+    """
+    session = active_sessions.get(action.session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Tetris session not found")
     
-    session = active_sessions[action.session_id]
-    learning_data = None
+    if not session.bucket.take(time.monotonic()):
+        raise admission.rate_limited(session.bucket, "tetris")
+    return _apply_tetris_action(session, action, admission.shedder.overloaded())
+
+def _apply_tetris_action(session: TetrisSession, action: TetrisAction,
+                         overloaded: bool) -> FastJSONResponse:
+    data = action.action_data
+    # (player_action, ai_response, outcome, game_context) for the agent
+    feedback = None
 
     # Update game state based on action
     if action.action_type == "move":
-        direction = action.action_data.get('direction', '')
         # Record player movement for AI learning
-        learning_data = tetris_agent.learn_from_outcome(
-            player_action=f"move_{direction}",
-            ai_response="observe",
-            outcome="move_recorded",
-            game_context={
-                'score': session.score,
-                'level': session.level,
-                'lines': session.lines_cleared
-            }
-        )
+        feedback = (f"move_{data.direction}", "observe", "move_recorded", session.game_context())
         
     elif action.action_type == "rotate":
-        learning_data = tetris_agent.learn_from_outcome(
-            player_action="rotate",
-            ai_response="observe",
-            outcome="rotation_recorded",
-            game_context={
-                'score': session.score,
-                'level': session.level,
-                'lines': session.lines_cleared
-            }
-        )
+        feedback = ("rotate", "observe", "rotation_recorded", session.game_context())
         
     elif action.action_type == "hard_drop":
-        learning_data = tetris_agent.learn_from_outcome(
-            player_action="hard_drop",
-            ai_response="observe",
-            outcome="drop_recorded",
-            game_context={
-                'score': session.score,
-                'level': session.level,
-                'lines': session.lines_cleared
-            }
-        )
+        feedback = ("hard_drop", "observe", "drop_recorded", session.game_context())
         
     elif action.action_type == "piece_placed":
         # Update session score
-        session.score = action.action_data.get('score', session.score)
+        if data.score is not None:
+            session.score = data.score
         
-        learning_data = tetris_agent.learn_from_outcome(
-            player_action="piece_placed",
-            ai_response="analyze_placement",
-            outcome="placement_recorded",
-            game_context={
-                'score': session.score,
-                'level': session.level,
-                'lines': session.lines_cleared,
-                'piece_type': action.action_data.get('piece_type'),
-                'position': action.action_data.get('position')
-            }
-        )
+        feedback = ("piece_placed", "analyze_placement", "placement_recorded", {
+            **session.game_context(),
+            'piece_type': data.piece_type,
+            'position': data.position
+        })
         
     elif action.action_type == "lines_cleared":
-        session.lines_cleared = action.action_data.get('lines', 0)
-        session.level = action.action_data.get('level', session.level)
-        session.score = action.action_data.get('score', session.score)
+        session.lines_cleared = data.lines
+        if data.level is not None:
+            session.level = data.level
+        if data.score is not None:
+            session.score = data.score
         
-        learning_data = tetris_agent.learn_from_outcome(
-            player_action="lines_cleared",
-            ai_response="analyze_efficiency",
-            outcome="efficiency_recorded",
-            game_context={
-                'score': session.score,
-                'level': session.level,
-                'lines': session.lines_cleared,
-                'lines_cleared': action.action_data.get('lines', 0)
-            }
-        )
+        feedback = ("lines_cleared", "analyze_efficiency", "efficiency_recorded", {
+            **session.game_context(),
+            'lines_cleared': data.lines
+        })
         
     elif action.action_type == "game_over":
-        session.score = action.action_data.get('final_score', session.score)
-        session.level = action.action_data.get('level', session.level)
-        session.lines_cleared = action.action_data.get('lines', session.lines_cleared)
+        if data.final_score is not None:
+            session.score = data.final_score
+        if data.level is not None:
+            session.level = data.level
+        if data.lines is not None:
+            session.lines_cleared = data.lines
         
-        learning_data = tetris_agent.learn_from_outcome(
-            player_action="game_over",
-            ai_response="analyze_performance",
-            outcome="game_completed",
-            game_context={
-                'final_score': session.score,
-                'level_reached': session.level,
-                'lines_cleared': session.lines_cleared
-            }
-        )
+        feedback = ("game_over", "analyze_performance", "game_completed", {
+            'final_score': session.score,
+            'level_reached': session.level,
+            'lines_cleared': session.lines_cleared
+        })
     
-    # Save learning data to main DB when present
-    if learning_data is not None:
-        db.record_ai_feedback(
-            session.game_session_id,
-            "tetris",
-            learning_data.get("player_action", ""),
-            learning_data.get("ai_response", ""),
-            learning_data.get("outcome", ""),
-            learning_data.get("difficulty_level", 0.5),
-            learning_data,
-        )
+    # Queue the feedback for learning and storage; under overload the state
+    # above is kept and the feedback is skipped
+    if feedback is not None and overloaded:
+        admission.degraded.inc(("tetris", "shed"))
+    elif feedback is not None:
+        learning.pipeline.submit("tetris", session.game_session_id, *feedback)
 
-    return {
+    active_sessions.save(session)
+    spectators.touch(session.session_id)
+    # Returned directly to skip jsonable_encoder; the model documents the shape
+    return FastJSONResponse({
         "ai_response": "action_recorded",
         "game_state": {
             "score": session.score,
@@ -209,93 +264,95 @@ def process_tetris_action(action: TetrisAction):
             "lines": session.lines_cleared,
             "ai_difficulty": session.ai_difficulty
         }
-    }
+    })
+
+@router.websocket("/spectate/{token}")
+async def spectate_tetris(websocket: WebSocket, token: str):
+    """Watch a live game by its spectator_token: JSON frames of its state, up to
+    ARCADE_SPECTATOR_FPS a second"""
+    await spectators.serve(websocket, token)
 
 @router.post("/end-session")
 def end_tetris_session(outcome: TetrisOutcome):
     """End a Tetris game session and record results"""
-    if outcome.session_id not in active_sessions:
+    session = active_sessions.get(outcome.session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Tetris session not found")
-    
-    session = active_sessions[outcome.session_id]
-    
-    # End session in database
-    db.end_game_session(session.game_session_id, outcome.final_score)
-    
-    # Update leaderboard if score is good
-    if outcome.final_score > 0:
-        db.update_leaderboard(
-            session.player_id, 
-            "tetris", 
-            outcome.final_score, 
-            session.ai_difficulty, 
-            session.game_session_id
-        )
-    
-    # Record final AI learning data
-    learning_data = tetris_agent.learn_from_outcome(
-        player_action="session_end",
-        ai_response="final_analysis",
-        outcome="session_completed",
-        game_context={
-            'final_score': outcome.final_score,
-            'level_reached': outcome.level_reached,
-            'lines_cleared': outcome.lines_cleared,
-            'game_duration': outcome.game_duration,
-            'ai_performance': outcome.ai_performance
-        }
-    )
-    
-    db.record_ai_feedback(
+
+    # End session, add to leaderboard if score is good and update the
+    # player's rating in a single transaction
+    ended, rating = db.finish_session(
         session.game_session_id,
+        session.player_id,
         "tetris",
-        learning_data.get("player_action", ""),
-        learning_data.get("ai_response", ""),
-        learning_data.get("outcome", ""),
-        learning_data.get("difficulty_level", 0.5),
-        learning_data,
+        outcome.final_score,
+        session.ai_difficulty,
+        ranked=outcome.final_score > 0,
+        result=ratings.game_result("tetris", final_score=outcome.final_score),
     )
 
-    # Remove from active sessions
-    del active_sessions[outcome.session_id]
+    # Final AI learning data, applied and stored in the background; only by
+    # the call that ended the session, so a repeated end is not learned twice
+    if ended:
+        learning.pipeline.submit("tetris", session.game_session_id, "session_end", "final_analysis",
+                                 "session_completed", {
+                                     'final_score': outcome.final_score,
+                                     'level_reached': outcome.level_reached,
+                                     'lines_cleared': outcome.lines_cleared,
+                                     'game_duration': outcome.game_duration,
+                                     'ai_performance': outcome.ai_performance
+                                 })
+
+    # Remove from active sessions; spectators get a final frame
+    active_sessions.pop(outcome.session_id, None)
+    spectators.touch(outcome.session_id)
 
     return {
         "message": "Tetris session ended",
         "final_score": outcome.final_score,
         "level_reached": outcome.level_reached,
         "lines_cleared": outcome.lines_cleared,
-        "ai_difficulty": session.ai_difficulty
+        "ai_difficulty": session.ai_difficulty,
+        "rating": rating
     }
 
 @router.get("/leaderboard")
-def get_tetris_leaderboard():
+def get_tetris_leaderboard(limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None):
     """Get Tetris leaderboard"""
-    leaderboard = db.get_leaderboard("tetris", 10)
-    return {
+    try:
+        page = db.get_leaderboard_page("tetris", limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({
         "game_type": "tetris",
-        "leaderboard": leaderboard,
-        "total_entries": len(leaderboard)
-    }
+        "leaderboard": page['entries'],
+        "total_entries": len(page['entries']),
+        "next_cursor": page['next_cursor']
+    })
 
 @router.get("/ai-stats")
-def get_tetris_ai_stats():
+def get_tetris_ai_stats(request: Request):
     """Get Tetris AI performance statistics"""
-    metrics = db.get_ai_metrics("tetris")
-    return {
-        "game_type": "tetris",
-        "ai_metrics": metrics,
-        "current_difficulty": tetris_agent.difficulty_level,
-        "performance_history": tetris_agent.ai_performance_history[-10:] if tetris_agent.ai_performance_history else []
-    }
+    etag = make_etag("tetris-ai-stats", db.metrics_version, tetris_agent.version)
+    
+    def build():
+        metrics = db.get_ai_metrics("tetris")
+        return {
+            "game_type": "tetris",
+            "ai_metrics": metrics,
+            "current_difficulty": tetris_agent.difficulty_level,
+            "performance_history": tetris_agent.ai_performance_history[-10:] if tetris_agent.ai_performance_history else []
+        }
+    
+    return conditional_json(request, etag, build)
 
 @router.get("/ai-suggestions")
 def get_ai_suggestions(session_id: str):
     """Get AI suggestions for optimal piece placement"""
-    if session_id not in active_sessions:
+    session = active_sessions.get(session_id)
+    if session is None:
         raise HTTPException(status_code=404, detail="Tetris session not found")
     
-    session = active_sessions[session_id]
-    
     # Simple AI suggestions based on current game state
     suggestions = {
         "placement_hints": [
@@ -308,5 +365,3 @@ def get_ai_suggestions(session_id: str):
     }
     
     return suggestions
-
-print("✅ Enhanced Tetris route loaded with AI integration")
@@ -0,0 +1,43 @@
+"""
+Production entry point: ``python -m api.serve``.
+
+Runs uvicorn on $PORT with $WEB_CONCURRENCY worker processes (default 1);
+api.shared_state covers what the workers share. Use this rather than
+``uvicorn --workers``: with more than one worker uvicorn binds the listening
+socket without IPPROTO_TCP, so asyncio never sets TCP_NODELAY on accepted
+connections and every response (headers and body are two writes) waits
+~40 ms for the client's delayed ACK. Here the listening socket is bound with
+TCP_NODELAY set and handed to uvicorn by file descriptor (its public ``fd``
+option), and accepted connections inherit the option.
+"""
+import os
+import socket
+
+import uvicorn
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", 8000))
+
+
+def _listening_socket() -> socket.socket:
+    """Socket bound to HOST:PORT with TCP_NODELAY, inheritable by the workers"""
+    family = socket.AF_INET6 if ":" in HOST else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((HOST, PORT))
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    workers = int(os.environ.get("WEB_CONCURRENCY") or 1)
+    sock = _listening_socket()
+    try:
+        uvicorn.run("api.main:app", fd=sock.fileno(), workers=workers)
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Game session tables (each game's ``active_sessions``).
+
+With one worker a table is a dict of the live session objects; with
+several (api.SHARED_STATE) it is api.shared_state.SharedSessions, which is
+only imported then. SessionCodec packs sessions to fixed-size records for
+the shared tables and for checkpoints (api.checkpoint).
+"""
+import operator
+import struct
+import threading
+from collections.abc import MutableMapping
+from dataclasses import fields, is_dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from api import SHARED_STATE
+
+
+class SessionCodec:
+    """Packs a session dataclass (all but its session_id) into a fixed-size struct
+
+    Fields may be ints, floats or dataclasses of those (the token bucket).
+    """
+
+    _CODES = {int: "q", float: "d"}
+
+    def __init__(self, cls):
+        if fields(cls)[0].name != "session_id":
+            raise TypeError(f"{cls.__name__} must start with its session_id")
+        self.cls = cls
+        # (start, end, nested dataclass) runs of the unpacked values, in field order
+        self.plan: List[Tuple[int, int, Optional[type]]] = []
+        names, codes = [], []
+        for f in fields(cls):
+            if f.name == "session_id":
+                continue
+            if f.type in self._CODES:
+                names.append(f.name)
+                codes.append(self._CODES[f.type])
+                if self.plan and self.plan[-1][2] is None:
+                    self.plan[-1] = (self.plan[-1][0], len(names), None)
+                else:
+                    self.plan.append((len(names) - 1, len(names), None))
+            elif is_dataclass(f.type) and all(sub.type in self._CODES for sub in fields(f.type)):
+                start = len(names)
+                names.extend(f"{f.name}.{sub.name}" for sub in fields(f.type))
+                codes.extend(self._CODES[sub.type] for sub in fields(f.type))
+                self.plan.append((start, len(names), f.type))
+            else:
+                raise TypeError(f"{cls.__name__}.{f.name} ({f.type!r}) cannot live in shared memory")
+        self.struct = struct.Struct("<" + "".join(codes))
+        # Flat field names in struct order ("bucket.tokens" for nested ones)
+        self.names = names
+        self._values = operator.attrgetter(*names)
+
+    def pack(self, session) -> bytes:
+        return self.struct.pack(*self._values(session))
+
+    def unpack(self, session_id: str, data: bytes, offset: int = 0):
+        return self.from_values(session_id, self.struct.unpack_from(data, offset))
+
+    def from_values(self, session_id: str, values):
+        """The session for unpacked ``values`` (in ``names`` order)"""
+        args = [session_id]
+        for start, end, nested in self.plan:
+            if nested is None:
+                args.extend(values[start:end])
+            else:
+                args.append(nested(*values[start:end]))
+        return self.cls(*args)
+
+
+class LocalSessions(dict):
+    """Single-worker ``active_sessions``: a dict, whose values are the live sessions
+
+    Sessions restored from a checkpoint (api.checkpoint) stay packed until a
+    request asks for one.
+    """
+
+    def __init__(self, codec: SessionCodec):
+        super().__init__()
+        self.codec = codec
+        # Set by api.checkpoint: rereads the checkpoint if it changed
+        self.reload: Optional[Callable[[], bool]] = None
+        self._lock = threading.Lock()
+        self._data = b""
+        self._packed: Dict[str, int] = {}
+        self._rebase: Optional[Callable] = None
+        # Taken from a checkpoint; a later checkpoint must not bring them back
+        self._claimed = set()
+
+    def get(self, session_id: str, default=None):
+        session = dict.get(self, session_id)
+        # Once the checkpoint is drained and no longer watched, a miss is a miss
+        if session is None and (self._packed or self.reload is not None):
+            session = self._restored(session_id)
+        return default if session is None else session
+
+    def __contains__(self, session_id) -> bool:
+        return dict.__contains__(self, session_id) or self.get(session_id) is not None
+
+    def pop(self, session_id: str, *default):
+        if self._packed:
+            self.get(session_id)  # Claim it, so a reload cannot restore it
+        return dict.pop(self, session_id, *default)
+
+    def __len__(self) -> int:
+        return dict.__len__(self) + len(self._packed)
+
+    def save(self, session) -> bool:
+        return True  # Changes were made to the stored object itself
+
+    def _restored(self, session_id: str):
+        session = self._claim(session_id)
+        if session is None and self.reload is not None and self.reload():
+            session = self._claim(session_id)
+        return session
+
+    def _claim(self, session_id: str):
+        with self._lock:
+            session = dict.get(self, session_id)
+            offset = self._packed.pop(session_id, None)
+            if session is None and offset is not None:
+                values = self.codec.struct.unpack_from(self._data, offset)
+                if self._rebase is not None:
+                    values = self._rebase(values)
+                session = self.codec.from_values(session_id, values)
+                dict.__setitem__(self, session_id, session)
+                self._claimed.add(session_id)
+            return session
+
+    def restore(self, data: bytes, offsets: Dict[str, int], rebase: Optional[Callable] = None):
+        """Take a checkpoint's sessions (packed at ``offsets`` in ``data``), replacing
+        any earlier checkpoint's that were never asked for; ``rebase`` fixes their
+        values up on decoding"""
+        with self._lock:
+            if self._claimed or dict.__len__(self):
+                offsets = {session_id: offset for session_id, offset in offsets.items()
+                           if session_id not in self._claimed and not dict.__contains__(self, session_id)}
+            self._data, self._packed, self._rebase = data, offsets, rebase
+
+    def export(self) -> Iterator[Tuple[bytes, bytes]]:
+        """(session id, packed session) for every session, including unclaimed ones"""
+        for session_id, session in list(self.items()):
+            yield session_id.encode(), self.codec.pack(session)
+        with self._lock:
+            data, packed, rebase = self._data, dict(self._packed), self._rebase
+        size = self.codec.struct.size
+        for session_id, offset in packed.items():
+            if rebase is None:
+                yield session_id.encode(), data[offset:offset + size]
+            else:
+                values = rebase(self.codec.struct.unpack_from(data, offset))
+                yield session_id.encode(), self.codec.struct.pack(*values)
+
+
+def active_sessions(game_type: str, cls) -> MutableMapping:
+    """A game's ``active_sessions``: shared between workers with SHARED_STATE, else a dict"""
+    if not SHARED_STATE:
+        return LocalSessions(SessionCodec(cls))
+    from api import shared_state
+    return shared_state.sessions(game_type, cls)
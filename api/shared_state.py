@@ -0,0 +1,613 @@
+"""
+Shared-memory state for multi-worker mode.
+
+``uvicorn --workers N`` (N from WEB_CONCURRENCY by default) starts N
+processes that share nothing, so each would learn its own difficulty and
+only know the sessions it started. With more than one worker, the agents'
+learned state, each game's active sessions and the leaderboard version live
+instead in one ``multiprocessing.shared_memory`` block that every worker
+attaches to by name, so any worker can serve any request. Only
+imported when api.SHARED_STATE is set.
+
+Records are guarded by seqlocks. A writer holds the record's lock (a
+thread lock plus an fcntl byte-range lock on a sidecar file at the
+record's offset, so only writers of the same record wait for each other)
+and sets the record's sequence number odd before writing and even after.
+Readers take no lock: they copy the record and retry if the sequence was
+odd or moved meanwhile.
+"""
+import atexit
+import os
+import platform
+import struct
+import threading
+import time
+import zlib
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from api import SHARED_STATE as ENABLED, WORKERS, metrics
+from api.sessions import SessionCodec
+
+# Workers of one server share their supervisor (uvicorn or gunicorn) as
+# parent; a single process has the block to itself
+REGION_NAME = os.environ.get("ARCADE_SHARED_NAME") or \
+    f"arcade-{os.getppid() if WORKERS > 1 else os.getpid()}"
+# Session slots per game. When a game's table is full, starting a session
+# evicts the longest-idle one near its slot
+SESSION_SLOTS = int(os.environ.get("ARCADE_SHARED_SESSIONS", 8192))
+# Slots looked at before a lookup gives up or an insert evicts
+PROBE_LIMIT = 32
+# Header, agents and counters, plus up to 512 bytes per slot for two games
+# (tmpfs only allocates the pages that get touched)
+REGION_BYTES = (1 << 20) + SESSION_SLOTS * 1024
+
+# Lock-free reads rely on stores becoming visible in program order (x86
+# TSO); elsewhere readers take the writer's lock instead
+LOCK_FREE_READS = platform.machine().lower() in ("x86_64", "amd64", "i386", "i686")
+# Spins on an odd sequence before checking whether its writer died mid-write
+MAX_SPINS = 1000
+
+_MAGIC = b"ARCADE01"
+# Magic, attached workers, sections in use, next free offset
+_HEADER = struct.Struct("<8sIIQ")
+# Section name, offset, size
+_ENTRY = struct.Struct("<32sQQ")
+MAX_SECTIONS = 64
+_DATA_START = 4096
+_ALIGN = 64
+# Lock-file bytes below _DATA_START that are not sections
+_REGION_LOCK = 0
+_LEADER_LOCK = 1
+
+_SEQ = struct.Struct("<Q")
+
+evicted = metrics.counter("arcade_shared_sessions_evicted_total",
+                          "Idle sessions evicted from a full shared session table", ("game",))
+
+
+def _align(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class Region:
+    """One named shared-memory block, carved into named sections"""
+
+    def __init__(self, name: str, size: int):
+        import fcntl, tempfile
+        from multiprocessing import resource_tracker, shared_memory
+
+        self.name = name
+        self._fcntl = fcntl
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()
+        with self._thread_lock, self.locked_byte(_REGION_LOCK):
+            try:
+                self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+                created = True
+            except FileExistsError:
+                self.shm = shared_memory.SharedMemory(name)
+                created = False
+            # The last worker to detach unlinks the block; left registered,
+            # the resource tracker would unlink it when the first one exits
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+            self.buf = self.shm.buf
+            if created:
+                _HEADER.pack_into(self.buf, 0, _MAGIC, 1, 0, _DATA_START)
+            else:
+                magic, attached, count, free = _HEADER.unpack_from(self.buf, 0)
+                if magic != _MAGIC:
+                    raise RuntimeError(f"Shared memory block {name} is not an arcade region")
+                _HEADER.pack_into(self.buf, 0, magic, attached + 1, count, free)
+        self.created = created
+        self._leader = False
+        self._detached = False
+
+    @property
+    def attached(self) -> int:
+        return _HEADER.unpack_from(self.buf, 0)[1]
+
+    @contextmanager
+    def locked_byte(self, offset: int) -> Iterator[None]:
+        """fcntl lock on one byte of the lock file; excludes other processes only"""
+        self._fcntl.lockf(self._lock_fd, self._fcntl.LOCK_EX, 1, offset)
+        try:
+            yield
+        finally:
+            self._fcntl.lockf(self._lock_fd, self._fcntl.LOCK_UN, 1, offset)
+
+    def section(self, name: str, size: int, initial: bytes = b"") -> int:
+        """Offset of section ``name``; the first worker to ask allocates it with ``initial``"""
+        key = name.encode()
+        with self._thread_lock, self.locked_byte(_REGION_LOCK):
+            magic, attached, count, free = _HEADER.unpack_from(self.buf, 0)
+            for i in range(count):
+                entry, offset, entry_size = _ENTRY.unpack_from(self.buf, _HEADER.size + i * _ENTRY.size)
+                if entry.rstrip(b"\0") == key:
+                    if entry_size != size:
+                        raise RuntimeError(f"Shared section {name} changed size; restart every worker")
+                    return offset
+            if count == MAX_SECTIONS or free + size > self.shm.size:
+                raise RuntimeError(f"Shared memory block {self.name} is full "
+                                   f"(lower ARCADE_SHARED_SESSIONS or restart every worker)")
+            self.buf[free:free + len(initial)] = initial
+            _ENTRY.pack_into(self.buf, _HEADER.size + count * _ENTRY.size, key, free, size)
+            _HEADER.pack_into(self.buf, 0, magic, attached, count + 1, free + _align(size))
+            return free
+
+    def elect_leader(self) -> bool:
+        """True in exactly one attached worker, which keeps the role until it exits"""
+        if not self._leader:
+            try:
+                self._fcntl.lockf(self._lock_fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB,
+                                  1, _LEADER_LOCK)
+            except OSError:
+                return False
+            self._leader = True
+        return True
+
+    def detach(self):
+        """Leave the block; the last worker out unlinks it and its lock file
+
+        The mapping itself stays valid until the process exits, so anything
+        still running in this worker keeps working.
+        """
+        if self._detached:
+            return
+        self._detached = True
+        with self._thread_lock, self.locked_byte(_REGION_LOCK):
+            magic, attached, count, free = _HEADER.unpack_from(self.buf, 0)
+            _HEADER.pack_into(self.buf, 0, magic, attached - 1, count, free)
+            if attached == 1:
+                from multiprocessing import resource_tracker
+                # unlink() unregisters the name again; balance it
+                resource_tracker.register(self.shm._name, "shared_memory")
+                self.shm.unlink()
+                os.remove(self._lock_path)
+
+
+class ProcessLock:
+    """A thread lock plus an fcntl lock on one byte: excludes threads and other workers"""
+
+    def __init__(self, region: Region, offset: int, thread_lock: Optional[threading.Lock] = None):
+        self.region = region
+        self.offset = offset
+        self._thread_lock = thread_lock or threading.Lock()
+        # On every session save, so fcntl is called directly rather than
+        # through Region.locked_byte
+        self._lockf = region._fcntl.lockf
+        self._fd = region._lock_fd
+        self._ex, self._un = region._fcntl.LOCK_EX, region._fcntl.LOCK_UN
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._lockf(self._fd, self._ex, 1, self.offset)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def __exit__(self, *exc):
+        try:
+            self._lockf(self._fd, self._un, 1, self.offset)
+        finally:
+            self._thread_lock.release()
+
+
+def read_stable(buf, offset: int, size: int, lock) -> Tuple[int, bytes]:
+    """(sequence, ``size`` bytes after it) of the seqlock at ``offset``, never torn"""
+    start = offset + _SEQ.size
+    if not LOCK_FREE_READS:
+        with lock:
+            return _SEQ.unpack_from(buf, offset)[0], bytes(buf[start:start + size])
+    spins = 0
+    while True:
+        seq = _SEQ.unpack_from(buf, offset)[0]
+        if not seq & 1:
+            data = bytes(buf[start:start + size])
+            if _SEQ.unpack_from(buf, offset)[0] == seq:
+                return seq, data
+        spins += 1
+        if spins == MAX_SPINS:
+            with lock:
+                # A live writer would have finished by the time we got the
+                # lock; an odd sequence now means one died mid-write
+                seq = _SEQ.unpack_from(buf, offset)[0]
+                if seq & 1:
+                    _SEQ.pack_into(buf, offset, seq + 1)
+                    seq += 1
+                return seq, bytes(buf[start:start + size])
+        os.sched_yield()
+
+
+@contextmanager
+def seq_write(buf, offset: int) -> Iterator[int]:
+    """Mark the record at ``offset`` as being written; the caller holds its lock"""
+    seq = _SEQ.unpack_from(buf, offset)[0] | 1
+    _SEQ.pack_into(buf, offset, seq)
+    try:
+        yield offset + _SEQ.size
+    finally:
+        _SEQ.pack_into(buf, offset, seq + 1)
+
+
+class SeqRecord:
+    """A fixed-size section guarded by a seqlock and a ProcessLock"""
+
+    def __init__(self, region: Region, name: str, initial: bytes):
+        self.region = region
+        self.size = len(initial)
+        self.offset = region.section(name, _SEQ.size + self.size, _SEQ.pack(0) + initial)
+        self.lock = ProcessLock(region, self.offset)
+
+    def read(self) -> bytes:
+        return read_stable(self.region.buf, self.offset, self.size, self.lock)[1]
+
+    @contextmanager
+    def write(self) -> Iterator[int]:
+        """Yields the offset of the record's data in ``region.buf``"""
+        with self.lock, seq_write(self.region.buf, self.offset) as data:
+            yield data
+
+
+class SharedCounter:
+    """A version number every worker bumps and reads, with the time of the last bump"""
+
+    _VALUE = struct.Struct("<Qd")
+
+    def __init__(self, region: Region, name: str):
+        self._record = SeqRecord(region, name, self._VALUE.pack(0, time.time()))
+
+    @property
+    def value(self) -> int:
+        return self._VALUE.unpack(self._record.read())[0]
+
+    @property
+    def updated_at(self) -> float:
+        return self._VALUE.unpack(self._record.read())[1]
+
+    def increment(self) -> int:
+        buf = self._record.region.buf
+        with self._record.write() as data:
+            value = self._VALUE.unpack_from(buf, data)[0] + 1
+            self._VALUE.pack_into(buf, data, value, time.time())
+        return value
+
+
+class SharedAgentState:
+    """A DifficultyAgent's learned state (see api.ai.difficulty_agent.AgentState) for all workers"""
+
+    # Version, difficulty and outcomes recorded so far; the window follows as a ring
+    _HEAD = struct.Struct("<QdQ")
+
+    def __init__(self, region: Region, name: str, memory_size: int, difficulty: float):
+        self.memory_size = memory_size
+        self._ring = struct.Struct(f"<{memory_size}d")
+        self._record = SeqRecord(region, name,
+                                self._HEAD.pack(0, difficulty, 0) + bytes(self._ring.size))
+
+    def _window(self, ring: Tuple[float, ...], total: int) -> List[float]:
+        """The last ``memory_size`` outcomes, oldest first"""
+        if total <= self.memory_size:
+            return list(ring[:total])
+        split = total % self.memory_size
+        return list(ring[split:] + ring[:split])
+
+    @property
+    def version(self) -> int:
+        return self._HEAD.unpack_from(self._record.read())[0]
+
+    @property
+    def difficulty(self) -> float:
+        return self._HEAD.unpack_from(self._record.read())[1]
+
+    @difficulty.setter
+    def difficulty(self, value: float):
+        buf = self._record.region.buf
+        with self._record.write() as data:
+            version, _, total = self._HEAD.unpack_from(buf, data)
+            self._HEAD.pack_into(buf, data, version, value, total)
+
+    @property
+    def history(self) -> List[float]:
+        """A copy; the shared window cannot be changed through it"""
+        data = self._record.read()
+        total = self._HEAD.unpack_from(data)[2]
+        return self._window(self._ring.unpack_from(data, self._HEAD.size), total)
+
+    def load(self, difficulty: float, history: List[float]):
+        history = history[-self.memory_size:]
+        buf = self._record.region.buf
+        with self._record.write() as data:
+            version = self._HEAD.unpack_from(buf, data)[0]
+            self._HEAD.pack_into(buf, data, version + 1, difficulty, len(history))
+            struct.pack_into(f"<{len(history)}d", buf, data + self._HEAD.size, *history)
+
+    def record(self, outcome: float, adjust: Callable[[float, List[float]], float]):
+        buf = self._record.region.buf
+        with self._record.write() as data:
+            version, difficulty, total = self._HEAD.unpack_from(buf, data)
+            ring_at = data + self._HEAD.size
+            struct.pack_into("<d", buf, ring_at + 8 * (total % self.memory_size), outcome)
+            total += 1
+            if total >= 10:
+                window = self._window(self._ring.unpack_from(buf, ring_at), total)
+                difficulty = adjust(difficulty, window[-10:])
+            self._HEAD.pack_into(buf, data, version + 1, difficulty, total)
+
+
+class SharedSessions(MutableMapping):
+    """session_id -> session dataclass, in a hash table every worker shares
+
+    Stands in for a game's ``active_sessions`` dict, except that values are
+    copies: handlers call ``save(session)`` after changing one.
+    """
+
+    EMPTY, LIVE, DELETED = 0, 1, 2
+    # After each slot's sequence number: state, whether it holds a checkpoint's
+    # copy not written since, session id, last write (epoch seconds)
+    _SLOT = struct.Struct("<BB2x36sd")
+    _LIVE_COUNT = struct.Struct("<Q")
+
+    def __init__(self, region: Region, game_type: str, codec: SessionCodec, slots: int):
+        self.region = region
+        self.game_type = game_type
+        self.codec = codec
+        self.slots = slots
+        self.slot_size = _align(_SEQ.size + self._SLOT.size + codec.struct.size)
+        self.offset = region.section(f"sessions:{game_type}", _ALIGN + slots * self.slot_size)
+        # Serializes this process's writers; the fcntl byte locks then keep
+        # other workers out of the table (inserts, deletes) or a slot (saves)
+        self._thread_lock = threading.Lock()
+        self.lock = ProcessLock(region, self.offset, self._thread_lock)
+        self._slot_locks: Dict[int, ProcessLock] = {}
+        # Set by api.checkpoint: rereads the checkpoint if it changed
+        self.reload: Optional[Callable[[], bool]] = None
+
+    def _slot(self, index: int) -> int:
+        return self.offset + _ALIGN + index * self.slot_size
+
+    def _probe(self, key: bytes) -> Iterator[int]:
+        start = zlib.crc32(key) % self.slots
+        for step in range(min(PROBE_LIMIT, self.slots)):
+            yield (start + step) % self.slots
+
+    def _slot_lock(self, index: int) -> ProcessLock:
+        lock = self._slot_locks.get(index)
+        if lock is None:
+            lock = self._slot_locks[index] = ProcessLock(self.region, self._slot(index), self._thread_lock)
+        return lock
+
+    def _find(self, key: bytes) -> Optional[Tuple[int, int, bytes]]:
+        """(slot index, sequence, slot bytes) of ``key``, read without locking"""
+        buf = self.region.buf
+        size = self.slot_size - _SEQ.size
+        for index in self._probe(key):
+            seq, data = read_stable(buf, self._slot(index), size, self._slot_lock(index))
+            state, _, slot_key, _ = self._SLOT.unpack_from(data)
+            if state == self.EMPTY:
+                return None
+            if state == self.LIVE and slot_key == key:
+                return index, seq, data
+        return None
+
+    def _lookup(self, session_id: str) -> Optional[Tuple[int, int, bytes]]:
+        key = session_id.encode()
+        found = self._find(key)
+        if found is None and self.reload is not None and self.reload():
+            found = self._find(key)
+        return found
+
+    def __getitem__(self, session_id: str):
+        found = self._lookup(session_id)
+        if found is None:
+            raise KeyError(session_id)
+        return self.codec.unpack(session_id, found[2], self._SLOT.size)
+
+    def get(self, session_id: str, default=None):
+        found = self._lookup(session_id)
+        if found is None:
+            return default
+        return self.codec.unpack(session_id, found[2], self._SLOT.size)
+
+    def __contains__(self, session_id) -> bool:
+        return isinstance(session_id, str) and self._lookup(session_id) is not None
+
+    def version(self, session_id: str) -> Optional[int]:
+        """Changes with every write to the session; None once it is gone"""
+        found = self._find(session_id.encode())
+        return None if found is None else found[1]
+
+    def _write(self, offset: int, state: int, key: bytes, payload: bytes, restored: bool = False):
+        buf = self.region.buf
+        with seq_write(buf, offset) as data:
+            self._SLOT.pack_into(buf, data, state, restored, key, time.time())
+            buf[data + self._SLOT.size:data + self._SLOT.size + len(payload)] = payload
+
+    def save(self, session) -> bool:
+        """Store changes to a session; False if it ended (or was evicted) meanwhile"""
+        key = session.session_id.encode()
+        payload = self.codec.pack(session)
+        buf = self.region.buf
+        for index in self._probe(key):
+            # Unguarded read: only picks the slot, which is checked again
+            # under its lock
+            offset = self._slot(index)
+            state, _, slot_key, _ = self._SLOT.unpack_from(buf, offset + _SEQ.size)
+            if state == self.EMPTY:
+                return False
+            if state == self.LIVE and slot_key == key:
+                with self._slot_lock(index):
+                    state, _, slot_key, _ = self._SLOT.unpack_from(buf, offset + _SEQ.size)
+                    if state != self.LIVE or slot_key != key:
+                        return False
+                    self._write(offset, self.LIVE, key, payload)
+                return True
+        return False
+
+    def __setitem__(self, session_id: str, session):
+        self._store(session_id.encode(), self.codec.pack(session))
+
+    def _store(self, key: bytes, payload: bytes, restoring: bool = False) -> bool:
+        """Write a packed session; ``restoring`` one from a checkpoint only if the
+        table never had it or still holds an earlier checkpoint's copy"""
+        buf = self.region.buf
+        with self.lock:
+            # State and key only change under the table lock, so they can
+            # be read directly here
+            target = free = stalest = None
+            stalest_at = float("inf")
+            for index in self._probe(key):
+                state, restored, slot_key, touched = self._SLOT.unpack_from(buf, self._slot(index) + _SEQ.size)
+                if state == self.LIVE:
+                    if slot_key == key:
+                        if restoring and not restored:
+                            return False  # Played since
+                        target = index
+                        break
+                    if touched < stalest_at:
+                        stalest, stalest_at = index, touched
+                else:
+                    if restoring and state == self.DELETED and slot_key == key:
+                        return False  # Ended since
+                    if free is None:
+                        free = index
+                if state == self.EMPTY:
+                    break
+            if target is None:
+                target = free
+            if target is None:
+                target = stalest
+                evicted.inc((self.game_type,))
+            offset = self._slot(target)
+            with self.region.locked_byte(offset):
+                state, restored, slot_key, _ = self._SLOT.unpack_from(buf, offset + _SEQ.size)
+                if restoring and state == self.LIVE and slot_key == key and not restored:
+                    return False  # Saved by another worker just now
+                self._write(offset, self.LIVE, key, payload, restored=restoring)
+            if state != self.LIVE:
+                self._add_live(1)
+        return True
+
+    def __delitem__(self, session_id: str):
+        key = session_id.encode()
+        buf = self.region.buf
+        with self.lock:
+            for index in self._probe(key):
+                offset = self._slot(index)
+                state, _, slot_key, _ = self._SLOT.unpack_from(buf, offset + _SEQ.size)
+                if state == self.EMPTY:
+                    break
+                if state == self.LIVE and slot_key == key:
+                    with self.region.locked_byte(offset):
+                        self._write(offset, self.DELETED, key, b"")
+                    self._add_live(-1)
+                    return
+        raise KeyError(session_id)
+
+    def _add_live(self, amount: int):
+        # Under the table lock
+        count = self._LIVE_COUNT.unpack_from(self.region.buf, self.offset)[0]
+        self._LIVE_COUNT.pack_into(self.region.buf, self.offset, count + amount)
+
+    def __len__(self) -> int:
+        return self._LIVE_COUNT.unpack_from(self.region.buf, self.offset)[0]
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self.export():
+            yield key.decode()
+
+    def restore(self, data: bytes, offsets: Dict[str, int], rebase: Optional[Callable] = None):
+        """Copy a checkpoint's sessions (packed at ``offsets`` in ``data``) into the
+        table, replacing any earlier checkpoint's that were not played since;
+        ``rebase`` fixes their values up"""
+        size = self.codec.struct.size
+        for session_id, offset in offsets.items():
+            if rebase is None:
+                payload = data[offset:offset + size]
+            else:
+                payload = self.codec.struct.pack(*rebase(self.codec.struct.unpack_from(data, offset)))
+            self._store(session_id.encode(), payload, restoring=True)
+        # Earlier checkpoints' sessions missing from this one ended meanwhile
+        buf = self.region.buf
+        with self.lock:
+            for index in range(self.slots):
+                offset = self._slot(index)
+                state, restored, key, _ = self._SLOT.unpack_from(buf, offset + _SEQ.size)
+                if state != self.LIVE or not restored or key.decode() in offsets:
+                    continue
+                with self.region.locked_byte(offset):
+                    if self._SLOT.unpack_from(buf, offset + _SEQ.size)[1]:
+                        self._write(offset, self.DELETED, key, b"")
+                        self._add_live(-1)
+
+    def export(self) -> Iterator[Tuple[bytes, bytes]]:
+        """(session id, packed session) for every live session"""
+        size = self.slot_size - _SEQ.size
+        for index in range(self.slots):
+            _, data = read_stable(self.region.buf, self._slot(index), size, self._slot_lock(index))
+            state, _, key, _ = self._SLOT.unpack_from(data)
+            if state == self.LIVE:
+                yield key, data[self._SLOT.size:self._SLOT.size + self.codec.struct.size]
+
+
+_region: Optional[Region] = None
+_region_lock = threading.Lock()
+_named_locks: Dict[str, ProcessLock] = {}
+
+
+def region() -> Region:
+    """This server's shared block, created by the first worker and attached by the rest"""
+    global _region
+    if _region is None:
+        with _region_lock:
+            if _region is None:
+                _region = Region(REGION_NAME, REGION_BYTES)
+                # Servers detach on shutdown (uvicorn workers end by re-raising
+                # SIGTERM, which skips atexit); this covers scripts
+                atexit.register(_region.detach)
+    return _region
+
+
+def detach():
+    """Call on shutdown: the last worker to leave removes the block"""
+    if _region is not None:
+        _region.detach()
+
+
+def instance_token() -> str:
+    """Random per server start and the same in every worker"""
+    shared = region()
+    offset = shared.section("instance", 8, os.urandom(4).hex().encode())
+    return bytes(shared.buf[offset:offset + 8]).decode()
+
+
+def agent_state(game_type: str, memory_size: int, difficulty: float) -> SharedAgentState:
+    return SharedAgentState(region(), f"agent:{game_type}", memory_size, difficulty)
+
+
+def counter(name: str) -> SharedCounter:
+    return SharedCounter(region(), f"counter:{name}")
+
+
+def sessions(game_type: str, cls) -> "SharedSessions":
+    """A game's ``active_sessions`` table, shared between workers"""
+    return SharedSessions(region(), game_type, SessionCodec(cls), SESSION_SLOTS)
+
+
+def lock(name: str):
+    """A lock held across all workers when ENABLED (a no-op context otherwise)"""
+    if not ENABLED:
+        return nullcontext()
+    held = _named_locks.get(name)
+    if held is None:
+        shared = region()
+        held = _named_locks.setdefault(name, ProcessLock(shared, shared.section(f"lock:{name}", 8)))
+    return held
+
+
+def elect_leader() -> bool:
+    """Whether this worker runs once-per-server jobs (always True with one worker)"""
+    return not ENABLED or region().elect_leader()
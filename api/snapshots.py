@@ -0,0 +1,180 @@
+"""
+Compressed online snapshots of the SQLite database.
+
+A snapshot is a gzip of a consistent copy made with SQLite's backup API,
+a few pages per step with short sleeps in between. The database runs in
+WAL mode, so writers keep committing while the copy is taken. Restoring decompresses the snapshot
+into place before the first connection opens, so a fresh instance starts
+with the full leaderboard and skips schema setup (user_version matches).
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from api import metrics
+
+BACKUP_PAGES_PER_STEP = 64
+BACKUP_STEP_SLEEP = 0.002
+# Without WAL (e.g. no shared-memory support) SQLite restarts a backup when
+# another connection writes mid-copy; give up after this many passes over
+# the file and try again on the next tick
+MAX_BACKUP_PASSES = 5
+COPY_BUFFER = 1024 * 1024
+
+snapshots_total = metrics.counter(
+    "arcade_db_snapshots_total", "Database snapshot attempts by result", ("result",))
+snapshot_latency = metrics.histogram(
+    "arcade_db_snapshot_duration_seconds", "Time to copy and compress a snapshot",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+
+class BackupAborted(Exception):
+    pass
+
+
+def _sidecar_files(db_path: str):
+    return [db_path + suffix for suffix in ("-journal", "-wal", "-shm")]
+
+
+def write_snapshot(source: sqlite3.Connection, snapshot_path: str,
+                   pages: int = BACKUP_PAGES_PER_STEP,
+                   sleep: float = BACKUP_STEP_SLEEP) -> Dict:
+    """Copy ``source`` page by page, then gzip it to ``snapshot_path`` atomically"""
+    import gzip, shutil, tempfile
+
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    passes = 1
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal passes, last_remaining
+        # A restart shows up as the remaining page count going back up
+        if last_remaining is not None and remaining > last_remaining:
+            passes += 1
+            if passes > MAX_BACKUP_PASSES:
+                raise BackupAborted("Database kept changing during backup")
+        last_remaining = remaining
+
+    fd, copy_path = tempfile.mkstemp(suffix=".db", dir=directory)
+    os.close(fd)
+    compressed_path = snapshot_path + ".tmp"
+    try:
+        target = sqlite3.connect(copy_path)
+        try:
+            # One read transaction for the whole copy: in WAL mode it pins a
+            # consistent view, so concurrent commits neither wait for the
+            # backup nor force it to restart
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            source.backup(target, pages=pages, progress=progress, sleep=sleep)
+        finally:
+            if source.in_transaction:
+                source.rollback()
+            target.close()
+        size = os.path.getsize(copy_path)
+        with open(copy_path, "rb") as raw, gzip.open(compressed_path, "wb", compresslevel=6) as out:
+            shutil.copyfileobj(raw, out, COPY_BUFFER)
+        os.replace(compressed_path, snapshot_path)
+    finally:
+        for path in (copy_path, compressed_path):
+            if os.path.exists(path):
+                os.remove(path)
+    elapsed = time.perf_counter() - start
+    snapshot_latency.observe((), elapsed)
+    return {
+        "path": snapshot_path,
+        "bytes": size,
+        "compressed_bytes": os.path.getsize(snapshot_path),
+        "seconds": round(elapsed, 4)
+    }
+
+
+def restore_snapshot(snapshot_path: str, db_path: str) -> bool:
+    """Decompress a snapshot into ``db_path`` unless a database is already there"""
+    if os.path.exists(db_path) or not os.path.exists(snapshot_path):
+        return False
+    # Imported on use so cold starts without a snapshot never pay for them
+    import gzip, shutil, tempfile
+
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    # A leftover journal would be replayed against the restored file
+    for path in _sidecar_files(db_path):
+        if os.path.exists(path):
+            os.remove(path)
+    fd, restore_path = tempfile.mkstemp(suffix=".restore", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out, gzip.open(snapshot_path, "rb") as raw:
+            shutil.copyfileobj(raw, out, COPY_BUFFER)
+        os.replace(restore_path, db_path)
+    finally:
+        if os.path.exists(restore_path):
+            os.remove(restore_path)
+    return True
+
+
+def _file_stamp(db_path: str):
+    stamp = []
+    for path in (db_path, *_sidecar_files(db_path)):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
+
+
+class SnapshotScheduler:
+    """Background thread that snapshots the database when its files change"""
+
+    def __init__(self, database, interval: float):
+        self.database = database
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_stamp = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="arcade-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self, final: bool = True):
+        """Stop the thread and, by default, take one last snapshot"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if final:
+            self.snapshot_if_changed()
+
+    def snapshot_if_changed(self) -> Optional[Dict]:
+        # Every file the database spans (the main one plus game shards)
+        stamp = tuple(_file_stamp(path) for path in self.database.db_files)
+        if stamp == self._last_stamp or stamp[0][0] is None:
+            snapshots_total.inc(("unchanged",))
+            return None
+        try:
+            result = self.database.snapshot()
+        except BackupAborted:
+            snapshots_total.inc(("aborted",))
+            return None
+        except Exception as e:
+            snapshots_total.inc(("error",))
+            print(f"Database snapshot error: {e}")  # noqa: T201
+            return None
+        snapshots_total.inc(("written",))
+        self._last_stamp = stamp
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.snapshot_if_changed()
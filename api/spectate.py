@@ -0,0 +1,213 @@
+"""
+Spectator fan-out for live sessions (/pingpong/spectate/{token}, /tetris/spectate/{token}).
+
+Viewers connect with the session's spectator token from start-session, never
+its session_id, which is the player's credential for /action and
+/end-session. The token is the session_id encrypted under a random key kept
+in the database, so every worker (and the next deploy) can open it without
+a shared token table, and it reveals nothing about the session_id.
+
+Action handlers only mark a watched session dirty, which is one dict
+lookup when nobody is watching. While a session has spectators, one ticker
+task serializes its state at most ``SPECTATOR_FPS`` times a second, once
+for all of them, and wakes them. Each viewer then sends the newest frame
+when its socket is ready, so a slow viewer skips frames instead of queueing
+them, and the player's action rate never reaches the viewers.
+
+In multi-worker mode the action may have run in another worker, so the
+ticker also watches the session's version in the shared table.
+
+Frames are JSON text: {"seq", "game_type", "spectator_token", "state", "ended"};
+the last one has ended=true and the socket is then closed.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from api import metrics
+from api.fast_json import dumps
+
+SPECTATOR_FPS = float(os.environ.get("ARCADE_SPECTATOR_FPS", 20))
+MAX_SPECTATORS = int(os.environ.get("ARCADE_MAX_SPECTATORS", 5000))
+
+frames_encoded = metrics.counter("arcade_spectator_frames_total",
+                                 "Spectator frames serialized (once per tick for all viewers)", ("game",))
+
+_NONCE = 12
+_key: Optional[bytes] = None
+
+
+def _pad(nonce: bytes) -> bytes:
+    global _key
+    if _key is None:
+        from api.database import db
+        _key = db.server_secret("spectator")
+    return hmac.new(_key, nonce, hashlib.sha256).digest()[:16]
+
+
+def spectator_token(session_id: str) -> str:
+    """A token for watching ``session_id`` that cannot be turned back into it"""
+    nonce = os.urandom(_NONCE)
+    sealed = bytes(a ^ b for a, b in zip(uuid.UUID(session_id).bytes, _pad(nonce)))
+    return base64.urlsafe_b64encode(nonce + sealed).decode().rstrip("=")
+
+
+def token_session(token: str) -> Optional[str]:
+    """The session_id a spectator token was issued for; None if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) != _NONCE + 16:
+        return None
+    nonce, sealed = raw[:_NONCE], raw[_NONCE:]
+    return str(uuid.UUID(bytes=bytes(a ^ b for a, b in zip(sealed, _pad(nonce)))))
+
+
+class Channel:
+    """The latest frame of one watched session and the viewers waiting on it"""
+
+    def __init__(self, game_type: str, token: str, render: Callable[[], Optional[Dict]],
+                 stamp: Optional[Callable[[], object]] = None):
+        self.game_type = game_type
+        self.token = token
+        self.render = render
+        # Returns something that changes with the session (shared sessions only)
+        self.stamp = stamp
+        self._stamp = None
+        self.viewers = 0
+        # Set from any thread by Spectators.touch; read by the ticker
+        self.dirty = True
+        self.ended = False
+        self.seq = 0
+        self.frame: Optional[str] = None
+        self._state: Optional[Dict] = None
+        self._changed = asyncio.Event()
+        self._ticker: Optional[asyncio.Task] = None
+
+    async def next_frame(self, seen: int) -> Tuple[int, Optional[str]]:
+        """The newest frame after ``seen``; (seen, None) once the session ended"""
+        while self.seq == seen:
+            if self.ended:
+                return seen, None
+            await self._changed.wait()
+        return self.seq, self.frame
+
+    def start(self):
+        if self._ticker is None:
+            self._ticker = asyncio.get_running_loop().create_task(self._tick())
+
+    async def _tick(self):
+        interval = 1 / SPECTATOR_FPS
+        try:
+            while self.viewers and not self.ended:
+                if self.stamp is not None:
+                    stamp = self.stamp()
+                    if stamp != self._stamp:
+                        self._stamp = stamp
+                        self.dirty = True
+                if self.dirty:
+                    self.dirty = False
+                    state = self.render()
+                    if state is None:
+                        # Session over (or evicted): repeat the last state as final
+                        self._publish(self._state or {}, ended=True)
+                    else:
+                        self._publish(state, ended=False)
+                await asyncio.sleep(interval)
+        finally:
+            self._ticker = None
+
+    def _publish(self, state: Dict, ended: bool):
+        self._state = state
+        self.seq += 1
+        self.frame = dumps({"seq": self.seq, "game_type": self.game_type,
+                            "spectator_token": self.token, "state": state,
+                            "ended": ended}).decode()
+        self.ended = ended
+        frames_encoded.inc((self.game_type,))
+        # Wake everyone waiting on the old event; later waiters use the new one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+
+class Spectators:
+    """Spectator channels for one game's ``active_sessions``"""
+
+    def __init__(self, game_type: str, sessions: Dict, state: Callable[[object], Dict]):
+        self.game_type = game_type
+        self.sessions = sessions
+        self.state = state
+        self.channels: Dict[str, Channel] = {}
+        # Shared session tables (api.shared_state) expose a per-session version
+        self._version = getattr(sessions, "version", None)
+
+    @property
+    def viewer_count(self) -> int:
+        return sum(channel.viewers for channel in list(self.channels.values()))
+
+    def touch(self, session_id: str):
+        """Call after changing a session's state (or removing the session)"""
+        channel = self.channels.get(session_id)
+        if channel is not None:
+            channel.dirty = True
+
+    def _render(self, session_id: str) -> Optional[Dict]:
+        session = self.sessions.get(session_id)
+        return None if session is None else self.state(session)
+
+    async def serve(self, websocket: WebSocket, token: str):
+        session_id = token_session(token)
+        if session_id is None or session_id not in self.sessions:
+            await websocket.close(code=4404, reason="Game session not found")
+            return
+        channel = self.channels.get(session_id)
+        if channel is None:
+            stamp = None if self._version is None else (lambda: self._version(session_id))
+            channel = self.channels[session_id] = Channel(
+                self.game_type, token, lambda: self._render(session_id), stamp)
+        if channel.viewers >= MAX_SPECTATORS:
+            await websocket.close(code=1013, reason="Too many spectators")
+            return
+        await websocket.accept()
+        channel.viewers += 1
+        channel.start()
+
+        # Frames only flow one way; the reader is there to notice the
+        # viewer leaving while no frame is due
+        viewer = asyncio.current_task()
+        left = False
+
+        async def watch_disconnect():
+            nonlocal left
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+            left = True
+            viewer.cancel()
+
+        reader = asyncio.get_running_loop().create_task(watch_disconnect())
+        seen = 0
+        try:
+            while True:
+                seen, frame = await channel.next_frame(seen)
+                if frame is None:
+                    break
+                await websocket.send_text(frame)
+            await websocket.close()
+        except asyncio.CancelledError:
+            if not left:
+                raise
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            pass  # Gone mid-send
+        finally:
+            reader.cancel()
+            channel.viewers -= 1
+            if not channel.viewers and self.channels.get(session_id) is channel:
+                del self.channels[session_id]
@@ -0,0 +1,10 @@
+const hum=document.getElementById('hum');
+const hover=document.getElementById('hover');
+window.addEventListener('click',()=>hum.play(),{once:true});
+document.querySelectorAll('.game-card').forEach(btn=>{
+btn.addEventListener('mouseenter',()=>{hover.currentTime=0;hover.play();});
+btn.addEventListener('touchend',()=>{hover.currentTime=0;hover.play();},{passive:true});
+});
+if ('serviceWorker' in navigator) {
+window.addEventListener('load', () => navigator.serviceWorker.register('/service-worker.js'));
+};
\ No newline at end of file
@@ -0,0 +1,434 @@
+const canvas = document.getElementById('pong');
+const ctx = canvas.getContext('2d');
+const paddleHeight = 100, paddleWidth = 10;
+let gameState = {
+sessionId: null,
+playerY: canvas.height/2 - paddleHeight/2,
+aiY: canvas.height/2 - paddleHeight/2,
+ballX: canvas.width/2,
+ballY: canvas.height/2,
+ballSpeedX: 5,
+ballSpeedY: 5,
+initialBallSpeedX: 5,
+initialBallSpeedY: 5,
+playerScore: 0,
+aiScore: 0,
+aiDifficulty: 0.5,
+aiParams: {},
+aiSeed: Math.floor(Math.random() * 4294967296),
+tick: 0,
+sync: null,
+gameStarted: false,
+lastHitTime: 0,
+gameOver: false
+};
+const sounds = {
+hit: document.getElementById('hit'),
+score: document.getElementById('score-sound'),
+wallHit: document.getElementById('wall-hit'),
+gameStart: document.getElementById('game-start'),
+victory: document.getElementById('victory')
+};
+function playSound(soundName) {
+try {
+const sound = sounds[soundName];
+if (sound) {
+sound.currentTime = 0;
+sound.play().catch(e => {
+console.log('Sound play failed, using BASS BOOM:', e);
+createBassBoom(soundName);
+});
+} else {
+createBassBoom(soundName);
+}
+} catch (e) {
+console.log('Sound error, using BASS BOOM:', e);
+createBassBoom(soundName);
+}
+}
+function createBassBoom(soundName) {
+try {
+const audioContext = new (window.AudioContext || window.webkitAudioContext)();
+const oscillators = [];
+const gainNodes = [];
+let frequencies = [60, 80, 100];
+let duration = 0.3;
+switch(soundName) {
+case 'hit':
+frequencies = [80, 120, 160];
+duration = 0.2;
+break;
+case 'score':
+frequencies = [60, 90, 120];
+duration = 0.4;
+break;
+case 'wallHit':
+frequencies = [70, 100, 140];
+duration = 0.15;
+break;
+case 'gameStart':
+frequencies = [50, 75, 100];
+duration = 0.6;
+break;
+case 'victory':
+frequencies = [40, 60, 80, 100];
+duration = 1.0;
+break;
+}
+frequencies.forEach((freq, index) => {
+const oscillator = audioContext.createOscillator();
+const gainNode = audioContext.createGain();
+const filter = audioContext.createBiquadFilter();
+oscillator.connect(filter);
+filter.connect(gainNode);
+gainNode.connect(audioContext.destination);
+oscillator.type = 'sawtooth'; // Rich harmonics
+oscillator.frequency.setValueAtTime(freq, audioContext.currentTime);
+filter.type = 'lowpass';
+filter.frequency.setValueAtTime(200, audioContext.currentTime);
+filter.Q.setValueAtTime(1, audioContext.currentTime);
+const now = audioContext.currentTime;
+gainNode.gain.setValueAtTime(0, now);
+gainNode.gain.linearRampToValueAtTime(0.8, now + 0.01);
+gainNode.gain.exponentialRampToValueAtTime(0.1, now + duration * 0.3);
+gainNode.gain.exponentialRampToValueAtTime(0.01, now + duration);
+oscillator.start(now);
+oscillator.stop(now + duration);
+oscillators.push(oscillator);
+gainNodes.push(gainNode);
+});
+const distortion = audioContext.createWaveShaper();
+const distortionGain = audioContext.createGain();
+const samples = 44100;
+const curve = new Float32Array(samples);
+const deg = Math.PI / 180;
+for (let i = 0; i < samples; i++) {
+const x = (i * 2) / samples - 1;
+curve[i] = ((3 + 20) * x * 20 * deg) / (Math.PI + 20 * Math.abs(x));
+}
+distortion.curve = curve;
+distortion.oversample = '4x';
+gainNodes.forEach(gainNode => {
+gainNode.connect(distortion);
+});
+distortion.connect(distortionGain);
+distortionGain.connect(audioContext.destination);
+distortionGain.gain.setValueAtTime(0.3, audioContext.currentTime);
+} catch (e) {
+console.log('Web Audio API not available for BASS BOOM');
+}
+}
+function playerKey() {
+try {
+let key = localStorage.getItem('arcade-player-key');
+if (!key) {
+key = Array.from(crypto.getRandomValues(new Uint8Array(16)),
+b => b.toString(16).padStart(2, '0')).join('');
+localStorage.setItem('arcade-player-key', key);
+}
+return key;
+} catch (e) {
+return null;
+}
+}
+async function initGame() {
+try {
+const response = await fetch('/pingpong/start-session', {
+method: 'POST',
+headers: { 'Content-Type': 'application/json' },
+body: JSON.stringify({ player_key: playerKey() })
+});
+const data = await response.json();
+gameState.sessionId = data.session_id;
+gameState.aiDifficulty = data.ai_difficulty;
+gameState.aiParams = data.ai_params;
+gameState.aiSeed = data.ai_seed;
+gameState.tick = 0;
+gameState.sync = null;
+document.getElementById('ai-difficulty').textContent = gameState.aiDifficulty.toFixed(2);
+document.getElementById('ai-prediction').textContent = Math.round(gameState.aiParams.prediction_accuracy * 100) + '%';
+document.getElementById('loading').style.display = 'none';
+gameState.gameStarted = true;
+playSound('gameStart');
+console.log('Game initialized with AI difficulty:', gameState.aiDifficulty);
+} catch (error) {
+console.error('Failed to initialize game:', error);
+document.getElementById('loading').textContent = 'Failed to connect to AI. Playing offline...';
+setTimeout(() => {
+document.getElementById('loading').style.display = 'none';
+gameState.gameStarted = true;
+playSound('gameStart');
+}, 2000);
+}
+}
+async function sendGameAction(actionType, actionData) {
+if (!gameState.sessionId || !gameState.gameStarted) return;
+const payload = {
+...actionData,
+ball_x: gameState.ballX,
+ball_y: gameState.ballY,
+ball_speed_x: gameState.ballSpeedX,
+ball_speed_y: gameState.ballSpeedY,
+player_y: gameState.playerY,
+ai_y: gameState.aiY,
+tick: gameState.tick
+};
+gameState.sync = {
+tick: gameState.tick,
+ballX: gameState.ballX,
+ballY: gameState.ballY,
+ballSpeedX: gameState.ballSpeedX,
+ballSpeedY: gameState.ballSpeedY,
+aiY: gameState.aiY
+};
+try {
+const response = await fetch('/pingpong/action', {
+method: 'POST',
+headers: { 'Content-Type': 'application/json' },
+body: JSON.stringify({
+session_id: gameState.sessionId,
+action_type: actionType,
+action_data: payload,
+timestamp: Date.now()
+})
+});
+const data = await response.json();
+if (data.ai_move) {
+reconcileAI(data.ai_move);
+}
+if (data.scores) {
+gameState.playerScore = data.scores.player;
+gameState.aiScore = data.scores.ai;
+updateScoreDisplay();
+}
+} catch (error) {
+console.error('Failed to send game action:', error);
+}
+}
+async function endSessionAndReset() {
+try {
+await fetch('/pingpong/end-session', {
+method: 'POST',
+headers: { 'Content-Type': 'application/json' },
+body: JSON.stringify({
+session_id: gameState.sessionId,
+winner: gameState.playerScore > gameState.aiScore ? 'player' : (gameState.aiScore > gameState.playerScore ? 'ai' : 'ongoing'),
+final_score: { player: gameState.playerScore, ai: gameState.aiScore },
+game_duration: 0,
+ai_performance: { difficulty: gameState.aiDifficulty }
+})
+});
+} catch (e) {
+console.error('End session failed:', e);
+}
+resetGame();
+await initGame();
+}
+function updateScoreDisplay() {
+document.getElementById('score').textContent = `${gameState.playerScore} : ${gameState.aiScore}`;
+if (gameState.playerScore >= 5 || gameState.aiScore >= 5) {
+gameState.gameOver = true;
+playSound('victory');
+setTimeout(() => {
+alert(`Game Over! Final Score: ${gameState.playerScore} - ${gameState.aiScore}`);
+endSessionAndReset();
+}, 1000);
+}
+}
+function resetGame() {
+gameState.playerScore = 0;
+gameState.aiScore = 0;
+gameState.gameOver = false;
+resetBall();
+updateScoreDisplay();
+}
+const AI_DRAWS = 5;
+const AI_AIM_ERROR = 50 * Math.sqrt(3);
+function aiRandom(seed, tick, draw) {
+let t = (seed + Math.imul(tick * AI_DRAWS + draw, 0x6D2B79F5)) >>> 0;
+t = Math.imul(t ^ t >>> 15, t | 1);
+t ^= t + Math.imul(t ^ t >>> 7, t | 61);
+return ((t ^ t >>> 14) >>> 0) / 4294967296;
+}
+function aiStep(s, tick) {
+const aiParams = gameState.aiParams;
+const predictionAccuracy = aiParams.prediction_accuracy || 0.7;
+const paddleSpeed = aiParams.paddle_speed || 3;
+let target, speed, deadZone;
+if (s.ballSpeedX > 0) {
+let predictedY = s.ballY + s.ballSpeedY * ((canvas.width - s.ballX) / s.ballSpeedX);
+if (aiRandom(gameState.aiSeed, tick, 0) > predictionAccuracy) {
+predictedY += (aiRandom(gameState.aiSeed, tick, 1) + aiRandom(gameState.aiSeed, tick, 2) +
+aiRandom(gameState.aiSeed, tick, 3) + aiRandom(gameState.aiSeed, tick, 4) - 2) * AI_AIM_ERROR;
+}
+target = Math.max(50, Math.min(400, predictedY));
+speed = paddleSpeed;
+deadZone = 5;
+} else {
+target = 250;
+speed = paddleSpeed * 0.5;
+deadZone = 10;
+}
+if (Math.abs(target - s.aiY) > deadZone) {
+if (target > s.aiY) {
+s.aiY = Math.min(s.aiY + speed, canvas.height - paddleHeight);
+} else {
+s.aiY = Math.max(s.aiY - speed, 0);
+}
+}
+}
+function updateAI() {
+if (!gameState.gameStarted || gameState.gameOver) return;
+aiStep(gameState, gameState.tick);
+}
+function moveBall(s) {
+s.ballX += s.ballSpeedX;
+s.ballY += s.ballSpeedY;
+if (s.ballY <= 0 || s.ballY >= canvas.height) {
+s.ballSpeedY = -s.ballSpeedY;
+return true;
+}
+return false;
+}
+function aiBlocks(s) {
+return s.ballX >= canvas.width - paddleWidth &&
+s.ballY > s.aiY &&
+s.ballY < s.aiY + paddleHeight;
+}
+function replayAI(s, start, end) {
+for (let tick = start; tick < end; tick++) {
+aiStep(s, tick);
+if (tick + 1 === end) break;
+moveBall(s);
+if (aiBlocks(s)) s.ballSpeedX = -Math.abs(s.ballSpeedX);
+}
+}
+function reconcileAI(aiMove) {
+const sync = gameState.sync;
+if (!sync || aiMove.tick !== sync.tick || Math.abs(aiMove.ai_y - sync.aiY) <= 1e-6) return;
+const s = { ...sync, aiY: aiMove.ai_y };
+replayAI(s, sync.tick, gameState.tick + 1);
+gameState.ballX = s.ballX;
+gameState.ballY = s.ballY;
+gameState.ballSpeedX = s.ballSpeedX;
+gameState.ballSpeedY = s.ballSpeedY;
+gameState.aiY = s.aiY;
+}
+function drawRect(x, y, w, h, color, glow) {
+ctx.shadowBlur = glow ? 20 : 0;
+ctx.shadowColor = color;
+ctx.fillStyle = color;
+ctx.fillRect(x, y, w, h);
+ctx.shadowBlur = 0;
+}
+function drawCircle(x, y, r, color, glow) {
+ctx.shadowBlur = glow ? 15 : 0;
+ctx.shadowColor = color;
+ctx.fillStyle = color;
+ctx.beginPath();
+ctx.arc(x, y, r, 0, Math.PI*2, false);
+ctx.closePath();
+ctx.fill();
+ctx.shadowBlur = 0;
+}
+function update() {
+if (!gameState.gameStarted || gameState.gameOver) return;
+gameState.tick++;
+if (moveBall(gameState)) {
+playSound('wallHit');
+}
+if (gameState.ballX <= paddleWidth &&
+gameState.ballY > gameState.playerY &&
+gameState.ballY < gameState.playerY + paddleHeight) {
+gameState.ballSpeedX = Math.abs(gameState.ballSpeedX);
+playSound('hit');
+sendGameAction('ball_hit', {
+ball_y: gameState.ballY,
+paddle_y: gameState.playerY
+});
+}
+if (aiBlocks(gameState)) {
+gameState.ballSpeedX = -Math.abs(gameState.ballSpeedX);
+playSound('hit');
+}
+if (gameState.ballX < 0) {
+gameState.aiScore++;
+resetBall();
+playSound('score');
+sendGameAction('score', { scorer: 'ai' });
+updateScoreDisplay();
+}
+if (gameState.ballX > canvas.width) {
+gameState.playerScore++;
+resetBall();
+playSound('score');
+sendGameAction('score', { scorer: 'player' });
+updateScoreDisplay();
+}
+updateAI();
+}
+function resetBall() {
+gameState.ballX = canvas.width/2;
+gameState.ballY = canvas.height/2;
+gameState.ballSpeedX = Math.random() > 0.5 ? gameState.initialBallSpeedX : -gameState.initialBallSpeedX;
+gameState.ballSpeedY = (Math.random() - 0.5) * gameState.initialBallSpeedY * 2;
+}
+function render() {
+ctx.clearRect(0, 0, canvas.width, canvas.height);
+drawRect(0, gameState.playerY, paddleWidth, paddleHeight, '#1f6feb', true);
+drawRect(canvas.width - paddleWidth, gameState.aiY, paddleWidth, paddleHeight, '#e91e63', true);
+drawCircle(gameState.ballX, gameState.ballY, 8, '#fff', true);
+ctx.setLineDash([10, 10]);
+ctx.strokeStyle = 'rgba(0,255,224,0.3)';
+ctx.lineWidth = 2;
+ctx.beginPath();
+ctx.moveTo(canvas.width/2, 0);
+ctx.lineTo(canvas.width/2, canvas.height);
+ctx.stroke();
+ctx.setLineDash([]);
+}
+function gameLoop() {
+update();
+render();
+requestAnimationFrame(gameLoop);
+}
+function setPaddleFromClientY(clientY) {
+const rect = canvas.getBoundingClientRect();
+const scaleY = canvas.height / rect.height;
+const gameY = (clientY - rect.top) * scaleY - paddleHeight / 2;
+gameState.playerY = Math.max(0, Math.min(canvas.height - paddleHeight, gameY));
+}
+window.addEventListener('mousemove', e => { setPaddleFromClientY(e.clientY); });
+canvas.addEventListener('touchmove', e => {
+e.preventDefault();
+if (e.touches.length) setPaddleFromClientY(e.touches[0].clientY);
+}, { passive: false });
+canvas.addEventListener('touchstart', e => {
+if (e.touches.length) setPaddleFromClientY(e.touches[0].clientY);
+}, { passive: true });
+window.addEventListener('beforeunload', async () => {
+if (gameState.sessionId && gameState.gameStarted) {
+try {
+await fetch('/pingpong/end-session', {
+method: 'POST',
+headers: { 'Content-Type': 'application/json' },
+body: JSON.stringify({
+session_id: gameState.sessionId,
+winner: gameState.playerScore > gameState.aiScore ? 'player' :
+gameState.aiScore > gameState.playerScore ? 'ai' : 'ongoing',
+final_score: { player: gameState.playerScore, ai: gameState.aiScore },
+game_duration: Date.now() - gameState.lastHitTime,
+ai_performance: { difficulty: gameState.aiDifficulty }
+})
+});
+} catch (error) {
+console.error('Failed to end game session:', error);
+}
+}
+});
+initGame().then(() => {
+gameLoop();
+});
+if ('serviceWorker' in navigator) {
+window.addEventListener('load', () => navigator.serviceWorker.register('/service-worker.js'));
+};
\ No newline at end of file
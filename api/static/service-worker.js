@@ -1,48 +1,219 @@
-const CACHE_NAME = 'satoshis-arcade-v1';
-const urlsToCache = [
-  '/',
-  '/frontend/arcade/index.html',
-  '/frontend/pingpong/index.html',
-  '/frontend/tetris/index.html',
-  '/frontend/manifest.json',
-  'https://fonts.googleapis.com/css2?family=IBM+Plex+Sans:wght@400;600&display=swap'
+// Served by the app at /service-worker.js, which fills in the precache
+// manifest: [{url, revision}] with revision a hash of the file's content.
+// Any shell change alters this script, so browsers install the new worker
+// and refetch only the entries whose revision changed.
+const PRECACHE_MANIFEST = self.__PRECACHE_MANIFEST || [];
+const PRECACHE_PREFIX = 'arcade-precache-';
+const PRECACHE_NAME = PRECACHE_PREFIX + PRECACHE_MANIFEST.map((entry) => entry.revision).join('').slice(0, 64);
+const RUNTIME_CACHE = 'arcade-runtime-v1';
+const FONT_CACHE = 'arcade-fonts-v1';
+const REVISION_HEADER = 'X-Precache-Revision';
+
+// Leaderboard reads: answer from cache at once, refresh in the background
+// (not the live event stream, which never ends and must not be cached)
+const STALE_WHILE_REVALIDATE = [
+  /^\/leaderboard(\/(?!stream$)|$)/,
+  /^\/(tetris|pingpong)\/(leaderboard|ai-stats)$/
 ];
+// Writes worth replaying after an outage; paddle moves are not (only the
+// latest position matters, and it is stale by the time we are back online)
+const QUEUED_POSTS = /^\/(tetris|pingpong)\/(action|end-session)$/;
+const QUEUE_DB = 'arcade-offline';
+const QUEUE_STORE = 'requests';
+const SYNC_TAG = 'arcade-replay';
+
+const precacheUrls = new Map(PRECACHE_MANIFEST.map((entry) => [entry.url, entry.revision]));
+
+async function precache() {
+  const cache = await caches.open(PRECACHE_NAME);
+  const previous = (await caches.keys()).filter(
+    (name) => name.startsWith(PRECACHE_PREFIX) && name !== PRECACHE_NAME
+  );
+  await Promise.all(PRECACHE_MANIFEST.map(async ({ url, revision }) => {
+    // Reuse the copy from the last install when its content is unchanged
+    for (const name of previous) {
+      const hit = await (await caches.open(name)).match(url);
+      if (hit && hit.headers.get(REVISION_HEADER) === revision) {
+        await cache.put(url, hit);
+        return;
+      }
+    }
+    const response = await fetch(url, { cache: 'reload' });
+    if (!response.ok) {
+      throw new Error(`Precache of ${url} failed: ${response.status}`);
+    }
+    const headers = new Headers(response.headers);
+    headers.set(REVISION_HEADER, revision);
+    await cache.put(url, new Response(await response.blob(), {
+      status: response.status,
+      statusText: response.statusText,
+      headers
+    }));
+  }));
+}
 
 self.addEventListener('install', (event) => {
+  event.waitUntil(precache().then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', (event) => {
+  const keep = new Set([PRECACHE_NAME, RUNTIME_CACHE, FONT_CACHE]);
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then((cache) => {
-        console.log('Opened cache');
-        return cache.addAll(urlsToCache);
-      })
+    caches.keys()
+      .then((names) => Promise.all(names.filter((name) => !keep.has(name)).map((name) => caches.delete(name))))
+      .then(() => self.clients.claim())
+      .then(() => replayQueue())
   );
 });
 
-self.addEventListener('fetch', (event) => {
-  event.respondWith(
-    caches.match(event.request)
-      .then((response) => {
-        // Cache hit - return response
-        if (response) {
-          return response;
-        }
-        return fetch(event.request);
+async function precached(request, url) {
+  const cache = await caches.open(PRECACHE_NAME);
+  const hit = await cache.match(url.pathname);
+  return hit || fetch(request);
+}
+
+async function staleWhileRevalidate(event) {
+  const cache = await caches.open(RUNTIME_CACHE);
+  const cached = await cache.match(event.request);
+  const refresh = fetch(event.request).then((response) => {
+    if (response.ok) {
+      return cache.put(event.request, response.clone()).then(() => response);
+    }
+    return response;
+  });
+  if (cached) {
+    event.waitUntil(refresh.catch(() => undefined));
+    return cached;
+  }
+  return refresh;
+}
+
+async function cacheFirst(event, cacheName) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(event.request);
+  if (cached) {
+    return cached;
+  }
+  const response = await fetch(event.request);
+  if (response.ok || response.type === 'opaque') {
+    event.waitUntil(cache.put(event.request, response.clone()));
+  }
+  return response;
+}
+
+// --- Offline queue for game writes (IndexedDB, replayed in order) ---
+
+function openQueue() {
+  return new Promise((resolve, reject) => {
+    const open = indexedDB.open(QUEUE_DB, 1);
+    open.onupgradeneeded = () => open.result.createObjectStore(QUEUE_STORE, { autoIncrement: true });
+    open.onsuccess = () => resolve(open.result);
+    open.onerror = () => reject(open.error);
+  });
+}
+
+function queueTransaction(mode, work) {
+  return openQueue().then((db) => new Promise((resolve, reject) => {
+    const tx = db.transaction(QUEUE_STORE, mode);
+    const result = work(tx.objectStore(QUEUE_STORE));
+    tx.oncomplete = () => resolve(result && 'result' in result ? result.result : undefined);
+    tx.onerror = () => reject(tx.error);
+  }));
+}
+
+async function enqueue(url, body) {
+  await queueTransaction('readwrite', (store) => store.add({ url, body, queuedAt: Date.now() }));
+  if (self.registration.sync) {
+    await self.registration.sync.register(SYNC_TAG).catch(() => undefined);
+  }
+}
+
+let replaying = null;
+
+function replayQueue() {
+  // One replay at a time; concurrent triggers share it
+  if (!replaying) {
+    replaying = drainQueue().finally(() => { replaying = null; });
+  }
+  return replaying;
+}
+
+async function drainQueue() {
+  const keys = await queueTransaction('readonly', (store) => store.getAllKeys());
+  for (const key of keys || []) {
+    const item = await queueTransaction('readonly', (store) => store.get(key));
+    if (item) {
+      const response = await fetch(item.url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: item.body
+      });
+      // 5xx: keep it for the next attempt; anything else (including a 404
+      // for a session the server no longer holds) is final
+      if (response.status >= 500) {
+        throw new Error(`Replay of ${item.url} failed: ${response.status}`);
       }
-    )
-  );
+    }
+    await queueTransaction('readwrite', (store) => store.delete(key));
+  }
+}
+
+async function postWithQueue(event, url) {
+  const body = await event.request.clone().text();
+  try {
+    const response = await fetch(event.request);
+    // Reachable again: replay what was queued while offline
+    event.waitUntil(replayQueue().catch(() => undefined));
+    return response;
+  } catch (error) {
+    let actionType = null;
+    try {
+      actionType = JSON.parse(body).action_type;
+    } catch (parseError) {
+      // Not JSON; queue it as is
+    }
+    if (actionType !== 'paddle_move') {
+      await enqueue(url.pathname, body);
+    }
+    return new Response(JSON.stringify({ queued: actionType !== 'paddle_move' }), {
+      status: 202,
+      headers: { 'Content-Type': 'application/json' }
+    });
+  }
+}
+
+self.addEventListener('sync', (event) => {
+  if (event.tag === SYNC_TAG) {
+    event.waitUntil(replayQueue());
+  }
 });
 
-self.addEventListener('activate', (event) => {
-  event.waitUntil(
-    caches.keys().then((cacheNames) => {
-      return Promise.all(
-        cacheNames.map((cacheName) => {
-          if (cacheName !== CACHE_NAME) {
-            console.log('Deleting old cache:', cacheName);
-            return caches.delete(cacheName);
-          }
-        })
-      );
-    })
-  );
+self.addEventListener('fetch', (event) => {
+  const { request } = event;
+  const url = new URL(request.url);
+
+  if (url.origin !== self.location.origin) {
+    // Web fonts are immutable per URL
+    if (request.method === 'GET' && /^fonts\.(googleapis|gstatic)\.com$/.test(url.hostname)) {
+      event.respondWith(cacheFirst(event, FONT_CACHE));
+    }
+    return;
+  }
+
+  if (request.method === 'POST') {
+    if (QUEUED_POSTS.test(url.pathname)) {
+      event.respondWith(postWithQueue(event, url));
+    }
+    return;  // Other writes go straight to the network
+  }
+  if (request.method !== 'GET') {
+    return;
+  }
+
+  if (precacheUrls.has(url.pathname) && !url.search) {
+    event.respondWith(precached(request, url));
+  } else if (STALE_WHILE_REVALIDATE.some((pattern) => pattern.test(url.pathname))) {
+    event.respondWith(staleWhileRevalidate(event));
+  }
+  // Everything else (sessions, stats, /metrics, /docs) is network-only
 });
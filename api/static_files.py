@@ -0,0 +1,33 @@
+"""
+The /frontend mount: StaticFiles that answers with the .br/.gz sibling the
+build wrote when the client accepts it, and marks hashed assets immutable.
+
+Imported by install_routes only, so fast-start keeps starlette.staticfiles
+out of the cold-start import graph.
+"""
+import mimetypes
+import os
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from api.frontend import IMMUTABLE, precompressed
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = os.fspath(full_path)
+        variant, encoding = precompressed(full_path, request_headers.get("accept-encoding"))
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            stat_result = os.stat(variant)
+        if os.path.basename(os.path.dirname(full_path)) == "assets":
+            headers["Cache-Control"] = IMMUTABLE
+        response = FileResponse(variant, status_code=status_code, stat_result=stat_result,
+                                media_type=mimetypes.guess_type(full_path)[0], headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+One-time backfill of players.total_games / total_score and per-game stats
+from finished game sessions
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import ArcadeDatabase, db
+
+def main():
+    database = ArcadeDatabase(sys.argv[1]) if len(sys.argv) > 1 else db
+    print(f"🔧 Backfilling player aggregates in {database.db_path}...")
+    updated = database.backfill_player_aggregates()
+    print(f"✅ Updated {updated} players")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark /pingpong/action latency for well-behaved sessions while one
+session floods the endpoint.
+
+Well-behaved sessions send paddle_move at 60 Hz and a ball_hit (a database
+write) twice a second. The abusive session fires requests at a fixed rate
+without waiting for answers, one in four a ball_hit. Requests are ASGI
+calls on one event loop (no HTTP client, whose own cost would otherwise
+dominate on a small machine), so the numbers are the server's share of the
+work. Four runs:
+- baseline:       no abusive session
+- admission off:  flood with coalescing, rate limits and shedding disabled
+- admission on:   flood with the defaults from api/admission.py
+- overloaded:     as above, with the flood ten times faster than one CPU
+                  serves, so the event loop falls behind and actions are shed
+
+Usage: python scripts/bench_admission.py [seconds] [good sessions] [abusive requests/s]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ARCADE_DB_PATH", os.path.join(tempfile.mkdtemp(), "admission.db"))
+
+from api import admission
+from api.database import db
+from api.main import app
+
+DEFAULTS = (admission.ACTION_RATE, admission.ACTION_BURST,
+            admission.COALESCE_INTERVAL, admission.SHED_LAG)
+DISABLED = (1e9, 1e9, 0.0, 1e9)
+
+def configure(settings):
+    (admission.ACTION_RATE, admission.ACTION_BURST,
+     admission.COALESCE_INTERVAL, admission.shedder.limit) = settings
+
+def action(session_id, action_type, y):
+    data = {"ball_x": 400, "ball_y": y, "ball_speed_x": 5, "ball_speed_y": 3, "player_y": y}
+    if action_type == "paddle_move":
+        data["y"] = y
+    return {"session_id": session_id, "action_type": action_type,
+            "action_data": data, "timestamp": time.time() * 1000}
+
+async def post(path, payload=None):
+    """Call the app directly over ASGI; returns (status, parsed body)"""
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "client": ("127.0.0.1", 0),
+             "server": ("bench", 80),
+             "headers": [(b"content-type", b"application/json"),
+                         (b"content-length", str(len(body)).encode())]}
+    response = {"status": 500, "body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return response["status"], json.loads(response["body"] or b"null")
+
+async def start():
+    status, body = await post("/pingpong/start-session")
+    return body["session_id"]
+
+async def good_session(stop, latencies):
+    session_id = await start()
+    tick = 0
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        next_at += 1 / 60
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tick += 1
+        action_type = "ball_hit" if tick % 30 == 0 else "paddle_move"
+        await post("/pingpong/action", action(session_id, action_type, tick % 400))
+        # From when the frame was due, so time spent queued behind the loop counts
+        latencies.append((time.perf_counter() - next_at) * 1000)
+
+async def abusive_session(rate, stop, statuses):
+    """Fire requests at a fixed rate without waiting for answers (a mousemove flood)"""
+    session_id = await start()
+
+    async def fire(action_type, y):
+        status, _ = await post("/pingpong/action", action(session_id, action_type, y))
+        statuses[status] = statuses.get(status, 0) + 1
+
+    pending = set()
+    tick = 0
+    began = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(1 / rate)
+        # Fire every request that is due, so a flood faster than the server
+        # piles up on the loop the way independent connections would
+        while tick < (time.perf_counter() - began) * rate:
+            tick += 1
+            # Mostly paddle moves, with a ball_hit (a write) every 4th request
+            action_type = "ball_hit" if tick % 4 == 0 else "paddle_move"
+            task = asyncio.create_task(fire(action_type, tick % 400))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    await asyncio.gather(*pending)
+
+async def run(seconds, good, abusive):
+    stop = asyncio.Event()
+    latencies, statuses = [], {}
+    began = time.perf_counter()
+    tasks = [asyncio.create_task(good_session(stop, latencies)) for _ in range(good)]
+    if abusive:
+        tasks.append(asyncio.create_task(abusive_session(abusive, stop, statuses)))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, statuses, time.perf_counter() - began
+
+def p99(values):
+    values = sorted(values)
+    return values[max(0, int(len(values) * 0.99) - 1)] if values else 0.0
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    good = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    abusive = float(sys.argv[3]) if len(sys.argv) > 3 else 600
+    db.init_database()
+
+    print(f"🚦 /pingpong/action under a flooding session ({good} good sessions at 60 Hz, "
+          f"abuser at {abusive:g} req/s, {seconds:g} s)")
+    print("=" * 78)
+    print(f"{'':15} {'good p50':>9} {'good p99':>9} {'good req/s':>11} {'shed/s':>7} {'abusive':>28}")
+    for name, settings, loops in (("baseline", DEFAULTS, 0),
+                                  ("admission off", DISABLED, abusive),
+                                  ("admission on", DEFAULTS, abusive),
+                                  ("overloaded", DEFAULTS, abusive * 10)):
+        configure(settings)
+        shed = admission.degraded.value(("pingpong", "shed"))
+        latencies, statuses, elapsed = asyncio.run(run(seconds, good, loops))
+        shed = admission.degraded.value(("pingpong", "shed")) - shed
+        abuse = ", ".join(f"{code}: {count / elapsed:.0f}/s" for code, count in sorted(statuses.items()))
+        print(f"{name:15} {statistics.median(latencies):7.2f}ms {p99(latencies):7.2f}ms "
+              f"{len(latencies) / elapsed:11.0f} {shed / elapsed:7.0f} {abuse or '-':>28}")
+    configure(DEFAULTS)
+
+if __name__ == "__main__":
+    main()
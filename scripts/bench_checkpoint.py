@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark warm restarts (api.checkpoint).
+
+Fills both games with N active sessions (half each), writes a checkpoint
+as shutdown does, then restores it into empty tables as startup does and
+reports the time for each, the file size, and what the first and a repeat
+lookup of a restored session cost (the first one decodes it).
+
+Usage: python scripts/bench_checkpoint.py [sessions]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import admission, checkpoint
+from api.ai.difficulty_agent import DifficultyAgent
+from api.routes.pingpong import GameSession
+from api.routes.tetris import TetrisSession
+from api.sessions import LocalSessions, SessionCodec
+
+
+def tables():
+    return {
+        "pingpong": (LocalSessions(SessionCodec(GameSession)),
+                     DifficultyAgent("pingpong")),
+        "tetris": (LocalSessions(SessionCodec(TetrisSession)),
+                   DifficultyAgent("tetris")),
+    }
+
+
+def lookup_us(sessions, ids):
+    """Microseconds per get() of each id, in order"""
+    timings = []
+    for session_id in ids:
+        started = time.perf_counter()
+        sessions.get(session_id)
+        timings.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    path = os.path.join(tempfile.mkdtemp(), "arcade-sessions.ckpt")
+
+    games = tables()
+    now = time.time()
+    for i in range(count):
+        session_id = str(uuid.uuid4())
+        if i % 2:
+            games["pingpong"][0][session_id] = GameSession(
+                session_id, i, i, 0.5, 0.6, 4.0, player_score=i % 11, created_at=now,
+                bucket=admission.new_bucket())
+        else:
+            games["tetris"][0][session_id] = TetrisSession(
+                session_id, i, i, 0.5, score=i * 10, created_at=now, bucket=admission.new_bucket())
+    for game_type, (_, agent) in games.items():
+        for _ in range(40):
+            agent.learn_from_outcome("p", "a", "ai_win", {})
+
+    saved = checkpoint.Checkpoint(path, games).save()
+
+    restored_games = tables()
+    started = time.perf_counter()
+    restored = checkpoint.Checkpoint(path, restored_games).load()
+    restore_ms = (time.perf_counter() - started) * 1000
+
+    sample = list(games["pingpong"][0].keys())[:2000]
+    first = lookup_us(restored_games["pingpong"][0], sample)
+    again = lookup_us(restored_games["pingpong"][0], sample)
+    match = all(restored_games["pingpong"][0].get(i).player_score == games["pingpong"][0][i].player_score
+                for i in sample)
+
+    print(f"♻️  Warm restart with {count:,} active sessions")
+    print("=" * 60)
+    print(f"checkpoint on shutdown   {saved['seconds'] * 1000:8.1f} ms  ({saved['bytes'] / 1e6:.1f} MB)")
+    print(f"restore on startup       {restore_ms:8.1f} ms  ({sum(restored.values()):,} sessions)")
+    print(f"first lookup (decodes)   {first:8.2f} µs")
+    print(f"later lookups            {again:8.2f} µs")
+    print(f"restored sessions match  {match}")
+    print(f"agent difficulty         {restored_games['pingpong'][1].difficulty_level:.4f} "
+          f"(saved {games['pingpong'][1].difficulty_level:.4f})")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark mixed read/write contention on ArcadeDatabase.
+
+Writer threads record AI feedback (what /tetris/action does) while reader
+threads fetch leaderboards, player stats and AI metrics. Three setups are
+compared:
+- per-call:      a new connection per call, rollback journal (the old path)
+- per-call WAL:  a new connection per call, WAL journal
+- pool + writer: pooled query_only readers and one serialized writer
+
+Readers are paced at a fixed rate each (like request traffic); pass a
+rate of 0 to run them flat out. Unpaced readers on a small machine mostly
+measure who wins the GIL, not the database.
+
+Usage: python scripts/bench_db_contention.py [seconds] [readers] [writers] [reads/s per reader]
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import ArcadeDatabase
+
+class PerCallDatabase(ArcadeDatabase):
+    """The previous connection handling: open, use and close on every call"""
+
+    journal_mode = "DELETE"
+
+    def _create_schema(self):
+        super()._create_schema()
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        conn.close()
+
+    @contextmanager
+    def _writer(self, game_type=None, shared=True):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _reader(self, game_type=None):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+class PerCallWALDatabase(PerCallDatabase):
+    journal_mode = "WAL"
+
+def populate(db, players=300):
+    random.seed(5)
+    session_ids = []
+    for i in range(players):
+        game = random.choice(("pingpong", "tetris"))
+        player_id, game_session_id = db.begin_session(f"contention-{i}", game, 0.5)
+        db.finish_session(game_session_id, player_id, game, random.randint(1, 5000), 0.5,
+                          ranked=True)
+        session_ids.append(f"contention-{i}")
+    return session_ids
+
+def worker(fn, stop, latencies, errors, rate=0):
+    interval = 1.0 / rate if rate else 0
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        if interval:
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        start = time.perf_counter()
+        try:
+            fn()
+        except sqlite3.OperationalError:
+            errors.append(1)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+def run(db, seconds, readers, writers, read_rate):
+    session_ids = populate(db)
+    reads = [lambda: db.get_leaderboard("tetris", 10),
+             lambda: db.get_player_stats(random.choice(session_ids)),
+             lambda: db.get_ai_metrics("tetris")]
+    write = lambda: db.record_ai_feedback(1, "tetris", "move_left", "observe",
+                                          "move_recorded", 0.5, {"game_context": {"score": 0}})
+    stop = threading.Event()
+    read_lat, write_lat, read_err, write_err = [], [], [], []
+    threads = [threading.Thread(target=worker, args=(reads[i % len(reads)], stop, read_lat, read_err, read_rate))
+               for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=(write, stop, write_lat, write_err))
+                for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return read_lat, write_lat, len(read_err), len(write_err)
+
+def median(values):
+    return statistics.median(values) if values else 0.0
+
+def p99(values):
+    values = sorted(values)
+    return values[max(0, int(len(values) * 0.99) - 1)] if values else 0.0
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    read_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 250
+
+    pacing = f"{read_rate:g} reads/s each" if read_rate else "unpaced"
+    print(f"🔀 Mixed read/write contention ({readers} readers at {pacing}, "
+          f"{writers} writers, {seconds:g} s)")
+    print("=" * 86)
+    print(f"{'':15} {'reads/s':>9} {'read p50':>9} {'read p99':>9} "
+          f"{'writes/s':>9} {'write p99':>9} {'locked errors':>14}")
+    for name, cls in (("per-call", PerCallDatabase), ("per-call WAL", PerCallWALDatabase),
+                      ("pool + writer", ArcadeDatabase)):
+        db = cls(os.path.join(tempfile.mkdtemp(), "contention.db"), shard_by_game=False)
+        read_lat, write_lat, read_err, write_err = run(db, seconds, readers, writers, read_rate)
+        print(f"{name:15} {len(read_lat) / seconds:9.0f} {median(read_lat):7.2f}ms "
+              f"{p99(read_lat):7.2f}ms {len(write_lat) / seconds:9.0f} {p99(write_lat):7.2f}ms "
+              f"{read_err + write_err:14}")
+        db.close()
+
+if __name__ == "__main__":
+    main()
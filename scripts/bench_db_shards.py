@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark write throughput of one database file vs per-game shards.
+
+One writer thread per game records AI feedback (what every /action call
+does) as fast as it can; every 20th write instead finishes a ranked
+session, which also updates players and rankings in the main file. With a
+single file all games queue on one writer; with ARCADE_DB_SHARDS each game
+commits to its own file, so throughput should grow with the number of games
+until the disk (fsync) or the GIL is the limit.
+
+Usage: python scripts/bench_db_shards.py [seconds] [writers per game]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import SHARDED_GAMES, ArcadeDatabase
+
+FINISH_EVERY = 20
+
+def writer(db, game_type, stop, counts, index):
+    player_id, game_session_id = db.begin_session(f"shards-{game_type}-{index}", game_type)
+    done = 0
+    while not stop.is_set():
+        done += 1
+        if done % FINISH_EVERY:
+            db.record_ai_feedback(game_session_id, game_type, "move_left", "observe",
+                                  "move_recorded", 0.5, {"game_context": {"score": done}})
+        else:
+            db.finish_session(game_session_id, player_id, game_type, done, 0.5, ranked=True)
+            player_id, game_session_id = db.begin_session(f"shards-{game_type}-{index}", game_type)
+    counts.append(done)
+
+def run(sharded, games, per_game, seconds):
+    db = ArcadeDatabase(os.path.join(tempfile.mkdtemp(), "shards.db"), shard_by_game=sharded)
+    db.init_database()
+    stop = threading.Event()
+    counts = []
+    threads = [threading.Thread(target=writer, args=(db, game_type, stop, counts, i))
+               for game_type in games for i in range(per_game)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    db.close()
+    return sum(counts) / seconds
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    per_game = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    print(f"🗂️  Write throughput, single file vs per-game shards "
+          f"({per_game} writer(s) per game, {seconds:g} s each)")
+    print("=" * 64)
+    print(f"{'games':>6} {'single file':>14} {'sharded':>14} {'speedup':>9}")
+    for count in range(1, len(SHARDED_GAMES) + 1):
+        games = SHARDED_GAMES[:count]
+        single = run(False, games, per_game, seconds)
+        sharded = run(True, games, per_game, seconds)
+        print(f"{count:>6} {single:10.0f} w/s {sharded:10.0f} w/s {sharded / single:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark response size and encode time per endpoint.
+
+"before" is the previous path: the full dict run through jsonable_encoder
+(except the ETag routes, which already returned a response) and rendered
+by Starlette's stdlib JSONResponse. "after" is what each handler now
+returns, encoded with orjson (when installed) and with the stdlib
+fallback; every handler measured here now returns FastJSONResponse
+directly and skips jsonable_encoder.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ARCADE_FAST_START"] = "0"
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from api import fast_json
+from api.database import db
+
+def _per_call_us(fn, budget=0.2):
+    """Best of 3 rounds, each running ``fn`` for about ``budget`` seconds"""
+    best = float("inf")
+    for _ in range(3):
+        calls, start = 0, time.perf_counter()
+        while True:
+            for _ in range(100):
+                fn()
+            calls += 100
+            elapsed = time.perf_counter() - start
+            if elapsed >= budget:
+                break
+        best = min(best, elapsed / calls * 1e6)
+    return best
+
+def collect(client):
+    """(endpoint, before content, after content, before used jsonable_encoder)"""
+    from api.routes import pingpong
+
+    cases = []
+    session_id = client.post("/pingpong/start-session").json()["session_id"]
+    action = {"session_id": session_id, "action_type": "paddle_move",
+              "action_data": {"y": 220, "ball_x": 500, "ball_y": 240,
+                              "ball_speed_x": 5, "ball_speed_y": -3},
+              "timestamp": 0}
+    after = client.post("/pingpong/action", json=action).json()
+    session = pingpong.active_sessions[session_id]
+    before = {
+        "ai_move": {"ai_y": after["ai_move"]["ai_y"],
+                    "difficulty": session.ai_difficulty,
+                    "prediction_accuracy": session.game_state["ai_params"]["prediction_accuracy"]},
+        "game_state": session.game_state,
+        "scores": after["scores"]
+    }
+    cases.append(("POST /pingpong/action", before, after, True))
+
+    tetris_id = client.post("/tetris/start-session").json()["session_id"]
+    body = client.post("/tetris/action", json={"session_id": tetris_id, "action_type": "rotate",
+                                               "action_data": {}, "timestamp": 0}).json()
+    cases.append(("POST /tetris/action", body, body, True))
+
+    health = client.get("/health").json()
+    cases.append(("GET /health", health, None, True))
+
+    for i in range(25):
+        sid = client.post("/tetris/start-session").json()["session_id"]
+        client.post("/tetris/end-session", json={
+            "session_id": sid, "final_score": 1000 + i, "level_reached": 1,
+            "lines_cleared": 1, "game_duration": 1, "ai_performance": {}})
+    for path, etag_route in (("/leaderboard/tetris?limit=25", False),
+                             ("/leaderboard/rankings?limit=25", False),
+                             ("/leaderboard/tetris/daily", False),
+                             ("/leaderboard", True), ("/tetris/ai-stats", True)):
+        body = client.get(path).json()
+        cases.append((f"GET {path}", body, body, not etag_route))
+    return cases
+
+def main():
+    db.db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    from api.main import _HEALTH_BODY, app
+
+    print("📊 JSON response size and encode time")
+    print(f"orjson: {'installed' if fast_json.orjson else 'not installed (stdlib fallback)'}")
+    print("=" * 96)
+    print(f"{'endpoint':34} {'bytes':>13}   {'before µs':>9} {'orjson µs':>9} {'stdlib µs':>9}")
+
+    with TestClient(app) as client:
+        cases = collect(client)
+
+    legacy = JSONResponse(None)
+    for name, before, after, encoded in cases:
+        prepare = jsonable_encoder if encoded else (lambda c: c)
+        old_bytes = len(legacy.render(prepare(before)))
+        old_us = _per_call_us(lambda: legacy.render(prepare(before)))
+        if after is None:
+            # Pre-encoded at import: nothing to encode per request
+            new_bytes, fast_us, std_us = len(_HEALTH_BODY), 0.0, 0.0
+        else:
+            new_bytes = len(fast_json.dumps(after))
+            fast_us = _per_call_us(lambda: fast_json.dumps(after))
+            std_us = _per_call_us(lambda: fast_json.stdlib_dumps(after))
+        print(f"{name:34} {old_bytes:5} -> {new_bytes:5}   {old_us:9.2f} {fast_us:9.2f} {std_us:9.2f}")
+
+if __name__ == "__main__":
+    main()
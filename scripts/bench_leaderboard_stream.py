@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark /leaderboard/stream with thousands of idle viewers.
+
+Opens N streams over ASGI on one event loop (no HTTP client), one of which
+never reads its socket, then records new top scores from a writer thread.
+Reports memory per open stream, how long each change takes to reach every
+viewer, and whether the stalled viewer was dropped. For comparison it times
+the /leaderboard poll the same viewers would otherwise send.
+
+Usage: python scripts/bench_leaderboard_stream.py [viewers] [changes]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ARCADE_DB_PATH", os.path.join(tempfile.mkdtemp(), "stream.db"))
+
+from api import live
+from api.database import db
+from api.main import app, install_routes
+
+POLL_INTERVAL = 5.0
+
+def scope(path):
+    return {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "", "client": ("127.0.0.1", 0),
+            "server": ("bench", 80), "headers": []}
+
+async def viewer(received, disconnect, stalled=False):
+    """One open stream; ``received`` gets the arrival time of each insert event"""
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] != "http.response.body":
+            return
+        if stalled:
+            await disconnect.wait()  # A client whose socket buffer is full
+        elif b"event: insert" in message.get("body", b""):
+            received.append(time.perf_counter())
+
+    await app(scope("/leaderboard/stream"), receive, send)
+
+async def poll_cost(samples=200):
+    """Seconds per uncached /leaderboard request (a new version every time)"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(samples):
+        db._leaderboard_changed()  # Defeat the ETag, as a changing board would
+        await app(scope("/leaderboard"), receive, send)
+    return (time.perf_counter() - started) / samples
+
+async def run(viewers, changes):
+    player_id, game_session_id = db.begin_session("stream-bench", "tetris")
+    disconnect = asyncio.Event()
+    arrivals = [[] for _ in range(viewers)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tasks = [asyncio.create_task(viewer(arrivals[i], disconnect)) for i in range(viewers)]
+    stalled = asyncio.create_task(viewer([], disconnect, stalled=True))
+    while live.hub.subscriber_count < viewers + 1:
+        await asyncio.sleep(0.01)
+    per_stream = (tracemalloc.get_traced_memory()[0] - before) / (viewers + 1)
+    tracemalloc.stop()
+
+    loop = asyncio.get_running_loop()
+    fan_out = []
+    for change in range(changes):
+        started = time.perf_counter()
+        # Each score beats the last, so every change enters the top K
+        await loop.run_in_executor(None, db.update_leaderboard, player_id, "tetris",
+                                   1000 + change, 0.5, game_session_id)
+        while any(len(a) <= change for a in arrivals):
+            await asyncio.sleep(0.001)
+        fan_out.append(max(a[change] for a in arrivals) - started)
+    # The stalled viewer's queue overflows after STREAM_QUEUE_SIZE changes
+    dropped = live.hub.subscriber_count == viewers
+    disconnect.set()
+    await asyncio.gather(*tasks, stalled)
+    return per_stream, fan_out, dropped
+
+def main():
+    viewers = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    changes = int(sys.argv[2]) if len(sys.argv) > 2 else live.STREAM_QUEUE_SIZE + 20
+    db.init_database()
+    install_routes()
+
+    per_stream, fan_out, dropped = asyncio.run(run(viewers, changes))
+    poll = asyncio.run(poll_cost())
+    print(f"📡 /leaderboard/stream with {viewers} idle viewers + 1 stalled, {changes} top-score changes")
+    print("=" * 72)
+    print(f"memory per open stream:        {per_stream / 1024:8.1f} KB")
+    print(f"change -> all viewers:         {statistics.median(fan_out) * 1000:8.1f} ms median, "
+          f"{max(fan_out) * 1000:.1f} ms max ({statistics.median(fan_out) / viewers * 1e6:.1f} µs/viewer)")
+    print(f"stalled viewer dropped:        {'yes' if dropped else 'no'}")
+    print(f"polling instead (every {POLL_INTERVAL:g} s):   {viewers / POLL_INTERVAL:8.0f} req/s x "
+          f"{poll * 1000:.2f} ms = {viewers / POLL_INTERVAL * poll:.2f} CPU-seconds per second")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark the learning pipeline (api.learning) on /tetris/action.
+
+Concurrent players send moves as fast as they are answered, through the
+ASGI app on one event loop (no HTTP client). Three runs:
+- parse only: an unknown session_id, so each request is validated and
+  answered 404 without game work (the floor)
+- inline: learning and the feedback write in the request, as before
+- pipeline: handlers queue the feedback for the background consumer
+Reports action latency p50/p99, actions per second and, for the
+pipeline, the feedback rows stored and the batch sizes used.
+
+Usage: python scripts/bench_learning.py [seconds] [players]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ARCADE_DB_PATH", os.path.join(tempfile.mkdtemp(), "learning.db"))
+# Measure the pipeline, not the per-session rate limit or load shedding
+os.environ.setdefault("ARCADE_ACTION_RATE", "1000000")
+os.environ.setdefault("ARCADE_ACTION_BURST", "1000000")
+os.environ.setdefault("ARCADE_SHED_LAG_MS", "1000000")
+
+from api import learning
+from api.database import db
+from api.main import app, install_routes
+
+
+async def post(path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "client": ("127.0.0.1", 0),
+             "server": ("bench", 80),
+             "headers": [(b"content-type", b"application/json"),
+                         (b"content-length", str(len(body)).encode())]}
+    response = {"body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return json.loads(response["body"] or b"null")
+
+
+async def player(session_id, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await post("/tetris/action", {"session_id": session_id, "action_type": "move",
+                                      "action_data": {"direction": "left"},
+                                      "timestamp": time.time() * 1000})
+        latencies.append((time.perf_counter() - started) * 1000)
+        # A real connection yields to the loop between requests
+        await asyncio.sleep(0)
+
+
+async def run(mode, seconds, players):
+    if mode == "pipeline":
+        learning.pipeline.start()
+    if mode == "parse only":
+        sessions = ["00000000-0000-0000-0000-000000000000"] * players
+    else:
+        sessions = [(await post("/tetris/start-session"))["session_id"] for _ in range(players)]
+    processed = learning.events.value(("tetris", "processed"))
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(player(session_id, deadline, latencies) for session_id in sessions))
+    drain_started = time.perf_counter()
+    await learning.pipeline.stop()
+    return {
+        "latencies": latencies,
+        "drain": time.perf_counter() - drain_started,
+        "processed": learning.events.value(("tetris", "processed")) - processed,
+    }
+
+
+def p99(values):
+    values = sorted(values)
+    return values[max(0, int(len(values) * 0.99) - 1)] if values else 0.0
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    db.init_database()
+    install_routes()
+
+    print(f"🧠 /tetris/action with {players} concurrent players, {seconds:g} s per run")
+    print("=" * 76)
+    print(f"{'mode':>10} {'p50':>9} {'p99':>9} {'actions/s':>10}  notes")
+    for mode in ("parse only", "inline", "pipeline"):
+        result = asyncio.run(run(mode, seconds, players))
+        latencies = result["latencies"]
+        notes = ""
+        if mode == "pipeline":
+            notes = f"{result['processed']:.0f} stored, {result['drain'] * 1000:.0f} ms to drain"
+        print(f"{mode:>10} {statistics.median(latencies):7.2f}ms {p99(latencies):7.2f}ms "
+              f"{len(latencies) / seconds:10.0f}  {notes}")
+    print()
+    print("\n".join(line for line in learning.batch_sizes.render() if "_count" in line or "_sum" in line))
+
+
+if __name__ == "__main__":
+    main()
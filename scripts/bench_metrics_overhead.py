@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of the /metrics instrumentation.
+
+Measures the MetricsMiddleware around a no-op ASGI app, the timed_db
+decorator around a no-op method, and /pingpong/action called in-process
+with and without the middleware. The action is a paddle move, which never
+touches the database, so writes don't drown out the difference.
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ARCADE_FAST_START"] = "0"
+
+from api import metrics
+from api.database import db
+
+class _Route:
+    path = "/bench"
+
+async def _noop_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def _send(message):
+    pass
+
+async def _per_call_us(app, scope_factory, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app(scope_factory(), _receive, _send)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def bench_middleware(iterations=200_000):
+    wrapped = metrics.MetricsMiddleware(_noop_app)
+    scope = lambda: {"type": "http", "method": "POST", "path": "/bench"}
+    loop = asyncio.new_event_loop()
+    bare, instrumented = [], []
+    for _ in range(5):
+        bare.append(loop.run_until_complete(_per_call_us(_noop_app, scope, iterations // 5)))
+        instrumented.append(loop.run_until_complete(_per_call_us(wrapped, scope, iterations // 5)))
+    loop.close()
+    return statistics.median(bare), statistics.median(instrumented)
+
+def bench_db_decorator(iterations=500_000):
+    def noop():
+        return None
+    timed = metrics.timed_db()(noop)
+    results = []
+    for fn in (noop, timed):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        results.append((time.perf_counter() - start) / iterations * 1e6)
+    return results
+
+def bench_pingpong_action(iterations=3000):
+    from api.main import app
+    # Same middleware stack the app serves with, minus MetricsMiddleware
+    wrapped = app.build_middleware_stack()
+    user_middleware = app.user_middleware
+    app.user_middleware = [m for m in user_middleware if m.cls is not metrics.MetricsMiddleware]
+    bare_stack = app.build_middleware_stack()
+    app.user_middleware = user_middleware
+    loop = asyncio.new_event_loop()
+
+    async def start_session():
+        captured = {}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                captured["body"] = message["body"]
+        scope = {"type": "http", "method": "POST", "path": "/pingpong/start-session",
+                 "headers": [], "query_string": b"", "app": app}
+        await bare_stack(scope, _receive, send)
+        return json.loads(captured["body"])["session_id"]
+
+    session_id = loop.run_until_complete(start_session())
+    body = json.dumps({"session_id": session_id, "action_type": "paddle_move",
+                       "action_data": {"y": 200}, "timestamp": 0}).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    def scope():
+        return {"type": "http", "method": "POST", "path": "/pingpong/action",
+                "headers": [(b"content-type", b"application/json")],
+                "query_string": b"", "app": app}
+
+    async def run(target, n):
+        samples = []
+        for _ in range(n):
+            start = time.perf_counter()
+            await target(scope(), receive, _send)
+            samples.append((time.perf_counter() - start) * 1e6)
+        return samples
+
+    bare, instrumented = [], []
+    for _ in range(10):
+        bare += loop.run_until_complete(run(bare_stack, iterations // 10))
+        instrumented += loop.run_until_complete(run(wrapped, iterations // 10))
+    loop.close()
+    return statistics.median(bare), statistics.median(instrumented)
+
+def main():
+    db.db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    print("📊 Metrics instrumentation overhead")
+    print("=" * 50)
+
+    bare, instrumented = bench_middleware()
+    print(f"Middleware (no-op app):   {bare:6.2f} µs -> {instrumented:6.2f} µs  "
+          f"(+{instrumented - bare:.2f} µs)")
+
+    bare, instrumented = bench_db_decorator()
+    print(f"timed_db (no-op method):  {bare:6.2f} µs -> {instrumented:6.2f} µs  "
+          f"(+{instrumented - bare:.2f} µs)")
+
+    bare, instrumented = bench_pingpong_action()
+    print(f"/pingpong/action (median):{bare:6.1f} µs -> {instrumented:6.1f} µs  "
+          f"(+{instrumented - bare:.1f} µs)")
+
+if __name__ == "__main__":
+    main()
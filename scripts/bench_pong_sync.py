@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark client-run Pong AI (api.ai.pong_policy) against the server-run one.
+
+Simulated players play whole games frame by frame (60 a second), with a
+player paddle that chases the ball, through the ASGI app in this process:
+- server AI: the old page, a paddle_move per frame whose answer moves the
+  AI paddle, plus ball hits and scores
+- client AI: the page now, running the seeded AI itself and reporting
+  only ball hits and scores (with the frame tick), which the server
+  replays to check
+- client AI, tampered: as above, but the AI paddle is nudged off course,
+  so the server has to correct it
+Reports requests and server time per minute of play, and the sync
+results (arcade_pingpong_ai_sync_total).
+
+Usage: python scripts/bench_pong_sync.py [games]
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ARCADE_DB_PATH", os.path.join(tempfile.mkdtemp(), "pong.db"))
+# Measure the protocol, not the per-session rate limit or coalescing
+os.environ.setdefault("ARCADE_ACTION_RATE", "1000000")
+os.environ.setdefault("ARCADE_ACTION_BURST", "1000000")
+os.environ.setdefault("ARCADE_COALESCE_MS", "0")
+
+from api import learning
+from api.ai import pong_policy as policy
+from api.database import db
+from api.main import app, install_routes
+
+FPS = 60
+# Longest game simulated, in frames (games end at 5 points)
+MAX_FRAMES = 5 * 60 * FPS
+
+
+async def post(path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "client": ("127.0.0.1", 0),
+             "server": ("bench", 80),
+             "headers": [(b"content-type", b"application/json"),
+                         (b"content-length", str(len(body)).encode())]}
+    response = {"body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return json.loads(response["body"] or b"null")
+
+
+class Player:
+    """The page's game loop (frontend/pingpong/index.html update()) in Python"""
+
+    def __init__(self, mode, start):
+        self.mode = mode
+        self.session_id = start["session_id"]
+        self.seed = start["ai_seed"]
+        self.accuracy = start["ai_params"]["prediction_accuracy"]
+        self.paddle_speed = start["ai_params"]["paddle_speed"]
+        self.tick = 0
+        self.player_y = self.ai_y = 200.0
+        self.scores = [0, 0]
+        self.requests = 0
+        self.server_time = 0.0
+        self.serve()
+
+    def serve(self):
+        self.ball_x, self.ball_y = 400.0, 250.0
+        self.speed_x = 5.0 if random.random() > 0.5 else -5.0
+        self.speed_y = (random.random() - 0.5) * 10
+
+    async def send(self, action_type, data):
+        data = dict(data, ball_x=self.ball_x, ball_y=self.ball_y, ball_speed_x=self.speed_x,
+                    ball_speed_y=self.speed_y, player_y=self.player_y, ai_y=self.ai_y)
+        if self.mode != "server AI" and action_type != "paddle_move":
+            data["tick"] = self.tick
+        started = time.perf_counter()
+        answer = await post("/pingpong/action", {"session_id": self.session_id, "action_type": action_type,
+                                                 "action_data": data, "timestamp": time.time() * 1000})
+        self.server_time += time.perf_counter() - started
+        self.requests += 1
+        if self.mode == "server AI":
+            self.ai_y = answer["ai_move"]["ai_y"]
+        elif answer["ai_move"]["ai_y"] != self.ai_y:
+            # Corrected: the page replays from the server's position; here
+            # the answer arrives within the frame, so there is nothing to replay
+            self.ai_y = answer["ai_move"]["ai_y"]
+
+    async def frame(self):
+        self.tick += 1
+        self.ball_x += self.speed_x
+        self.ball_y += self.speed_y
+        if self.ball_y <= 0 or self.ball_y >= 500:
+            self.speed_y = -self.speed_y
+        # A human-ish paddle: chases the ball at up to 7 px a frame
+        self.player_y += max(-7.0, min(7.0, self.ball_y - 50 - self.player_y))
+        self.player_y = max(0.0, min(400.0, self.player_y))
+        if self.ball_x <= 10 and self.player_y < self.ball_y < self.player_y + 100:
+            self.speed_x = abs(self.speed_x)
+            await self.send("ball_hit", {"ball_y": self.ball_y, "paddle_y": self.player_y})
+        if self.ball_x >= 790 and self.ai_y < self.ball_y < self.ai_y + 100:
+            self.speed_x = -abs(self.speed_x)
+        for scorer, scored in (("ai", self.ball_x < 0), ("player", self.ball_x > 800)):
+            if scored:
+                self.scores[scorer == "ai"] += 1
+                self.serve()
+                await self.send("score", {"scorer": scorer})
+        if self.mode == "server AI":
+            await self.send("paddle_move", {"y": self.player_y})
+        else:
+            self.ai_y = policy.ai_step(self.ai_y, self.ball_x, self.ball_y, self.speed_x, self.speed_y,
+                                       self.accuracy, self.paddle_speed,
+                                       lambda draw: policy.uniform(self.seed, self.tick, draw))
+            if self.mode == "client AI, tampered" and self.tick % 90 == 0:
+                self.ai_y = max(0.0, self.ai_y - 40)
+
+    async def play(self):
+        while max(self.scores) < 5 and self.tick < MAX_FRAMES:
+            await self.frame()
+
+
+async def run(mode, games):
+    players = []
+    for _ in range(games):
+        start = await post("/pingpong/start-session")
+        player = Player(mode, start)
+        await player.play()
+        players.append(player)
+    return players
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    db.init_database()
+    install_routes()
+    from api.routes.pingpong import ai_sync
+
+    print(f"🏓 Pong AI: server-run vs client-run, {games} games per mode")
+    print("=" * 76)
+    print(f"{'mode':>20} {'minutes':>8} {'requests/min':>13} {'server ms/min':>14}  sync")
+    for mode in ("server AI", "client AI", "client AI, tampered"):
+        before = {result: ai_sync.value((result,)) for result in
+                  ("verified", "corrected", "unverified", "stale", "rejected")}
+        random.seed(7)
+        players = asyncio.run(run(mode, games))
+        minutes = sum(p.tick for p in players) / FPS / 60
+        requests = sum(p.requests for p in players)
+        server_ms = sum(p.server_time for p in players) * 1000
+        sync = {result: int(ai_sync.value((result,)) - count) for result, count in before.items()}
+        notes = ", ".join(f"{count} {result}" for result, count in sync.items() if count)
+        print(f"{mode:>20} {minutes:8.1f} {requests / minutes:13.0f} {server_ms / minutes:14.1f}  {notes}")
+    asyncio.run(learning.pipeline.stop())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark player ratings (api.ratings).
+
+- live: what rating a game adds to finish_session (one keyed read and one
+  upsert in the same transaction), finishing sessions of returning players
+  with and without a result
+- batch: re-rating a synthetic history of N finished sessions spread over
+  N / 10 players, as scripts/rerate_players.py does: reading it, rating it
+  session by session and vectorized (numpy), and writing the ratings
+- the batch ratings of the live run's history match the live ones
+
+Usage: python scripts/bench_ratings.py [sessions] [live games]
+"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import ratings
+from api.database import ArcadeDatabase
+
+
+def live(games):
+    """Finish ``games`` sessions, alternating rated (pingpong) and unrated
+    (tetris); returns finish times and how far re-rating is from live"""
+    database = ArcadeDatabase(os.path.join(tempfile.mkdtemp(), "live.db"))
+    database.init_database()
+    players = [f"bench-player-{i:04d}" for i in range(max(1, games // 20))]
+    timings = {True: [], False: []}
+    for i in range(games):
+        rated = i % 2 == 0
+        game_type = "pingpong" if rated else "tetris"
+        difficulty = random.random()
+        player_id, game_session_id = database.begin_session(random.choice(players), game_type, difficulty)
+        started = time.perf_counter()
+        database.finish_session(game_session_id, player_id, game_type, 5, difficulty, ranked=False,
+                                result=float(random.random() < 0.5) if rated else None)
+        timings[rated].append((time.perf_counter() - started) * 1e6)
+
+    batch = {row[0]: row[1] for row in ratings.rerate(database.rating_history("pingpong"))}
+    conn = sqlite3.connect(database.db_path)
+    stored = dict(conn.execute("SELECT player_id, rating FROM player_ratings WHERE game_type = 'pingpong'"))
+    conn.close()
+    database.close()
+    return timings, max(abs(batch[player_id] - rating) for player_id, rating in stored.items())
+
+
+def synthetic(count):
+    path = os.path.join(tempfile.mkdtemp(), "history.db")
+    database = ArcadeDatabase(path)
+    database.init_database()
+    conn = sqlite3.connect(path)
+    players = max(1, count // 10)
+    conn.executemany("INSERT INTO players (id, session_id) VALUES (?, ?)",
+                     ((i, f"player-{i}") for i in range(1, players + 1)))
+    day = 2460000.0
+    conn.executemany(
+        "INSERT INTO game_sessions (player_id, game_type, session_end, final_score, ai_difficulty, result) "
+        "VALUES (?, 'pingpong', datetime(?), 5, ?, ?)",
+        ((random.randint(1, players), day + i / 1000, random.random(), float(random.random() < 0.5))
+         for i in range(count)))
+    conn.commit()
+    conn.close()
+    return database
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    print(f"🎯 Player ratings: {games:,} live games, {count:,}-session history")
+    print("=" * 64)
+    timings, drift = live(games)
+    rated, unrated = statistics.median(timings[True]), statistics.median(timings[False])
+    print(f"finish_session, no result    {unrated:8.1f} µs")
+    print(f"finish_session, rated        {rated:8.1f} µs  (+{rated - unrated:.1f} µs)")
+    print(f"re-rated vs live             {drift:.2e} rating points")
+
+    database = synthetic(count)
+    started = time.perf_counter()
+    history = database.rating_history("pingpong")
+    read = time.perf_counter() - started
+    started = time.perf_counter()
+    by_session = ratings.rerate(history, vectorized=False)
+    one_by_one = time.perf_counter() - started
+    started = time.perf_counter()
+    vectorized = ratings.rerate(history)
+    vector_time = time.perf_counter() - started
+    started = time.perf_counter()
+    database.replace_ratings("pingpong", vectorized)
+    write = time.perf_counter() - started
+    difference = max(abs(a[1] - b[1]) for a, b in zip(sorted(by_session), sorted(vectorized)))
+    print(f"read history                 {read:8.2f} s")
+    print(f"rate, session by session     {one_by_one:8.2f} s")
+    print(f"rate, vectorized             {vector_time:8.2f} s  ({one_by_one / vector_time:.1f}x)")
+    print(f"write {len(vectorized):,} ratings      {write:8.2f} s")
+    print(f"vectorized vs one by one     {difference:.2e} rating points")
+    database.close()
+
+
+if __name__ == "__main__":
+    main()
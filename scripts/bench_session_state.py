@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark session state memory and action validation throughput.
+
+Compares the previous representation (a Pydantic model per session with
+an untyped game_state dict, and actions validated as a generic Dict) with
+the slotted dataclasses and discriminated-union action models, at 100k
+sessions.
+"""
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["ARCADE_FAST_START"] = "0"
+
+from pydantic import BaseModel, TypeAdapter
+
+from api.ai.difficulty_agent import pingpong_agent, tetris_agent
+from api.routes import pingpong, tetris
+
+SESSIONS = 100_000
+ACTIONS = 100_000
+
+# Previous models, kept here for comparison
+class LegacyGameSession(BaseModel):
+    session_id: str
+    player_id: int
+    game_session_id: int
+    ai_difficulty: float
+    player_score: int = 0
+    ai_score: int = 0
+    game_state: Dict = {}
+    created_at: datetime
+
+class LegacyTetrisSession(BaseModel):
+    session_id: str
+    player_id: int
+    game_session_id: int
+    ai_difficulty: float
+    score: int = 0
+    level: int = 1
+    lines_cleared: int = 0
+    game_state: Dict = {}
+    created_at: datetime
+
+class LegacyAction(BaseModel):
+    session_id: str
+    action_type: str
+    action_data: Dict
+    timestamp: float
+
+def legacy_pingpong(i, params):
+    return LegacyGameSession(
+        session_id=str(uuid.uuid4()), player_id=i, game_session_id=i, ai_difficulty=0.5,
+        game_state={'ball_x': 400, 'ball_y': 250, 'ball_speed_x': 5, 'ball_speed_y': 5,
+                    'player_y': 200, 'ai_y': 200, 'ai_params': dict(params)},
+        created_at=datetime.now())
+
+def new_pingpong(i, params):
+    return pingpong.GameSession(
+        session_id=str(uuid.uuid4()), player_id=i, game_session_id=i, ai_difficulty=0.5,
+        prediction_accuracy=params['prediction_accuracy'],
+        paddle_speed=params['paddle_speed'], created_at=time.time())
+
+def legacy_tetris(i, params):
+    return LegacyTetrisSession(
+        session_id=str(uuid.uuid4()), player_id=i, game_session_id=i, ai_difficulty=0.5,
+        game_state={'board_width': 10, 'board_height': 20, 'ai_params': dict(params)},
+        created_at=datetime.now())
+
+def new_tetris(i, params):
+    return tetris.TetrisSession(
+        session_id=str(uuid.uuid4()), player_id=i, game_session_id=i, ai_difficulty=0.5,
+        created_at=time.time())
+
+def bytes_per_session(factory, params):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = {}
+    for i in range(SESSIONS):
+        session = factory(i, params)
+        sessions[session.session_id] = session
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # Exclude the uuid string and dict slot, which both representations share
+    shared = sys.getsizeof(str(uuid.uuid4())) + 8 * 3
+    return (after - before) / SESSIONS - shared
+
+def pingpong_payloads(n):
+    payloads = []
+    for _ in range(n):
+        physics = {"ball_x": random.uniform(0, 800), "ball_y": random.uniform(0, 500),
+                   "ball_speed_x": 5, "ball_speed_y": -3, "player_y": 200, "ai_y": 210}
+        kind = random.random()
+        if kind < 0.9:
+            action_type, data = "paddle_move", {"y": random.randint(0, 400)}
+        elif kind < 0.97:
+            action_type, data = "ball_hit", {"paddle_y": 200}
+        else:
+            action_type, data = "score", {"scorer": random.choice(("player", "ai"))}
+        payloads.append({"session_id": str(uuid.uuid4()), "action_type": action_type,
+                         "action_data": {**data, **physics}, "timestamp": time.time()})
+    return payloads
+
+def tetris_payloads(n):
+    kinds = [("move", {"direction": "left"}), ("rotate", {}), ("hard_drop", {}),
+             ("piece_placed", {"piece_type": [[1, 1], [1, 1]], "position": {"x": 4, "y": 18},
+                               "score": 120}),
+             ("lines_cleared", {"lines": 1, "score": 220, "level": 1})]
+    return [{"session_id": str(uuid.uuid4()), "action_type": action_type,
+             "action_data": dict(data), "timestamp": time.time()}
+            for action_type, data in random.choices(kinds, weights=(6, 3, 1, 2, 1), k=n)]
+
+def actions_per_second(adapter, payloads):
+    start = time.perf_counter()
+    for payload in payloads:
+        adapter.validate_python(payload)
+    return len(payloads) / (time.perf_counter() - start)
+
+def legacy_apply_per_second(adapter, payloads):
+    """Validate, then update a legacy session as the old handler did"""
+    session = legacy_pingpong(0, pingpong_agent.get_ai_behavior_params(0.5))
+    start = time.perf_counter()
+    for payload in payloads:
+        action = adapter.validate_python(payload)
+        for key in pingpong.PHYSICS_FIELDS:
+            if key in action.action_data and action.action_data[key] is not None:
+                session.game_state[key] = action.action_data[key]
+        if action.action_type == "paddle_move":
+            session.game_state['player_y'] = action.action_data.get('y', session.game_state['player_y'])
+        elif action.action_type == "score":
+            if action.action_data.get('scorer') == 'player':
+                session.player_score += 1
+            else:
+                session.ai_score += 1
+    return len(payloads) / (time.perf_counter() - start)
+
+def apply_per_second(adapter, payloads):
+    """Validate, then update a slotted session as the handler does"""
+    session = new_pingpong(0, pingpong_agent.get_ai_behavior_params(0.5))
+    start = time.perf_counter()
+    for payload in payloads:
+        action = adapter.validate_python(payload)
+        data = action.action_data
+        for field in pingpong.PHYSICS_FIELDS:
+            value = getattr(data, field)
+            if value is not None:
+                setattr(session, field, value)
+        if action.action_type == "paddle_move":
+            if data.y is not None:
+                session.player_y = data.y
+        elif action.action_type == "score":
+            if data.scorer == 'player':
+                session.player_score += 1
+            else:
+                session.ai_score += 1
+    return len(payloads) / (time.perf_counter() - start)
+
+def main():
+    random.seed(7)
+    legacy_adapter = TypeAdapter(LegacyAction)
+
+    print("📊 Session state: memory and validation at 100k")
+    print("=" * 66)
+    print(f"{'':28} {'before':>12} {'after':>12} {'change':>10}")
+
+    for name, legacy, new, params in (
+            ("pingpong bytes/session", legacy_pingpong, new_pingpong,
+             pingpong_agent.get_ai_behavior_params(0.5)),
+            ("tetris bytes/session", legacy_tetris, new_tetris,
+             tetris_agent.get_ai_behavior_params(0.5))):
+        old = bytes_per_session(legacy, params)
+        cur = bytes_per_session(new, params)
+        print(f"{name:28} {old:12.0f} {cur:12.0f} {(cur - old) / old:+10.0%}")
+
+    pingpong_actions = pingpong_payloads(ACTIONS)
+    tetris_actions = tetris_payloads(ACTIONS)
+    pingpong_adapter = TypeAdapter(pingpong.GameAction)
+    for name, old, cur in (
+            ("pingpong validate/s", actions_per_second(legacy_adapter, pingpong_actions),
+             actions_per_second(pingpong_adapter, pingpong_actions)),
+            ("pingpong validate+apply/s", legacy_apply_per_second(legacy_adapter, pingpong_actions),
+             apply_per_second(pingpong_adapter, pingpong_actions)),
+            ("tetris validate/s", actions_per_second(legacy_adapter, tetris_actions),
+             actions_per_second(TypeAdapter(tetris.TetrisAction), tetris_actions))):
+        print(f"{name:28} {old:12,.0f} {cur:12,.0f} {(cur - old) / old:+10.0%}")
+
+    print()
+    print("'before' validation accepts any action_data dict, so a malformed field")
+    print("only fails later inside the handler; 'after' checks every field's type.")
+
+if __name__ == "__main__":
+    main()
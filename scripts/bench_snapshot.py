@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark database snapshots and restore.
+
+Fills a database with N finished sessions, then measures:
+- snapshot time and size, raw and compressed
+- write latency for a concurrent writer, with and without a snapshot
+  running
+- time for a fresh instance to restore and serve its first leaderboard
+  and rankings page
+
+Usage: python scripts/bench_snapshot.py [sessions]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import ArcadeDatabase
+
+def populate(db, sessions):
+    random.seed(3)
+    for i in range(sessions):
+        game = random.choice(("pingpong", "tetris"))
+        player_id, game_session_id = db.begin_session(f"bench-{i}", game, 0.5)
+        score = random.randint(1, 10) if game == "pingpong" else random.randint(100, 50000)
+        db.finish_session(game_session_id, player_id, game, score, 0.5, ranked=True,
+                          learning_data={"player_action": "game_end", "ai_response": "final",
+                                         "outcome": "player", "difficulty_level": 0.5})
+
+def write_latencies(db, stop, out):
+    while not stop.is_set():
+        start = time.perf_counter()
+        db.record_ai_feedback(1, "tetris", "move_left", "observe", "move_recorded", 0.5, {})
+        out.append((time.perf_counter() - start) * 1000)
+
+def timed_writes(db, seconds, during=None):
+    stop, latencies = threading.Event(), []
+    writer = threading.Thread(target=write_latencies, args=(db, stop, latencies))
+    writer.start()
+    result = during() if during else time.sleep(seconds)
+    stop.set()
+    writer.join()
+    return latencies, result
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    return f"{len(latencies):5} writes  median {statistics.median(latencies):6.2f} ms  " \
+           f"p99 {p99:6.2f} ms  max {latencies[-1]:6.2f} ms"
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    root = tempfile.mkdtemp()
+    snapshot_path = os.path.join(root, "snapshots", "arcade.db.gz")
+    db = ArcadeDatabase(os.path.join(root, "live", "arcade.db"), snapshot_path)
+    os.makedirs(os.path.dirname(db.db_path))
+
+    print(f"📦 Database snapshot and restore ({sessions} sessions)")
+    print("=" * 60)
+    start = time.perf_counter()
+    populate(db, sessions)
+    print(f"Populated in {time.perf_counter() - start:.1f} s")
+
+    baseline, _ = timed_writes(db, 1.0)
+    during, snap = timed_writes(db, 0, during=db.snapshot)
+    print(f"Snapshot: {snap['bytes'] / 1024:.0f} KiB -> {snap['compressed_bytes'] / 1024:.0f} KiB "
+          f"gzip in {snap['seconds'] * 1000:.0f} ms")
+    print(f"Writes, idle:            {summary(baseline)}")
+    print(f"Writes, during snapshot: {summary(during)}")
+
+    fresh = ArcadeDatabase(os.path.join(root, "fresh", "arcade.db"), snapshot_path)
+    start = time.perf_counter()
+    fresh.init_database()
+    restored = time.perf_counter()
+    tetris = fresh.get_leaderboard_page("tetris", 20, None)
+    rankings = fresh.get_player_rankings(20, None)
+    served = time.perf_counter()
+    print(f"Fresh instance: restore {(restored - start) * 1000:.1f} ms, first leaderboard "
+          f"+ rankings {(served - restored) * 1000:.1f} ms "
+          f"({len(tetris['entries'])} entries, {rankings['total_players']} ranked players)")
+
+if __name__ == "__main__":
+    main()
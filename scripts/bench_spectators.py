@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark one Ping-Pong session watched by many spectators.
+
+The player sends paddle_move at 60 Hz and a ball_hit twice a second;
+spectators are WebSocket connections to /pingpong/spectate/{token}, a tenth of
+them slow (each send takes 200 ms, like a congested phone). Everything is
+ASGI calls on one event loop (no HTTP or WebSocket client), so the numbers
+are the server's share of the work. Reports the player's action latency
+with and without spectators, frames serialized per second (once per tick
+for everyone) and frames delivered per second to fast and slow viewers.
+
+Usage: python scripts/bench_spectators.py [seconds] [spectators]
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ARCADE_DB_PATH", os.path.join(tempfile.mkdtemp(), "spectators.db"))
+
+from api import spectate
+from api.database import db
+from api.main import app, install_routes
+
+SLOW_EVERY = 10
+SLOW_SEND = 0.2
+
+async def post(path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "client": ("127.0.0.1", 0),
+             "server": ("bench", 80),
+             "headers": [(b"content-type", b"application/json"),
+                         (b"content-length", str(len(body)).encode())]}
+    response = {"body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return json.loads(response["body"] or b"null")
+
+async def spectator(token, stop, counts, slow):
+    path = f"/pingpong/spectate/{token}"
+    scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws",
+             "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "client": ("127.0.0.1", 0), "server": ("bench", 80), "headers": [],
+             "subprotocols": []}
+    connected = False
+
+    async def receive():
+        nonlocal connected
+        if not connected:
+            connected = True
+            return {"type": "websocket.connect"}
+        await stop.wait()
+        return {"type": "websocket.disconnect", "code": 1001}
+
+    async def send(message):
+        if message["type"] == "websocket.send":
+            if slow:
+                await asyncio.sleep(SLOW_SEND)
+            counts.append(1)
+
+    await app(scope, receive, send)
+
+async def player(session_id, stop, latencies):
+    tick = 0
+    next_at = time.perf_counter()
+    while not stop.is_set():
+        next_at += 1 / 60
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tick += 1
+        action_type = "ball_hit" if tick % 30 == 0 else "paddle_move"
+        data = {"ball_x": tick % 800, "ball_y": 250, "ball_speed_x": 5, "ball_speed_y": 3,
+                "player_y": tick % 400, "y": tick % 400}
+        started = time.perf_counter()
+        await post("/pingpong/action", {"session_id": session_id, "action_type": action_type,
+                                        "action_data": data, "timestamp": time.time() * 1000})
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def run(seconds, spectators):
+    started = await post("/pingpong/start-session")
+    session_id = started["session_id"]
+    stop = asyncio.Event()
+    latencies = []
+    fast, slow = [], []
+    viewers = [asyncio.create_task(spectator(started["spectator_token"], stop, slow if i % SLOW_EVERY == 0 else fast,
+                                             i % SLOW_EVERY == 0))
+               for i in range(spectators)]
+    encoded_before = spectate.frames_encoded.value(("pingpong",))
+    game = asyncio.create_task(player(session_id, stop, latencies))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(game, *viewers)
+    encoded = spectate.frames_encoded.value(("pingpong",)) - encoded_before
+    n_slow = len(range(0, spectators, SLOW_EVERY))
+    return {
+        "latencies": latencies,
+        "encoded": encoded / seconds,
+        "fast": len(fast) / max(1, spectators - n_slow) / seconds,
+        "slow": len(slow) / max(1, n_slow) / seconds,
+        "sent": (len(fast) + len(slow)) / seconds,
+    }
+
+def p99(values):
+    values = sorted(values)
+    return values[max(0, int(len(values) * 0.99) - 1)] if values else 0.0
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    db.init_database()
+    install_routes()
+
+    print(f"👀 One Ping-Pong session at 60 Hz, {seconds:g} s per run, "
+          f"spectator frames capped at {spectate.SPECTATOR_FPS:g}/s")
+    print("=" * 86)
+    print(f"{'spectators':>10} {'action p50':>11} {'action p99':>11} {'encoded/s':>10} "
+          f"{'sent/s':>8} {'fast viewer fps':>16} {'slow viewer fps':>16}")
+    for spectators in (0, count):
+        result = asyncio.run(run(seconds, spectators))
+        latencies = result["latencies"]
+        print(f"{spectators:>10} {statistics.median(latencies):9.2f}ms {p99(latencies):9.2f}ms "
+              f"{result['encoded']:10.1f} {result['sent']:8.0f} "
+              f"{result['fast'] if spectators else 0:16.1f} {result['slow'] if spectators else 0:16.1f}")
+
+if __name__ == "__main__":
+    main()
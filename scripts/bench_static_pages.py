@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark requests per second for GET /tetris.
+
+- disk:   the previous handler, os.path.exists plus a FileResponse per
+          request (a stat, an open and a read, run in the threadpool)
+- memory: the route as shipped, answered from api.frontend.pages with no
+          filesystem calls
+- 304:    the memory route for a client revalidating with If-None-Match
+
+Requests are ASGI calls from concurrent tasks on one event loop (no HTTP
+client), so the numbers are the server's share of the work, including the
+metrics and profiling middleware.
+
+Usage: python scripts/bench_static_pages.py [seconds] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ARCADE_DB_PATH", os.path.join(tempfile.mkdtemp(), "static.db"))
+
+from fastapi.responses import FileResponse
+
+from api.frontend import frontend_file
+from api.main import app, install_routes
+
+def tetris_from_disk():
+    """/tetris as it was served before the page cache"""
+    path = frontend_file("tetris", "index.html")
+    if not os.path.exists(path):
+        return {"error": "Tetris file not found."}
+    return FileResponse(path)
+
+async def get(path, headers):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "client": ("127.0.0.1", 0),
+             "server": ("bench", 80), "headers": headers}
+    response = {"status": 500, "headers": {}, "size": 0}
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # Like a server, block until the client disconnects (FileResponse
+            # listens for that while it streams)
+            await asyncio.Future()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+        elif message["type"] == "http.response.body":
+            response["size"] += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return response
+
+async def run(path, headers, seconds, concurrency):
+    await get(path, headers)  # Warm up (route install, first page load)
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await get(path, headers)
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return done / (time.perf_counter() - started)
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    install_routes()
+    app.add_api_route("/bench/tetris-from-disk", tetris_from_disk)
+
+    accept = [(b"accept-encoding", b"br, gzip")]
+    etag = asyncio.run(get("/tetris", accept))["headers"][b"etag"]
+
+    print(f"📄 GET /tetris ({concurrency} concurrent clients, {seconds:g} s each)")
+    print("=" * 48)
+    results = {}
+    for name, path, headers in (("disk", "/bench/tetris-from-disk", accept),
+                                ("memory", "/tetris", accept),
+                                ("304", "/tetris", accept + [(b"if-none-match", etag)])):
+        results[name] = asyncio.run(run(path, headers, seconds, concurrency))
+        print(f"{name:8} {results[name]:10.0f} req/s {results[name] / results['disk']:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-worker mode (api.shared_state).
+
+- shared-state cost: microseconds per agent update, difficulty read and
+  session load+save, in process memory versus the shared-memory block
+- throughput: /pingpong/action requests per second from a real server
+  (python -m api.serve) with 1 and with N workers (default: one per CPU),
+  driven by client processes over keep-alive HTTP. Each client plays its own session: paddle
+  moves with a ball_hit (learning plus a database write) every 30th action.
+
+Clients run on the same machine, so on a box with few cores they compete
+with the workers and the scaling figure understates what separate load
+generators would see.
+
+Usage: python scripts/bench_workers.py [seconds] [workers] [clients per worker]
+"""
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PORT = 8766
+
+def shared_state_costs():
+    """Microseconds per operation: (local, shared) for each"""
+    os.environ["ARCADE_SHARED_NAME"] = f"arcade-bench-{os.getpid()}"
+    from api import admission, shared_state
+    from api.ai.difficulty_agent import MEMORY_SIZE, DifficultyAgent
+    from api.routes.pingpong import GameSession
+    from api.sessions import LocalSessions, SessionCodec
+
+    def session_ops(table):
+        session_id = str(uuid.uuid4())
+        table[session_id] = GameSession(session_id, 1, 1, 0.5, 0.5, 4.0,
+                                        bucket=admission.new_bucket())
+
+        def load_and_save():
+            session = table.get(session_id)
+            session.player_y += 1
+            table.save(session)
+        return load_and_save
+
+    region = shared_state.region()
+    local_agent = DifficultyAgent("pingpong")
+    shared_agent = DifficultyAgent("pingpong", shared_state.agent_state("bench", MEMORY_SIZE, 0.5))
+    shared_table = shared_state.SharedSessions(region, "bench", SessionCodec(GameSession),
+                                               shared_state.SESSION_SLOTS)
+    pairs = {
+        "agent.learn_from_outcome": [
+            lambda agent=agent: agent.learn_from_outcome("p", "a", "ai_win", {})
+            for agent in (local_agent, shared_agent)],
+        "agent.difficulty_level": [
+            lambda agent=agent: agent.difficulty_level for agent in (local_agent, shared_agent)],
+        "session load + save": [session_ops(LocalSessions(SessionCodec(GameSession))), session_ops(shared_table)],
+    }
+    results = {}
+    for name, (local, shared) in pairs.items():
+        results[name] = tuple(min(timeit.repeat(fn, number=20000, repeat=3)) / 20000 * 1e6
+                              for fn in (local, shared))
+    region.detach()
+    return results
+
+def client(seconds, results):
+    """One player: start a session, then send actions back to back"""
+    conn = http.client.HTTPConnection("127.0.0.1", PORT)
+    headers = {"content-type": "application/json"}
+
+    def post(path, body=None):
+        conn.request("POST", path, json.dumps(body) if body is not None else None, headers)
+        response = conn.getresponse()
+        return response.status, response.read()
+
+    session_id = json.loads(post("/pingpong/start-session")[1])["session_id"]
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        done += 1
+        action_type = "ball_hit" if done % 30 == 0 else "paddle_move"
+        status, _ = post("/pingpong/action", {
+            "session_id": session_id, "action_type": action_type,
+            "action_data": {"ball_x": 400, "ball_y": 250, "ball_speed_x": 5, "ball_speed_y": 3,
+                            "y": done % 400},
+            "timestamp": time.time() * 1000})
+        errors += status != 200
+    results.put((done, errors))
+
+def throughput(workers, clients, seconds):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), HOST="127.0.0.1", PORT=str(PORT),
+               ARCADE_DB_PATH=os.path.join(tempfile.mkdtemp(), "workers.db"),
+               # Measure the server, not the per-session rate limit
+               ARCADE_ACTION_RATE="1000000", ARCADE_ACTION_BURST="1000000")
+    env.pop("ARCADE_SHARED_NAME", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "api.serve"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                http.client.HTTPConnection("127.0.0.1", PORT).request("GET", "/health")
+                break
+            except OSError:
+                time.sleep(0.1)
+        time.sleep(1)  # Let every worker finish starting
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=client, args=(seconds, results))
+                     for _ in range(clients)]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.terminate()
+        server.wait()
+    return sum(done for done, _ in totals) / seconds, sum(errors for _, errors in totals)
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    per_worker = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    print("🧠 Shared-state cost per operation")
+    print("=" * 60)
+    print(f"{'operation':28} {'local':>10} {'shared':>10}")
+    for name, (local, shared) in shared_state_costs().items():
+        print(f"{name:28} {local:8.2f}µs {shared:8.2f}µs")
+
+    print()
+    print(f"🚀 /pingpong/action throughput ({seconds:g} s, {per_worker} clients per worker, "
+          f"{os.cpu_count()} CPUs)")
+    print("=" * 60)
+    base = None
+    for count in sorted({1, workers}):
+        rate, errors = throughput(count, per_worker * count, seconds)
+        base = base or rate
+        print(f"{count:2} worker(s) {rate:10.0f} req/s {rate / base:6.2f}x  ({errors} errors)")
+
+if __name__ == "__main__":
+    main()
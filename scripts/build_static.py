@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Build api/static/ (the tree the app serves, and the one shipped in the
+serverless bundle) from frontend/, which is the only tree to edit.
+
+- Each page's inline <style> and <script> blocks are minified and moved
+  into content-hashed files under assets/ (e.g. assets/tetris.3f2a9c1e0b.js),
+  which the app serves as immutable
+- The page HTML itself is minified
+- IBM Plex Sans: with the font files in frontend/fonts/ (e.g.
+  IBMPlexSans-Regular.ttf, IBMPlexSans-SemiBold.ttf) they are subset to
+  the characters the pages can show (fontTools, optional) and self-hosted
+  as hashed woff2; without them (as shipped: none are committed) the
+  Google Fonts stylesheet is loaded without blocking the first render
+  instead of through a CSS @import
+- Text files get .gz and, with the brotli module installed, .br siblings
+  for the app to pick by Accept-Encoding
+
+The output directory is rebuilt from scratch, so stale hashed files never
+pile up. --check builds into a temporary directory and fails if the
+committed tree is out of date.
+
+Usage: python scripts/build_static.py [--check]
+"""
+import filecmp
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(ROOT, "frontend")
+OUTPUT = os.path.join(ROOT, "api", "static")
+
+PAGES = ("arcade", "pingpong", "tetris")
+ASSET_URL = "/frontend/assets/"
+HASH_LENGTH = 10
+
+# Copied as they are; the app rewrites the service worker when serving it
+COPIED = ("manifest.json", "service-worker.js", "icons")
+COMPRESSED_SUFFIXES = (".html", ".css", ".js", ".json", ".svg")
+# Filled in per request by the app, so a precompressed copy would never be used
+NOT_COMPRESSED = ("service-worker.js",)
+
+# (family, weight, file stem in frontend/fonts/)
+FONT_FACES = (
+    ("IBM Plex Sans", 400, "IBMPlexSans-Regular"),
+    ("IBM Plex Sans", 600, "IBMPlexSans-SemiBold"),
+)
+FONT_SUFFIXES = (".woff2", ".ttf", ".otf", ".woff")
+# suffix: (@font-face format, preload type)
+FONT_FORMATS = {".woff2": ("woff2", "font/woff2"), ".woff": ("woff", "font/woff"),
+                ".ttf": ("truetype", "font/ttf"), ".otf": ("opentype", "font/otf")}
+# Subsets always keep printable ASCII: scores, names and messages are dynamic
+FONT_BASE_TEXT = "".join(chr(c) for c in range(0x20, 0x7F))
+
+FONT_IMPORT = re.compile(r"""@import\s+url\(\s*['"]?(https://fonts\.googleapis\.com/[^'")\s]+)['"]?\s*\)\s*;?""")
+STYLE_BLOCK = re.compile(r"<style>(.*?)</style>", re.S)
+# Inline scripts, with any directly following ones (only whitespace between)
+SCRIPT_RUN = re.compile(r"<script>(?:.*?)</script>(?:\s*<script>(?:.*?)</script>)*", re.S)
+SCRIPT_BODY = re.compile(r"<script>(.*?)</script>", re.S)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+# --- Minifiers (deliberately conservative: whitespace and comments only) ---
+
+def _split_css_strings(css):
+    """Yield (is_string, text) pieces so strings are never rewritten"""
+    for piece in re.split(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')""", css):
+        yield piece[:1] in ("'", '"'), piece
+
+
+def minify_css(css: str) -> str:
+    out = []
+    for is_string, text in _split_css_strings(css):
+        if not is_string:
+            text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+            text = re.sub(r"\s+", " ", text)
+            text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+            # Only after colons: a space before one is a descendant selector
+            text = re.sub(r":\s+", ":", text)
+            text = text.replace(";}", "}")
+        out.append(text)
+    return "".join(out).strip()
+
+
+def minify_js(js: str) -> str:
+    """Drop indentation, blank lines and comment-only lines, keep line breaks
+
+    Line breaks stay so automatic semicolon insertion behaves as before.
+    Lines inside multi-line template literals are left untouched.
+    """
+    out = []
+    in_template = False
+    in_comment = False
+    for line in js.splitlines():
+        if in_template:
+            kept = line
+        else:
+            stripped = line.strip()
+            if in_comment:
+                if "*/" in stripped:
+                    in_comment = False
+                    stripped = stripped.split("*/", 1)[1].strip()
+                else:
+                    continue
+            if stripped.startswith("/*") and "`" not in stripped:
+                if "*/" not in stripped:
+                    in_comment = True
+                    continue
+                stripped = stripped.split("*/", 1)[1].strip()
+            if not stripped or stripped.startswith("//"):
+                continue
+            # A trailing comment is only safe to cut when nothing before it
+            # could be a string or a regex literal
+            code, sep, _ = stripped.partition(" //")
+            if sep and not re.search(r"""['"`/]""", code):
+                stripped = code.rstrip()
+            kept = stripped
+        out.append(kept)
+        if len(re.findall(r"(?<!\\)`", kept)) % 2:
+            in_template = not in_template
+    return "\n".join(out)
+
+
+def minify_html(html: str) -> str:
+    if re.search(r"<(pre|textarea)\b", html):
+        return html  # Whitespace is content there
+    html = re.sub(r"<!--(?!\[).*?-->", "", html, flags=re.S)
+    return "\n".join(line.strip() for line in html.splitlines() if line.strip())
+
+
+# --- Fonts ---
+
+def _font_source(stem):
+    for suffix in FONT_SUFFIXES:
+        path = os.path.join(SOURCE, "fonts", stem + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _subset_font(path, text):
+    """woff2 subset of the font at ``path``; the file as is without fontTools"""
+    try:
+        from fontTools import subset
+    except ImportError:
+        print(f"⚠️  fontTools not installed; {os.path.basename(path)} is served unsubset")
+        with open(path, "rb") as f:
+            return f.read(), os.path.splitext(path)[1]
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = ["*"]
+    font = subset.load_font(path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    with tempfile.TemporaryFile() as f:
+        subset.save_font(font, f, options)
+        f.seek(0)
+        return f.read(), ".woff2"
+
+
+def build_fonts(out_dir, text):
+    """Self-host FONT_FACES; returns (@font-face CSS, (preload URL, type)) or None"""
+    sources = [(family, weight, _font_source(stem), stem) for family, weight, stem in FONT_FACES]
+    if not all(path for _, _, path, _ in sources):
+        return None
+    faces = []
+    preload = None
+    for family, weight, path, stem in sources:
+        data, suffix = _subset_font(path, text)
+        name = f"{stem}.{content_hash(data)}{suffix}"
+        write(os.path.join(out_dir, "assets", name), data)
+        fmt, mime = FONT_FORMATS[suffix]
+        faces.append(f"@font-face{{font-family:'{family}';font-style:normal;font-weight:{weight};"
+                     f"font-display:swap;src:url({ASSET_URL}{name}) format('{fmt}')}}")
+        if preload is None:
+            preload = (ASSET_URL + name, mime)
+    return "".join(faces), preload
+
+
+# --- Pages ---
+
+def write(path, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def write_asset(out_dir, page, suffix, text):
+    data = text.encode()
+    name = f"{page}.{content_hash(data)}{suffix}"
+    write(os.path.join(out_dir, "assets", name), data)
+    return ASSET_URL + name
+
+
+def build_page(out_dir, page, html, fonts):
+    font_urls = []
+
+    def extract_style(match):
+        css = match.group(1)
+        font_urls.extend(FONT_IMPORT.findall(css))
+        css = minify_css(FONT_IMPORT.sub("", css))
+        if fonts:
+            css = fonts[0] + css
+        return f'<link rel="stylesheet" href="{write_asset(out_dir, page, ".css", css)}">'
+
+    def extract_scripts(match):
+        bodies = [minify_js(body) for body in SCRIPT_BODY.findall(match.group(0))]
+        js = ";\n".join(body.rstrip(";") for body in bodies if body) + ";"
+        return f'<script src="{write_asset(out_dir, page, ".js", js)}"></script>'
+
+    html = STYLE_BLOCK.sub(extract_style, html)
+    html = SCRIPT_RUN.sub(extract_scripts, html)
+
+    if fonts:
+        url, font_type = fonts[1]
+        head = f'<link rel="preload" href="{url}" as="font" type="{font_type}" crossorigin>'
+    else:
+        # Same stylesheet, but fetched without holding up the first paint
+        head = '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+        for url in dict.fromkeys(font_urls):
+            head += (f'\n<link rel="stylesheet" href="{url}" media="print" onload="this.media=\'all\'">'
+                     f'\n<noscript><link rel="stylesheet" href="{url}"></noscript>')
+    html = html.replace('<link rel="stylesheet"', head + '\n<link rel="stylesheet"', 1)
+    write(os.path.join(out_dir, page, "index.html"), minify_html(html).encode())
+
+
+def compress_tree(out_dir):
+    """Write .gz (and .br) next to every text file they make smaller"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+        print("⚠️  brotli not installed; writing .gz variants only")
+    for directory, _, files in os.walk(out_dir):
+        for name in files:
+            if not name.endswith(COMPRESSED_SUFFIXES) or name in NOT_COMPRESSED:
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            # mtime=0 keeps builds byte-for-byte reproducible
+            variants = [(".gz", gzip.compress(data, 9, mtime=0))]
+            if brotli:
+                variants.append((".br", brotli.compress(data, quality=11)))
+            for suffix, encoded in variants:
+                if len(encoded) < len(data):
+                    write(path + suffix, encoded)
+
+
+def build(out_dir):
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    sources = {}
+    for page in PAGES:
+        with open(os.path.join(SOURCE, page, "index.html"), encoding="utf-8") as f:
+            sources[page] = f.read()
+
+    fonts = build_fonts(out_dir, FONT_BASE_TEXT + "".join(sources.values()))
+    for page, html in sources.items():
+        build_page(out_dir, page, html, fonts)
+    for name in COPIED:
+        src = os.path.join(SOURCE, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(out_dir, name))
+        else:
+            shutil.copyfile(src, os.path.join(out_dir, name))
+    compress_tree(out_dir)
+    return fonts is not None
+
+
+def same_tree(left, right):
+    comparison = filecmp.dircmp(left, right)
+    if comparison.left_only or comparison.right_only:
+        return False
+    _, mismatch, errors = filecmp.cmpfiles(left, right, comparison.common_files, shallow=False)
+    if mismatch or errors:
+        return False
+    return all(same_tree(os.path.join(left, d), os.path.join(right, d)) for d in comparison.common_dirs)
+
+
+def main():
+    if "--check" in sys.argv[1:]:
+        with tempfile.TemporaryDirectory() as tmp:
+            build(os.path.join(tmp, "static"))
+            if not os.path.exists(OUTPUT) or not same_tree(os.path.join(tmp, "static"), OUTPUT):
+                print("❌ api/static is out of date; run python scripts/build_static.py")
+                sys.exit(1)
+        print("✅ api/static is up to date")
+        return
+
+    print("📦 Building api/static from frontend/...")
+    self_hosted = build(OUTPUT)
+    print("🔤 Fonts: " + ("self-hosted from frontend/fonts" if self_hosted
+                          else "Google Fonts, loaded without blocking render "
+                               "(add the files to frontend/fonts to self-host)"))
+    for page in PAGES:
+        original = os.path.getsize(os.path.join(SOURCE, page, "index.html"))
+        assets = [name for name in os.listdir(os.path.join(OUTPUT, "assets"))
+                  if name.startswith(page + ".") and not name.endswith((".gz", ".br"))]
+        built = os.path.getsize(os.path.join(OUTPUT, page, "index.html")) + sum(
+            os.path.getsize(os.path.join(OUTPUT, "assets", name)) for name in assets)
+        encoded = {}
+        for suffix in (".gz", ".br"):
+            paths = [os.path.join(OUTPUT, page, "index.html")] + [
+                os.path.join(OUTPUT, "assets", name) for name in assets]
+            if all(os.path.exists(p + suffix) for p in paths):
+                encoded[suffix] = sum(os.path.getsize(p + suffix) for p in paths)
+        sizes = ", ".join(f"{suffix[1:]} {size / 1024:.1f} KB" for suffix, size in encoded.items())
+        print(f"✅ {page:9} {original / 1024:5.1f} KB -> {built / 1024:5.1f} KB minified ({sizes})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Recompute every player's rating (api.ratings) from finished game sessions
+and replace the player_ratings table with the result, one game at a time.
+
+Use it after changing the rating constants, or once after upgrading to
+fill in ratings for games played before they existed. Sessions are rated
+in the order they ended, as the live updates did; with numpy installed
+every player's k-th game is rated in one vectorized step.
+
+Usage: python scripts/rerate_players.py [db_path]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import ratings
+from api.database import ArcadeDatabase, SHARDED_GAMES, db
+
+
+def main():
+    database = ArcadeDatabase(sys.argv[1]) if len(sys.argv) > 1 else db
+    print(f"🎯 Re-rating players in {database.db_path}...")
+    for game_type in SHARDED_GAMES:
+        start = time.perf_counter()
+        history = database.rating_history(game_type)
+        loaded = time.perf_counter()
+        rated = ratings.rerate(history)
+        computed = time.perf_counter()
+        database.replace_ratings(game_type, rated)
+        print(f"✅ {game_type}: {len(history):,} sessions, {len(rated):,} players "
+              f"(read {loaded - start:.2f} s, rate {computed - loaded:.2f} s, "
+              f"write {time.perf_counter() - computed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+One-time move of an existing single-file database's game tables into
+per-game shard files (run before starting the app with ARCADE_DB_SHARDS=1)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import ArcadeDatabase
+
+def main():
+    database = ArcadeDatabase(sys.argv[1] if len(sys.argv) > 1 else None, shard_by_game=True)
+    print(f"🗂️  Moving game tables from {database.db_path} into per-game shards...")
+    try:
+        copied = database.move_games_to_shards()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not copied:
+        print("ℹ️  No single-file game tables found; nothing to move")
+    for game_type, rows in copied.items():
+        print(f"✅ {game_type}: {rows} rows")
+    print("Shard files: " + ", ".join(database.db_files[1:]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for the serverless entry point.
+
+Imports api.index under ``python -X importtime`` with fast-start enabled and
+fails if the routers get imported eagerly again or if import time goes over
+budget. Budgets can be raised for slow machines through the environment.
+Run directly, or through pytest (``python -m pytest scripts/test_import_time.py``).
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Self time of our own api.* modules, and cumulative time of api.index
+APP_BUDGET_MS = float(os.environ.get("ARCADE_APP_IMPORT_BUDGET_MS", "30"))
+TOTAL_BUDGET_MS = float(os.environ.get("ARCADE_IMPORT_BUDGET_MS", "1500"))
+RUNS = int(os.environ.get("ARCADE_IMPORT_RUNS", "5"))
+
+# Must stay out of the cold-start import graph in fast-start mode
+DEFERRED_MODULES = ("api.routes", "api.ai", "fastapi.staticfiles")
+
+def measure_imports():
+    """One cold interpreter; returns {module: (self_us, cumulative_us)}"""
+    env = dict(os.environ, ARCADE_FAST_START="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.index"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import api.index failed:\n{result.stderr}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+def main():
+    print("⏱️  Measuring cold-start import time (fast-start mode)")
+    print("=" * 50)
+
+    app_ms, total_ms = [], []
+    eager = set()
+    for _ in range(RUNS):
+        modules = measure_imports()
+        eager.update(name for name in modules
+                     if any(name == m or name.startswith(m + ".") for m in DEFERRED_MODULES))
+        app_ms.append(sum(self_us for name, (self_us, _) in modules.items()
+                          if name == "api" or name.startswith("api.")) / 1000)
+        total_ms.append(modules["api.index"][1] / 1000)
+
+    app_median = statistics.median(app_ms)
+    total_median = statistics.median(total_ms)
+    print(f"api.* self time:       {app_median:8.1f} ms (budget {APP_BUDGET_MS:.0f} ms)")
+    print(f"api.index cumulative:  {total_median:8.1f} ms (budget {TOTAL_BUDGET_MS:.0f} ms)")
+
+    ok = True
+    if eager:
+        print(f"❌ Imported at cold start: {', '.join(sorted(eager))}")
+        ok = False
+    if app_median > APP_BUDGET_MS:
+        print("❌ api.* import time over budget")
+        ok = False
+    if total_median > TOTAL_BUDGET_MS:
+        print("❌ Cold start import time over budget")
+        ok = False
+    if ok:
+        print("✅ Cold start within budget")
+    return ok
+
+def test_cold_start():
+    """pytest entry point, so the budgets are enforced with the rest of the suite"""
+    assert main(), "cold start over budget or importing deferred modules"
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)